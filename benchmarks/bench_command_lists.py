@@ -0,0 +1,44 @@
+"""Time of N commands sent on N lines compared with N commands on one line joined by ;"""
+import sys
+
+from bench_utils import main, measure, summarize
+from shell_test_utils import ShellTester
+
+COMMANDS = [
+    "echo Hello World",
+    "true",
+]
+
+
+def add_arguments(parser):
+    parser.add_argument("--counts", type=int, nargs="+", default=[1, 10, 100], help="number of commands per batch")
+
+
+def run(shell_executable, args):
+    """Each line is one round trip, the shell signals that it is ready for the next line after every line"""
+    results = {}
+    shell_tester = ShellTester(shell_executable)
+    shell_tester.start_shell()
+    try:
+        for command in COMMANDS:
+            for count in args.counts:
+                def lines():
+                    for _ in range(count):
+                        shell_tester.execute(command)
+
+                def one_line():
+                    shell_tester.execute("; ".join([command] * count))
+
+                for case, fn in [("lines", lines), ("one line", one_line)]:
+                    samples = measure(fn, args.iterations, args.warmup)
+                    result = summarize(samples, "us")
+                    result["per_command_us"] = round(result["p50"] / count, 1)
+                    results[f"{count}x {command} ({case})"] = result
+    finally:
+        shell_tester.stop()
+
+    return results
+
+
+if __name__ == "__main__":
+    sys.exit(main("command_lists", run, __doc__, iterations=20, warmup=2, add_arguments=add_arguments))
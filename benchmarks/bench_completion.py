@@ -0,0 +1,44 @@
+"""Latency of tab completion with a large PATH"""
+import sys
+
+from bench_utils import main, measure, summarize, create_path_tree
+from shell_test_utils import ShellTester, create_test_environment, cleanup_test_environment
+
+# the executables are named cmd000000, cmd000001, ...
+CASES = [
+    ("baseline", "zzz"),
+    ("no match", "zzz\t"),
+    ("unique builtin", "ech\tHello"),
+    ("common prefix of 10", "cmd01234\t"),
+    ("list 10", "cmd01234\t\t"),
+    ("list 1000", "cmd01\t\t"),
+]
+
+
+def add_arguments(parser):
+    parser.add_argument("--dirs", type=int, default=10, help="number of PATH directories")
+    parser.add_argument("--executables", type=int, default=100000, help="number of executables in PATH")
+
+
+def run(shell_executable, args):
+    """Measure round trips of lines that trigger completion, the baseline line needs none"""
+    tmp_dir = create_test_environment()
+    results = {}
+    try:
+        path = create_path_tree(f"{tmp_dir}/path", args.dirs, args.executables)
+        shell_tester = ShellTester(shell_executable)
+        shell_tester.start_shell(env={"PATH": path, "HISTFILE": f"{tmp_dir}/history"}, timeout=600)
+        try:
+            for case, line in CASES:
+                samples = measure(lambda: shell_tester.execute(line), args.iterations, args.warmup)
+                results[case] = summarize(samples, "us")
+        finally:
+            shell_tester.stop()
+    finally:
+        cleanup_test_environment(tmp_dir)
+
+    return results
+
+
+if __name__ == "__main__":
+    sys.exit(main("completion", run, __doc__, add_arguments=add_arguments))
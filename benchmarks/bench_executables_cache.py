@@ -0,0 +1,69 @@
+"""Time until the executables cache is ready with a cold and a warm cache file"""
+import os
+import sys
+import time
+
+from bench_utils import main, summarize, create_path_tree
+from shell_test_utils import ShellTester, create_test_environment, cleanup_test_environment
+
+
+def add_arguments(parser):
+    parser.add_argument("--dirs", default="10,100", help="comma separated numbers of PATH directories")
+    parser.add_argument("--executables", default="1000,10000,100000",
+                        help="comma separated numbers of executables spread over the PATH directories")
+
+
+def time_until_ready(shell_executable, env):
+    """Start the shell and press Tab, which waits for the PATH scan, returns microseconds"""
+    shell_tester = ShellTester(shell_executable)
+    start = time.perf_counter_ns()
+    try:
+        shell_tester.start_shell(env=env, timeout=600)
+        shell_tester.execute("zzz\t", timeout=600)
+        return (time.perf_counter_ns() - start) / 1000
+    finally:
+        shell_tester.stop()
+
+
+def run(shell_executable, args):
+    """Compare cold starts without a cache file to warm starts with an up to date one"""
+    dir_counts = [int(dirs) for dirs in args.dirs.split(",")]
+    executable_counts = [int(executables) for executables in args.executables.split(",")]
+
+    tmp_dir = create_test_environment()
+    results = {}
+    try:
+        cache_file = f"{tmp_dir}/cache/shell/executables"
+        for dirs in dir_counts:
+            for executables in executable_counts:
+                root = f"{tmp_dir}/path_{dirs}_{executables}"
+                path = create_path_tree(root, dirs, executables)
+
+                # directories modified within the last second are never trusted
+                past = time.time() - 60
+                for directory in path.split(":"):
+                    os.utime(directory, (past, past))
+
+                env = {"PATH": path, "XDG_CACHE_HOME": f"{tmp_dir}/cache", "HISTFILE": f"{tmp_dir}/history"}
+
+                for state in ["cold", "warm"]:
+                    samples = []
+                    for i in range(args.warmup + args.iterations):
+                        if state == "cold" and os.path.exists(cache_file):
+                            os.remove(cache_file)
+                        duration = time_until_ready(shell_executable, env)
+                        if i >= args.warmup:
+                            samples.append(duration)
+
+                    result = summarize(samples, "us")
+                    result["dirs"] = dirs
+                    result["executables"] = executables
+                    results[f"{state} dirs={dirs} exe={executables}"] = result
+    finally:
+        cleanup_test_environment(tmp_dir)
+
+    return results
+
+
+if __name__ == "__main__":
+    sys.exit(main("executables cache", run, __doc__, iterations=10, warmup=1, add_arguments=add_arguments))
@@ -0,0 +1,74 @@
+"""Load and save time of large histories"""
+import sys
+import time
+
+from bench_utils import main, summarize, create_history_file, proc_status
+from shell_test_utils import ShellTester, create_test_environment, cleanup_test_environment
+
+
+def add_arguments(parser):
+    parser.add_argument("--history", default="10000,100000,1000000",
+                        help="comma separated numbers of lines in HISTFILE")
+    parser.add_argument("--histsize", default=None, help="value of HISTSIZE for the shell")
+
+
+def timed(fn):
+    """Return the duration of fn() in microseconds"""
+    start = time.perf_counter_ns()
+    fn()
+    return (time.perf_counter_ns() - start) / 1000
+
+
+def run(shell_executable, args):
+    """Measure loading on startup, history -w, history -a and exit for every history size"""
+    history_sizes = [int(lines) for lines in args.history.split(",")]
+
+    tmp_dir = create_test_environment()
+    results = {}
+    try:
+        for lines in history_sizes:
+            history_file = f"{tmp_dir}/history_{lines}"
+            create_history_file(history_file, lines)
+            with open(history_file) as f:
+                original = f.read()
+
+            env = {"HISTFILE": history_file}
+            if args.histsize is not None:
+                env["HISTSIZE"] = args.histsize
+
+            samples = {"load": [], "write": [], "append": [], "exit": []}
+            peak_rss = 0
+            for i in range(args.warmup + args.iterations):
+                with open(history_file, "w") as f:
+                    f.write(original)
+
+                shell_tester = ShellTester(shell_executable)
+                try:
+                    durations = {"load": timed(lambda: shell_tester.start_shell(env=env, timeout=600))}
+                    peak_rss = max(peak_rss, proc_status(shell_tester.process.pid, "VmHWM"))
+                    durations["write"] = timed(
+                        lambda: shell_tester.execute(f"history -w {tmp_dir}/written", timeout=600))
+                    shell_tester.execute("echo new entry")
+                    durations["append"] = timed(
+                        lambda: shell_tester.execute(f"history -a {tmp_dir}/appended", timeout=600))
+                    durations["exit"] = timed(lambda: shell_tester.execute("exit", timeout=600))
+                finally:
+                    shell_tester.stop()
+
+                if i >= args.warmup:
+                    for phase, duration in durations.items():
+                        samples[phase].append(duration)
+
+            for phase, phase_samples in samples.items():
+                result = summarize(phase_samples, "us")
+                result["history"] = lines
+                result["peak_rss_kb"] = peak_rss
+                results[f"{phase} {lines}"] = result
+    finally:
+        cleanup_test_environment(tmp_dir)
+
+    return results
+
+
+if __name__ == "__main__":
+    sys.exit(main("history", run, __doc__, iterations=5, warmup=1, add_arguments=add_arguments))
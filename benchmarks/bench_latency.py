@@ -0,0 +1,46 @@
+"""Round-trip latency of single commands through the REPL"""
+import shutil
+import sys
+
+from bench_utils import main, measure, summarize
+from shell_test_utils import ShellTester, create_test_environment, cleanup_test_environment, write_file
+
+BUILTINS = [
+    "echo Hello World",
+    "pwd",
+    "type echo",
+    "type cat",
+    "history 10",
+]
+
+EXTERNALS = [
+    "true",
+    "ls -d /",
+]
+
+
+def run(shell_executable, args):
+    """Measure the time from sending a command until the shell is ready for the next one"""
+    tmp_dir = create_test_environment()
+    history_file = f"{tmp_dir}/history"
+    write_file(history_file, "")
+
+    commands = list(BUILTINS)
+    commands += [command for command in EXTERNALS if shutil.which(command.split()[0])]
+
+    results = {}
+    shell_tester = ShellTester(shell_executable)
+    shell_tester.start_shell(env={"HISTFILE": history_file})
+    try:
+        for command in commands:
+            samples = measure(lambda: shell_tester.execute(command), args.iterations, args.warmup)
+            results[command] = summarize(samples, "us")
+    finally:
+        shell_tester.stop()
+        cleanup_test_environment(tmp_dir)
+
+    return results
+
+
+if __name__ == "__main__":
+    sys.exit(main("latency", run, __doc__))
@@ -0,0 +1,90 @@
+"""Write syscalls and time of output heavy builtins"""
+import os
+import subprocess
+import sys
+import time
+
+from bench_utils import main, summarize, create_history_file, proc_io
+from shell_test_utils import ShellTester, create_test_environment, cleanup_test_environment, write_file
+
+
+def add_arguments(parser):
+    parser.add_argument("--history", type=int, default=1000000, help="number of history entries to print")
+    parser.add_argument("--lines", type=int, default=100000, help="number of echo lines in the script")
+
+
+def bench_history(shell_executable, tmp_dir, args):
+    """Print the whole history through the REPL and count the shell's write syscalls"""
+    history_file = f"{tmp_dir}/history"
+    create_history_file(history_file, args.history)
+
+    durations = []
+    writes = []
+    shell_tester = ShellTester(shell_executable)
+    shell_tester.start_shell(env={"HISTFILE": history_file}, timeout=600)
+    try:
+        for i in range(args.warmup + args.iterations):
+            before = proc_io(shell_tester.process.pid).get("syscw", 0)
+            start = time.perf_counter_ns()
+            shell_tester.execute(f"history {args.history}", timeout=600)
+            duration = (time.perf_counter_ns() - start) / 1000
+            after = proc_io(shell_tester.process.pid).get("syscw", 0)
+
+            if i >= args.warmup:
+                durations.append(duration)
+                writes.append(after - before)
+    finally:
+        shell_tester.stop()
+
+    return durations, writes
+
+
+def bench_echo_script(shell_executable, tmp_dir, args):
+    """Run a script of echo lines and count the shell's write syscalls
+
+    The script ends with cat, which waits for stdin, so the counters can be read while the shell is still running.
+    """
+    script_path = f"{tmp_dir}/script.sh"
+    write_file(script_path, "echo Hello World from an echo heavy script\n" * args.lines + "cat\n")
+
+    durations = []
+    writes = []
+    for i in range(args.warmup + args.iterations):
+        start = time.perf_counter_ns()
+        process = subprocess.Popen([shell_executable, script_path], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                   text=True, cwd=os.path.dirname(shell_executable) or ".")
+        try:
+            for _ in range(args.lines):
+                process.stdout.readline()
+            duration = (time.perf_counter_ns() - start) / 1000
+            counters = proc_io(process.pid)
+        finally:
+            process.stdin.close()
+            process.wait()
+
+        if i >= args.warmup:
+            durations.append(duration)
+            writes.append(counters.get("syscw", 0))
+
+    return durations, writes
+
+
+def run(shell_executable, args):
+    tmp_dir = create_test_environment()
+    results = {}
+    try:
+        for case, bench, size in [(f"history {args.history}", bench_history, args.history),
+                                  (f"echo script {args.lines}", bench_echo_script, args.lines)]:
+            durations, writes = bench(shell_executable, tmp_dir, args)
+            result = summarize(durations, "us")
+            result["write_syscalls"] = max(writes)
+            result["lines"] = size
+            results[case] = result
+    finally:
+        cleanup_test_environment(tmp_dir)
+
+    return results
+
+
+if __name__ == "__main__":
+    sys.exit(main("output", run, __doc__, iterations=5, warmup=1, add_arguments=add_arguments))
@@ -0,0 +1,77 @@
+"""Parser throughput on the quoting and escaping commands of the tests"""
+import ast
+import os
+import sys
+import time
+
+from bench_utils import main, summarize
+from shell_test_utils import run_script
+
+TESTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests")
+CORPORA = ["test_quotes.py", "test_escaping.py"]
+
+
+def add_arguments(parser):
+    parser.add_argument("--lines", type=int, default=100000, help="number of lines per script")
+
+
+def load_corpus(file_name):
+    """Collect the commands passed to execute() in a test module, f-string fields become a fixed path"""
+    with open(os.path.join(TESTS_DIR, file_name)) as f:
+        tree = ast.parse(f.read())
+
+    commands = []
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "execute"):
+            continue
+
+        argument = node.args[0]
+        if isinstance(argument, ast.Constant) and isinstance(argument.value, str):
+            commands.append(argument.value)
+        elif isinstance(argument, ast.JoinedStr):
+            commands.append("".join(value.value if isinstance(value, ast.Constant) else "/tmp/corpus"
+                                    for value in argument.values))
+    return commands
+
+
+def lines_per_second(shell_executable, script, lines, args):
+    samples = []
+    for i in range(args.warmup + args.iterations):
+        start = time.perf_counter()
+        code, output = run_script(shell_executable, script, timeout=600)
+        duration = time.perf_counter() - start
+        if code != 0:
+            raise RuntimeError(f"Script failed with exit code {code}: {output[-5:]}")
+        if i >= args.warmup:
+            samples.append(lines / duration)
+    return samples
+
+
+def run(shell_executable, args):
+    """Every line is parsed completely, but the commands after || never run
+
+    The baseline only runs the cheap builtin before ||, the difference to it is the parsing cost.
+    """
+    results = {}
+
+    baseline = summarize(lines_per_second(shell_executable, "cd .\n" * args.lines, args.lines, args), "lines/s",
+                         higher_is_better=True)
+    results["baseline"] = baseline
+
+    for corpus in CORPORA:
+        commands = load_corpus(corpus)
+        lines = [f"cd . || {commands[i % len(commands)]}\n" for i in range(args.lines)]
+        script = "".join(lines)
+
+        result = summarize(lines_per_second(shell_executable, script, args.lines, args), "lines/s",
+                           higher_is_better=True)
+        result["commands"] = len(commands)
+        result["bytes_per_line"] = round(len(script) / args.lines, 1)
+        result["parse_us_per_line"] = round(max(1e6 / result["p50"] - 1e6 / baseline["p50"], 0), 2)
+        results[corpus.removesuffix(".py")] = result
+
+    return results
+
+
+if __name__ == "__main__":
+    sys.exit(main("parser", run, __doc__, iterations=5, warmup=1, add_arguments=add_arguments))
@@ -0,0 +1,138 @@
+"""Throughput of multi-stage pipelines"""
+import os
+import sys
+import threading
+
+from bench_utils import main, measure, summarize
+from shell_test_utils import ShellTester, create_test_environment, cleanup_test_environment
+
+MB = 1024 * 1024
+
+
+def add_arguments(parser):
+    parser.add_argument("--sizes", default="1,16,256",
+                        help="comma separated data sizes in MB pushed through the pipelines")
+    parser.add_argument("--stages", default="1,2,4,8,16,32,64",
+                        help="comma separated numbers of pipeline stages")
+
+
+def create_data_file(path, size):
+    """Write size bytes of line based text to path"""
+    line = b"the quick brown fox jumps over the lazy dog 0123456789\n"
+    chunk = line * (MB // len(line) + 1)
+    with open(path, "wb") as f:
+        remaining = size
+        while remaining > 0:
+            written = f.write(chunk[:min(remaining, len(chunk))])
+            remaining -= written
+
+
+def build_pipeline(data_file, size, stages, middle):
+    """Build a pipeline with `stages` processes that reads data_file and counts its bytes"""
+    if stages == 1:
+        return f"wc -c {data_file}"
+
+    middle_stages = [middle.format(size=size) for _ in range(stages - 2)]
+    return " | ".join([f"cat {data_file}"] + middle_stages + ["wc -c"])
+
+
+class FdSampler:
+    """Samples the number of open fds of a process in the background and keeps the maximum
+
+    Samples are taken every interval seconds. Sampling in a tight loop would take a CPU and the GIL away from the
+    pipeline and the harness, so the benchmark would mostly measure the sampler.
+    """
+
+    def __init__(self, pid, interval=0.001):
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def count(self):
+        try:
+            return len(os.listdir(f"/proc/{self.pid}/fd"))
+        except OSError:
+            return 0
+
+    def _sample(self):
+        while True:
+            self.peak = max(self.peak, self.count())
+            if self.stopped.wait(self.interval):
+                break
+
+    def __enter__(self):
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._sample, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stopped.set()
+        self.thread.join()
+
+
+def run(shell_executable, args):
+    """Measure MB/s for every combination of data size and stage count"""
+    sizes = [int(size) for size in args.sizes.split(",")]
+    stage_counts = [int(stages) for stages in args.stages.split(",")]
+
+    tmp_dir = create_test_environment()
+    results = {}
+    shell_tester = ShellTester(shell_executable)
+    shell_tester.start_shell()
+    try:
+        pid = shell_tester.process.pid
+        idle_fds = FdSampler(pid).count()
+
+        for size_mb in sizes:
+            size = size_mb * MB
+            data_file = f"{tmp_dir}/data_{size_mb}"
+            create_data_file(data_file, size)
+
+            for kind, middle in [("cat", "cat"), ("head", "head -c {size}")]:
+                for stages in stage_counts:
+                    if kind == "head" and stages < 3:
+                        continue
+
+                    command = build_pipeline(data_file, size, stages, middle)
+
+                    def run_pipeline():
+                        output = shell_tester.execute(command, timeout=600)
+                        assert output == [f"{size}\n"] or output[0].startswith(f"{size} "), \
+                            f"Unexpected output {output} for {command}"
+
+                    with FdSampler(pid) as sampler:
+                        samples = measure(run_pipeline, args.iterations, args.warmup)
+
+                    result = summarize([size / MB / (duration / 1e6) for duration in samples], "MB/s",
+                                       higher_is_better=True)
+                    result["stages"] = stages
+                    result["size_mb"] = size_mb
+                    result["peak_fds"] = sampler.peak
+                    result["fds_after"] = sampler.count()
+                    result["idle_fds"] = idle_fds
+                    results[f"{kind} {size_mb}MB x{stages}"] = result
+
+            os.remove(data_file)
+
+        # builtins at either end of a pipeline do not pass data on, so only their latency matters
+        for stages in stage_counts:
+            if stages < 2:
+                continue
+            for kind, command in [
+                ("echo", " | ".join(["echo Hello World"] + ["cat"] * (stages - 1))),
+                ("type", " | ".join(["echo Hello World"] + ["cat"] * (stages - 2) + ["type cat"])),
+            ]:
+                samples = measure(lambda: shell_tester.execute(command), args.iterations, args.warmup)
+                results[f"builtin {kind} x{stages}"] = summarize(samples, "us")
+    finally:
+        shell_tester.stop()
+        cleanup_test_environment(tmp_dir)
+
+    return results
+
+
+if __name__ == "__main__":
+    sys.exit(main("pipeline", run, __doc__, iterations=5, warmup=1, add_arguments=add_arguments))
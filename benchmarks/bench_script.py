@@ -0,0 +1,48 @@
+"""Throughput of non-interactive command execution"""
+import sys
+import time
+
+from bench_utils import main, summarize
+from shell_test_utils import run_script
+
+WORKLOADS = {
+    "echo": "echo Hello World\n",
+    "type": "type echo\n",
+    "blank": "\n",
+}
+
+
+def add_arguments(parser):
+    parser.add_argument("--lines", type=int, default=100000, help="number of lines per script")
+
+
+def run(shell_executable, args):
+    """Measure lines/sec of scripts passed as a file, with -c and through stdin"""
+    results = {}
+    for workload, line in WORKLOADS.items():
+        script = line * args.lines
+        for mode in ["file", "c", "stdin"]:
+            # a single argument is limited to 128 KiB on Linux
+            if mode == "c" and len(script) >= 128 * 1024:
+                continue
+
+            samples = []
+            for i in range(args.warmup + args.iterations):
+                start = time.perf_counter()
+                code, output = run_script(shell_executable, script, env={"HISTFILE": "/dev/null"}, mode=mode,
+                                          timeout=600)
+                duration = time.perf_counter() - start
+                if code != 0:
+                    raise RuntimeError(f"Script failed with exit code {code}: {output[-5:]}")
+                if i >= args.warmup:
+                    samples.append(args.lines / duration)
+
+            result = summarize(samples, "lines/s", higher_is_better=True)
+            result["lines"] = args.lines
+            results[f"{workload} {mode}"] = result
+
+    return results
+
+
+if __name__ == "__main__":
+    sys.exit(main("script", run, __doc__, iterations=5, warmup=1, add_arguments=add_arguments))
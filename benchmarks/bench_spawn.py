@@ -0,0 +1,58 @@
+"""Latency of launching external commands depending on the RSS of the shell"""
+import shutil
+import sys
+
+from bench_utils import main, measure, summarize, create_path_tree, create_history_file, proc_status
+from shell_test_utils import ShellTester, create_test_environment, cleanup_test_environment
+
+
+def add_arguments(parser):
+    parser.add_argument("--history", default="0,100000,1000000",
+                        help="comma separated numbers of lines in HISTFILE, all are kept in memory")
+    parser.add_argument("--executables", default="0,100000",
+                        help="comma separated numbers of executables in PATH")
+
+
+def run(shell_executable, args):
+    """Inflate the shell with history and a large PATH, then measure round trips of an external command
+
+    The builtin echo is measured as well, the difference to it is the cost of launching the process.
+    """
+    history_sizes = [int(lines) for lines in args.history.split(",")]
+    executable_counts = [int(executables) for executables in args.executables.split(",")]
+    system_path = ":".join(sorted({shutil.which("true").rsplit("/", 1)[0], "/usr/bin", "/bin"}))
+
+    tmp_dir = create_test_environment()
+    results = {}
+    try:
+        for executables in executable_counts:
+            path = create_path_tree(f"{tmp_dir}/path_{executables}", 10, executables)
+
+            for lines in history_sizes:
+                history_file = f"{tmp_dir}/history_{lines}"
+                create_history_file(history_file, lines)
+                env = {"PATH": f"{path}:{system_path}", "HISTFILE": history_file, "HISTSIZE": str(lines + 1000000),
+                       "HOME": tmp_dir}
+
+                shell_tester = ShellTester(shell_executable)
+                shell_tester.start_shell(env=env, timeout=600)
+                try:
+                    # completing waits for the PATH scan and builds the completion index
+                    shell_tester.execute("no_such_command\t", timeout=600)
+                    rss = proc_status(shell_tester.process.pid, "VmRSS")
+
+                    for command in ["true", "echo"]:
+                        samples = measure(lambda: shell_tester.execute(command), args.iterations, args.warmup)
+                        result = summarize(samples, "us")
+                        result["rss_kb"] = rss
+                        results[f"{command} exe={executables} hist={lines}"] = result
+                finally:
+                    shell_tester.stop()
+    finally:
+        cleanup_test_environment(tmp_dir)
+
+    return results
+
+
+if __name__ == "__main__":
+    sys.exit(main("spawn", run, __doc__, iterations=200, warmup=20, add_arguments=add_arguments))
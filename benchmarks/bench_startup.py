@@ -0,0 +1,90 @@
+"""Startup time and memory depending on PATH and history size
+
+"ready" is the time until the shell reads its first command, which does not wait for the PATH scan. "scanned" is the
+time until a first tab completion returned, which waits for the scan, and the peak RSS is read after it. Every start
+scans PATH without a cache file, bench_executables_cache measures the cached scan.
+"""
+import os
+import shutil
+import sys
+import time
+
+from bench_utils import main, summarize, create_path_tree, create_history_file, proc_status
+from shell_test_utils import ShellTester, create_test_environment, cleanup_test_environment
+
+
+def add_arguments(parser):
+    parser.add_argument("--dirs", default="1,10,100", help="comma separated numbers of PATH directories")
+    parser.add_argument("--executables", default="0,1000,10000,100000",
+                        help="comma separated numbers of executables spread over the PATH directories")
+    parser.add_argument("--history", default="0,10000,1000000",
+                        help="comma separated numbers of lines in HISTFILE")
+
+
+def measure_startup(shell_executable, env, iterations, warmup):
+    """Start the shell repeatedly and return the times until it is ready and until the PATH scan finished in
+    microseconds and the peak RSS after the scan in kB
+    """
+    ready = []
+    scanned = []
+    peak_rss = []
+    for i in range(warmup + iterations):
+        shutil.rmtree(env["XDG_CACHE_HOME"], ignore_errors=True)
+        shell_tester = ShellTester(shell_executable)
+        start = time.perf_counter_ns()
+        shell_tester.start_shell(env=env, timeout=600)
+        ready_duration = (time.perf_counter_ns() - start) / 1000
+
+        # completion waits for the scan, "ech" only matches the echo builtin in the generated PATH
+        output = shell_tester.execute("ech\t", timeout=600)
+        scanned_duration = (time.perf_counter_ns() - start) / 1000
+        rss = proc_status(shell_tester.process.pid, "VmHWM")
+        shell_tester.stop()
+        assert output == ["\n"], f"Expected the completed echo to print an empty line but got {output}"
+
+        if i >= warmup:
+            ready.append(ready_duration)
+            scanned.append(scanned_duration)
+            peak_rss.append(rss)
+    return ready, scanned, peak_rss
+
+
+def run(shell_executable, args):
+    """Measure the startup of the shell for every PATH and history size combination"""
+    dir_counts = [int(dirs) for dirs in args.dirs.split(",")]
+    executable_counts = [int(executables) for executables in args.executables.split(",")]
+    history_sizes = [int(lines) for lines in args.history.split(",")]
+
+    tmp_dir = create_test_environment()
+    results = {}
+    try:
+        history_files = {}
+        for lines in history_sizes:
+            history_files[lines] = f"{tmp_dir}/history_{lines}"
+            create_history_file(history_files[lines], lines)
+
+        for dirs in dir_counts:
+            for executables in executable_counts:
+                path = create_path_tree(f"{tmp_dir}/path_{dirs}_{executables}", dirs, executables)
+
+                for lines in history_sizes:
+                    env = {"PATH": path, "HISTFILE": history_files[lines], "HOME": tmp_dir,
+                           "XDG_CACHE_HOME": os.path.join(tmp_dir, "cache")}
+                    ready, scanned, peak_rss = measure_startup(shell_executable, env, args.iterations, args.warmup)
+
+                    for name, durations in (("ready", ready), ("scanned", scanned)):
+                        result = summarize(durations, "us")
+                        result["dirs"] = dirs
+                        result["executables"] = executables
+                        result["history"] = lines
+                        if name == "scanned":
+                            result["peak_rss_kb"] = max(peak_rss)
+                        results[f"{name} dirs={dirs} exe={executables} hist={lines}"] = result
+    finally:
+        cleanup_test_environment(tmp_dir)
+
+    return results
+
+
+if __name__ == "__main__":
+    sys.exit(main("startup", run, __doc__, iterations=10, warmup=1, add_arguments=add_arguments))
@@ -0,0 +1,161 @@
+"""Utility functions for shell benchmarks"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+# the benchmarks drive the shell through the test harness
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests"))
+
+
+def percentile(sorted_samples, p):
+    """Return the p-th percentile of already sorted samples using linear interpolation"""
+    if not sorted_samples:
+        return math.nan
+    k = (len(sorted_samples) - 1) * p / 100
+    lower = math.floor(k)
+    upper = math.ceil(k)
+    return sorted_samples[lower] + (sorted_samples[upper] - sorted_samples[lower]) * (k - lower)
+
+
+def summarize(samples, unit, higher_is_better=False):
+    """Summarize raw samples into the result format written by write_results"""
+    sorted_samples = sorted(samples)
+    return {
+        "unit": unit,
+        "higher_is_better": higher_is_better,
+        "count": len(samples),
+        "min": sorted_samples[0] if samples else math.nan,
+        "mean": sum(samples) / len(samples) if samples else math.nan,
+        "p50": percentile(sorted_samples, 50),
+        "p90": percentile(sorted_samples, 90),
+        "p99": percentile(sorted_samples, 99),
+        "max": sorted_samples[-1] if samples else math.nan,
+        "samples": samples,
+    }
+
+
+def create_path_tree(root, dirs, executables, prefix="cmd"):
+    """Create `dirs` directories under root with `executables` executables spread across them
+
+    Returns the PATH value for the tree.
+    """
+    path = []
+    for i in range(dirs):
+        directory = os.path.join(root, f"bin{i}")
+        os.makedirs(directory, exist_ok=True)
+        path.append(directory)
+
+    for i in range(executables):
+        file_path = os.path.join(path[i % dirs], f"{prefix}{i:06d}")
+        with open(file_path, "w") as f:
+            f.write("#!/bin/sh\n")
+        os.chmod(file_path, 0o755)
+
+    return ":".join(path)
+
+
+def create_history_file(path, lines):
+    """Write a history file with `lines` distinct entries"""
+    with open(path, "w") as f:
+        batch = 10000
+        for start in range(0, lines, batch):
+            f.write("".join(f"echo history entry {i}\n" for i in range(start, min(start + batch, lines))))
+
+
+def proc_status(pid, key):
+    """Read a value in kB like VmHWM or VmRSS from /proc/<pid>/status"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(key + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def proc_io(pid):
+    """Read the counters of /proc/<pid>/io, like syscw for the number of write syscalls"""
+    counters = {}
+    try:
+        with open(f"/proc/{pid}/io") as f:
+            for line in f:
+                key, value = line.split(":")
+                counters[key] = int(value)
+    except OSError:
+        pass
+    return counters
+
+
+def measure(fn, iterations, warmup=0):
+    """Call fn warmup + iterations times and return the durations of the measured calls in microseconds"""
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter_ns()
+        fn()
+        samples.append((time.perf_counter_ns() - start) / 1000)
+    return samples
+
+
+def pin_cpu(cpu):
+    """Pin the current process, and every shell started afterwards, to one CPU"""
+    if cpu is None:
+        return
+    if not hasattr(os, "sched_setaffinity"):
+        print("CPU pinning is not supported on this platform", file=sys.stderr)
+        return
+    os.sched_setaffinity(0, {cpu})
+
+
+def parse_args(description, iterations=1000, warmup=100, add_arguments=None):
+    """Parse the arguments shared by all benchmarks
+
+    add_arguments can add benchmark specific arguments to the parser.
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("shell_executable", help="path to the compiled shell executable")
+    parser.add_argument("-n", "--iterations", type=int, default=iterations, help="number of measured iterations")
+    parser.add_argument("-w", "--warmup", type=int, default=warmup, help="number of iterations before measuring")
+    parser.add_argument("--cpu", type=int, default=None, help="pin the benchmark and the shell to this CPU")
+    parser.add_argument("--json", default=None, help="write the results including raw samples to this file")
+    if add_arguments:
+        add_arguments(parser)
+    return parser.parse_args()
+
+
+SUMMARY_KEYS = {"unit", "higher_is_better", "count", "min", "mean", "p50", "p90", "p99", "max", "samples"}
+
+
+def write_results(name, results, json_path=None):
+    """Print a table of the results and optionally write them as JSON
+
+    Keys a benchmark added to a result besides the summary are printed after the percentiles.
+    """
+    print(f"{name}")
+    print(f"{'case':<40} {'unit':>8} {'p50':>12} {'p90':>12} {'p99':>12} {'max':>12}")
+    for case, result in results.items():
+        extra = " ".join(f"{key}={value}" for key, value in result.items() if key not in SUMMARY_KEYS)
+        print(f"{case:<40} {result['unit']:>8} {result['p50']:>12.1f} {result['p90']:>12.1f} "
+              f"{result['p99']:>12.1f} {result['max']:>12.1f}  {extra}".rstrip())
+
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump({"benchmark": name, "results": results}, f, indent=2)
+
+
+def main(name, run, description, **defaults):
+    """Parse the arguments, run a benchmark and report its results
+
+    run is called with the shell executable and the parsed arguments and returns a dict of results.
+    """
+    args = parse_args(description, **defaults)
+    pin_cpu(args.cpu)
+    results = run(args.shell_executable, args)
+    write_results(name, results, args.json)
+    return 0
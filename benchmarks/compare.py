@@ -0,0 +1,247 @@
+"""Compare the benchmarks of two shell executables, or of one against a stored baseline
+
+Every round runs each benchmark script once per shell, alternating which shell goes first, so drift of the machine
+hits both alike. The iterations of one run share the state of the machine and are not independent, so each run only
+contributes its median. The medians of the runs are compared with a Mann-Whitney U test. A case regresses if the
+median of its runs got worse by more than --threshold percent and the difference is significant at --alpha.
+"""
+import argparse
+import datetime
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+
+from bench_utils import percentile
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def discover_benchmarks():
+    """Return the names of all benchmark scripts, like bench_latency"""
+    return sorted(filename[:-3] for filename in os.listdir(BENCHMARK_DIR)
+                  if filename.startswith("bench_") and filename.endswith(".py") and filename != "bench_utils.py")
+
+
+def run_benchmark(benchmark, shell_executable, args):
+    """Run one benchmark script against a shell and return its results by case"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_path = os.path.join(tmp_dir, "results.json")
+        command = [sys.executable, os.path.join(BENCHMARK_DIR, f"{benchmark}.py"), shell_executable,
+                   "--json", json_path]
+        if args.iterations is not None:
+            command += ["-n", str(args.iterations)]
+        if args.warmup is not None:
+            command += ["-w", str(args.warmup)]
+        if args.cpu is not None:
+            command += ["--cpu", str(args.cpu)]
+
+        subprocess.run(command, stdout=subprocess.DEVNULL, check=True)
+        with open(json_path) as f:
+            return json.load(f)["results"]
+
+
+def add_run(collected, benchmark, results):
+    """Append the median of every case of one run to the medians collected over all rounds"""
+    for case, result in results.items():
+        entry = collected.setdefault(benchmark, {}).setdefault(case, {
+            "unit": result["unit"],
+            "higher_is_better": result["higher_is_better"],
+            "runs": [],
+        })
+        samples = sorted(sample for sample in result["samples"] if not math.isnan(sample))
+        if samples:
+            entry["runs"].append(percentile(samples, 50))
+
+
+def minimum_p_value(n1, n2):
+    """Return the smallest two-sided p-value the U test can reach with n1 and n2 runs"""
+    return min(1.0, 2 / math.comb(n1 + n2, n1))
+
+
+def minimum_rounds(alpha):
+    """Return the number of rounds per shell needed to reach a significance of alpha at all"""
+    rounds = 1
+    while minimum_p_value(rounds, rounds) >= alpha:
+        rounds += 1
+    return rounds
+
+
+def exact_u_distribution(n1, n2):
+    """Return the number of orderings of n1 and n2 distinct values for every value of U"""
+    # counts[m][u] for the current n, built up by adding the values of the second sample one at a time
+    counts = [[1] + [0] * (n1 * n2) for _ in range(n1 + 1)]
+    for n in range(1, n2 + 1):
+        previous = counts
+        counts = [[0] * (n1 * n2 + 1) for _ in range(n1 + 1)]
+        counts[0][0] = 1
+        for m in range(1, n1 + 1):
+            for u in range(m * n + 1):
+                # the largest value is either from the first sample, above all n values, or from the second one
+                counts[m][u] = (counts[m - 1][u - n] if u >= n else 0) + previous[m][u]
+    return counts[n1]
+
+
+def mann_whitney_u(first, second):
+    """Return the two-sided p-value of a Mann-Whitney U test of two samples
+
+    Without ties the p-value is exact, with ties it uses the normal approximation with tie and continuity correction.
+    """
+    n1, n2 = len(first), len(second)
+    if n1 == 0 or n2 == 0:
+        return math.nan
+
+    # rank both samples together, ties get the average of their ranks
+    values = sorted([(value, 0) for value in first] + [(value, 1) for value in second])
+    ranks = [0.0] * len(values)
+    tie_term = 0
+    i = 0
+    while i < len(values):
+        j = i
+        while j + 1 < len(values) and values[j + 1][0] == values[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        tie_term += (j - i + 1) ** 3 - (j - i + 1)
+        i = j + 1
+
+    rank_sum = sum(rank for rank, (_, group) in zip(ranks, values) if group == 0)
+    u = rank_sum - n1 * (n1 + 1) / 2
+
+    if tie_term == 0:
+        distribution = exact_u_distribution(n1, n2)
+        total = sum(distribution)
+        lower = sum(distribution[:int(u) + 1]) / total
+        upper = sum(distribution[int(u):]) / total
+        return min(1.0, 2 * min(lower, upper))
+
+    mean = n1 * n2 / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1))) if n > 1 else 0
+    if variance <= 0:
+        return 1.0
+
+    z = (abs(u - mean) - 0.5) / math.sqrt(variance)
+    return min(1.0, math.erfc(max(z, 0) / math.sqrt(2)))
+
+
+def compare(baseline, candidate, threshold, alpha):
+    """Compare the run medians of every case both sides have, returns a list of rows"""
+    rows = []
+    for benchmark, cases in candidate.items():
+        for case, result in cases.items():
+            base = baseline.get(benchmark, {}).get(case)
+            if base is None or not base["runs"] or not result["runs"]:
+                continue
+
+            base_p50 = percentile(sorted(base["runs"]), 50)
+            candidate_p50 = percentile(sorted(result["runs"]), 50)
+            change = (candidate_p50 - base_p50) / base_p50 * 100 if base_p50 else 0.0
+            p_value = mann_whitney_u(base["runs"], result["runs"])
+
+            # a change within the threshold or without significance is noise
+            worse = -change if result["higher_is_better"] else change
+            verdict = ""
+            if abs(change) > threshold and p_value < alpha:
+                verdict = "regression" if worse > 0 else "improvement"
+
+            rows.append({
+                "benchmark": benchmark,
+                "case": case,
+                "unit": result["unit"],
+                "baseline_p50": base_p50,
+                "candidate_p50": candidate_p50,
+                "change_percent": change,
+                "p_value": p_value,
+                "runs": [len(base["runs"]), len(result["runs"])],
+                "verdict": verdict,
+            })
+    return rows
+
+
+def print_rows(rows):
+    print(f"{'benchmark':<26} {'case':<40} {'unit':>8} {'baseline':>12} {'candidate':>12} {'change':>8} "
+          f"{'p':>8}  verdict")
+    for row in rows:
+        print(f"{row['benchmark']:<26} {row['case']:<40} {row['unit']:>8} {row['baseline_p50']:>12.1f} "
+              f"{row['candidate_p50']:>12.1f} {row['change_percent']:>+7.1f}% {row['p_value']:>8.4f}  "
+              f"{row['verdict']}".rstrip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("shells", nargs="+", metavar="shell_executable",
+                        help="the baseline and the candidate shell, or only the candidate with --baseline")
+    parser.add_argument("--baseline", help="compare the shell against the run medians stored in this file")
+    parser.add_argument("--save-baseline", help="store the run medians of the last given shell in this file")
+    parser.add_argument("-b", "--bench", action="append",
+                        help="benchmark to run, like bench_latency, can be repeated, all by default")
+    parser.add_argument("-r", "--rounds", type=int, default=6,
+                        help="runs of every benchmark per shell, each run is one observation of the test")
+    parser.add_argument("-n", "--iterations", type=int, default=None, help="measured iterations per run")
+    parser.add_argument("-w", "--warmup", type=int, default=None, help="warmup iterations per run")
+    parser.add_argument("--cpu", type=int, default=None, help="pin the benchmarks and the shells to this CPU")
+    parser.add_argument("-t", "--threshold", type=float, default=5.0,
+                        help="change of the median in percent above which a significant change counts")
+    parser.add_argument("--alpha", type=float, default=0.01, help="significance level of the test")
+    parser.add_argument("--json", help="write the comparison to this file")
+    args = parser.parse_args()
+
+    if len(args.shells) > 2:
+        parser.error("expected at most two shell executables")
+    if len(args.shells) == 2 and args.baseline:
+        parser.error("--baseline compares a single shell")
+    if len(args.shells) == 1 and not args.baseline and not args.save_baseline:
+        parser.error("a single shell needs --baseline or --save-baseline")
+    if (len(args.shells) == 2 or args.baseline) and args.rounds < minimum_rounds(args.alpha):
+        parser.error(f"a significance of {args.alpha} needs at least {minimum_rounds(args.alpha)} rounds")
+
+    benchmarks = args.bench or discover_benchmarks()
+    runs = [{} for _ in args.shells]
+    for round_number in range(args.rounds):
+        for benchmark in benchmarks:
+            # alternate the order, so neither shell always runs on a warmer or cooler machine
+            order = list(range(len(args.shells)))
+            if round_number % 2:
+                order.reverse()
+
+            for index in order:
+                print(f"round {round_number + 1}/{args.rounds} {benchmark} {args.shells[index]}", file=sys.stderr)
+                add_run(runs[index], benchmark, run_benchmark(benchmark, args.shells[index], args))
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({"shell": args.shells[-1], "created": datetime.datetime.now().isoformat(timespec="seconds"),
+                       "benchmarks": runs[-1]}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["benchmarks"]
+
+        rounds = min((len(result["runs"]) for cases in baseline.values() for result in cases.values()), default=0)
+        if minimum_p_value(rounds, args.rounds) >= args.alpha:
+            print(f"{args.baseline} has only {rounds} runs, too few for a significance of {args.alpha}",
+                  file=sys.stderr)
+            return 2
+    elif len(args.shells) == 2:
+        baseline = runs[0]
+    else:
+        return 0
+
+    rows = compare(baseline, runs[-1], args.threshold, args.alpha)
+    print_rows(rows)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"threshold_percent": args.threshold, "alpha": args.alpha, "cases": rows}, f, indent=2)
+
+    regressions = [row for row in rows if row["verdict"] == "regression"]
+    if regressions:
+        print(f"\n{len(regressions)} regressions beyond {args.threshold}%")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,100 +1,602 @@
 #include "commands.h"
 
+#include <atomic>
+#include <charconv>
+#include <cstring>
+#include <fcntl.h>
 #include <fstream>
+#include <iomanip>
 #include <iostream>
+#include <sstream>
+#include <string_view>
+#include <thread>
+#include <spawn.h>
+#include <sys/stat.h>
+#include <sys/wait.h>
 
 #include "utils.h"
 
+std::thread executables_thread;
+std::atomic<bool> executables_ready = false;
+
 int stdout_fd = -1;
+bool stdout_redirected = false;
 int stdin_fd = -1;
 int stderr_fd = -1;
 
+// buffer size for reading and writing history files
+constexpr size_t history_io_buffer_size = 1 << 16;
+// finished jobs kept for jobs and wait when they are not reported before a prompt
+constexpr size_t max_finished_jobs = 1024;
+
+void add_history(const std::string &entry) {
+    if (!history_enabled) {
+        return;
+    }
+
+    history_cache.push_back(entry);
+    history_index = history_cache.size();
+}
+
+std::string history_file_path() {
+    const char *history_file = getenv("HISTFILE");
+    if (history_file == nullptr) {
+        return std::string(getenv("HOME")) + "/.shell_history";
+    }
+    return history_file;
+}
+
+inline size_t parse_history_size(const char *value) {
+    // like bash an unset, non-numeric or too large value means no limit
+    if (value == nullptr || !is_number(value)) {
+        return std::numeric_limits<size_t>::max();
+    }
+
+    size_t size;
+    const char *value_end = value + strlen(value);
+    if (const auto [end, error] = std::from_chars(value, value_end, size); error != std::errc() || end != value_end) {
+        return std::numeric_limits<size_t>::max();
+    }
+    return size;
+}
+
+void configure_history() {
+    history_cache.set_max_size(parse_history_size(getenv("HISTSIZE")));
+    history_file_size = parse_history_size(getenv("HISTFILESIZE"));
+}
+
 void read_history(const std::string &file_path) {
-    std::ifstream file(file_path);
+    std::vector<char> buffer(history_io_buffer_size);
+    std::ifstream file;
+    file.rdbuf()->pubsetbuf(buffer.data(), static_cast<std::streamsize>(buffer.size()));
+    file.open(file_path);
     if (!file.is_open()) {
         // std::cout << "history: " << file_path << ": No such file or directory" << std::endl;
         return;
     }
 
-    std::string buffer;
-    while (std::getline(file, buffer)) {
-        history_cache.push_back(buffer);
+    // the ring buffer only keeps the last HISTSIZE lines while streaming through the file
+    std::string line;
+    while (std::getline(file, line)) {
+        history_cache.push_back(std::move(line));
     }
+    history_index = history_cache.size();
 
     file.close();
 }
 
+inline void write_entries(std::ofstream &file, size_t first) {
+    for (size_t i = first; i < history_cache.size(); i++) {
+        file << history_cache[i] << '\n';
+    }
+}
+
 void write_history(const std::string &file_path) {
-    std::ofstream file(file_path);
+    std::vector<char> buffer(history_io_buffer_size);
+    std::ofstream file;
+    file.rdbuf()->pubsetbuf(buffer.data(), static_cast<std::streamsize>(buffer.size()));
+    file.open(file_path);
     if (!file.is_open()) {
         // std::cout << "history: " << file_path << ": No such file or directory" << std::endl;
         return;
     }
 
-    for (const std::string &entry: history_cache) {
-        file << entry << std::endl;
-    }
+    const size_t count = std::min(history_cache.size(), history_file_size);
+    write_entries(file, history_cache.size() - count);
+    history_appended = history_cache.base() + history_cache.size();
 
     file.close();
 }
 
 void append_history(const std::string &file_path) {
-    std::ofstream file(file_path, std::ios::app);
+    std::vector<char> buffer(history_io_buffer_size);
+    std::ofstream file;
+    file.rdbuf()->pubsetbuf(buffer.data(), static_cast<std::streamsize>(buffer.size()));
+    file.open(file_path, std::ios::app);
     if (!file.is_open()) {
         // std::cout << "history: " << file_path << ": No such file or directory" << std::endl;
         return;
     }
 
-    for (const std::string &entry: history_cache) {
-        file << entry << std::endl;
+    // only append the entries added since the last append
+    const size_t first = history_appended > history_cache.base() ? history_appended - history_cache.base() : 0;
+    write_entries(file, std::min(first, history_cache.size()));
+    history_appended = history_cache.base() + history_cache.size();
+
+    file.close();
+}
+
+// executables of one PATH directory together with the state of the directory when it was scanned
+struct scanned_directory {
+    timespec mtime{};
+    ino_t inode = 0;
+    std::vector<std::string> names;
+};
+
+std::string executables_cache_file() {
+    if (const char *cache_home = getenv("XDG_CACHE_HOME"); cache_home != nullptr && *cache_home != '\0') {
+        return std::string(cache_home) + "/shell/executables";
+    }
+
+    if (const char *home = getenv("HOME"); home != nullptr && *home != '\0') {
+        return std::string(home) + "/.cache/shell/executables";
+    }
+    return "";
+}
+
+// The file consists of one block per directory: a line with "<mtime sec> <mtime nsec> <inode> <directory>", a line
+// per executable name and an empty line.
+std::unordered_map<std::string, scanned_directory> read_executables_cache_file(const std::string &file_path) {
+    std::unordered_map<std::string, scanned_directory> directories;
+
+    const int fd = open(file_path.c_str(), O_RDONLY);
+    if (fd == -1) {
+        return directories;
+    }
+
+    struct stat file_stat{};
+    std::string content;
+    if (fstat(fd, &file_stat) == 0) {
+        content.resize(file_stat.st_size);
+        if (read(fd, content.data(), content.size()) != static_cast<ssize_t>(content.size())) {
+            content.clear();
+        }
+    }
+    close(fd);
+
+    size_t position = 0;
+    const auto next_line = [&content, &position](std::string_view &line) {
+        if (position >= content.size()) {
+            return false;
+        }
+        size_t end = content.find('\n', position);
+        if (end == std::string::npos) {
+            end = content.size();
+        }
+        line = std::string_view(content).substr(position, end - position);
+        position = end + 1;
+        return true;
+    };
+
+    std::string_view line;
+    while (next_line(line)) {
+        scanned_directory directory;
+        const std::string header(line);
+        int dir_offset = 0;
+        if (sscanf(header.c_str(), "%ld %ld %lu %n", &directory.mtime.tv_sec, &directory.mtime.tv_nsec,
+                   &directory.inode, &dir_offset) != 3 || dir_offset == 0) {
+            break;
+        }
+
+        while (next_line(line) && !line.empty()) {
+            directory.names.emplace_back(line);
+        }
+        directories[header.substr(dir_offset)] = std::move(directory);
+    }
+
+    return directories;
+}
+
+void write_executables_cache_file(const std::string &file_path,
+                                  const std::unordered_map<std::string, scanned_directory> &directories) {
+    std::error_code error;
+    std::filesystem::create_directories(std::filesystem::path(file_path).parent_path(), error);
+
+    // write to a temporary file and rename it, so concurrent shells never read a partial file
+    const std::string tmp_path = file_path + "." + std::to_string(getpid());
+    std::ofstream file(tmp_path);
+    if (!file.is_open()) {
+        return;
+    }
+
+    for (const auto &[dir, directory]: directories) {
+        // drop directories that no longer exist
+        struct stat dir_stat{};
+        if (stat(dir.c_str(), &dir_stat) != 0) {
+            continue;
+        }
+
+        file << directory.mtime.tv_sec << ' ' << directory.mtime.tv_nsec << ' ' << directory.inode << ' ' << dir
+                << '\n';
+        for (const std::string &name: directory.names) {
+            file << name << '\n';
+        }
+        file << '\n';
     }
 
     file.close();
+    if (!file || rename(tmp_path.c_str(), file_path.c_str()) != 0) {
+        unlink(tmp_path.c_str());
+    }
+}
+
+// a shell killed while writing the cache, like by SIGTERM, leaves its temporary file behind
+void remove_stale_cache_files(const std::string &file_path) {
+    const std::filesystem::path cache_path(file_path);
+    const std::string prefix = cache_path.filename().string() + ".";
+
+    std::error_code error;
+    for (const auto &entry: std::filesystem::directory_iterator(cache_path.parent_path(), error)) {
+        const std::string name = entry.path().filename();
+        if (!name.starts_with(prefix)) {
+            continue;
+        }
+
+        // the file of a shell that is still running may be written right now
+        pid_t pid;
+        const char *pid_end = name.data() + name.size();
+        const auto [end, parse_error] = std::from_chars(name.data() + prefix.size(), pid_end, pid);
+        if (parse_error == std::errc() && end == pid_end && pid > 0 && kill(pid, 0) == -1 && errno == ESRCH) {
+            unlink(entry.path().c_str());
+        }
+    }
+}
+
+scanned_directory scan_directory(const std::string &dir, const struct stat &dir_stat) {
+    scanned_directory directory{dir_stat.st_mtim, dir_stat.st_ino, {}};
+
+    std::error_code error;
+    for (const auto &entry: std::filesystem::directory_iterator(dir, error)) {
+        if (access(entry.path().c_str(), X_OK) == 0) {
+            directory.names.push_back(entry.path().filename());
+        }
+    }
+    return directory;
 }
 
 void build_executables_cache() {
-    path = parse_path();
+    const std::string cache_file = executables_cache_file();
+    auto directories = cache_file.empty()
+                           ? std::unordered_map<std::string, scanned_directory>()
+                           : read_executables_cache_file(cache_file);
+    bool changed = false;
+
     for (const auto &dir: path) {
-        if (!std::filesystem::exists(dir) || !std::filesystem::is_directory(dir)) {
+        struct stat dir_stat{};
+        if (stat(dir.c_str(), &dir_stat) != 0 || !S_ISDIR(dir_stat.st_mode)) {
             continue;
         }
 
-        for (const auto &entry: std::filesystem::directory_iterator(dir)) {
-            if (access(entry.path().c_str(), X_OK) == 0) {
-                executables_cache[entry.path().filename()] = entry.path();
+        // only rescan directories that changed since they were cached
+        auto &directory = directories[dir];
+        if (directory.inode != dir_stat.st_ino || directory.mtime.tv_sec != dir_stat.st_mtim.tv_sec ||
+            directory.mtime.tv_nsec != dir_stat.st_mtim.tv_nsec) {
+            directory = scan_directory(dir, dir_stat);
+
+            // a change in the same second as the scan might not be visible in the mtime, so scan it again next time
+            if (dir_stat.st_mtim.tv_sec >= time(nullptr) - 1) {
+                directory.inode = 0;
             }
+            changed = true;
+        }
+
+        for (const std::string &name: directory.names) {
+            // like the lookup in PATH order the first directory wins
+            executables_cache.try_emplace(name, dir + "/" + name);
         }
     }
+
+    if (!cache_file.empty()) {
+        remove_stale_cache_files(cache_file);
+    }
+
+    if (changed && !cache_file.empty()) {
+        write_executables_cache_file(cache_file, directories);
+    }
+
+    build_completion_index();
 }
 
-std::unordered_set<std::string> autocomplete_builtin(const std::string &input) {
-    std::unordered_set<std::string> results;
+void start_executables_cache() {
+    path = parse_path();
 
-    for (const auto &key: builtins | std::views::keys) {
-        if (key.starts_with(input)) {
-            results.insert(key);
+    // the main thread does not touch the cache or the index until executables_ready is set
+    executables_thread = std::thread([] {
+        build_executables_cache();
+        executables_ready.store(true, std::memory_order_release);
+    });
+}
+
+bool executables_cache_ready() {
+    return executables_ready.load(std::memory_order_acquire);
+}
+
+void wait_for_executables_cache() {
+    if (executables_thread.joinable()) {
+        executables_thread.join();
+    }
+}
+
+std::string resolve_executable(const std::string &executable) {
+    if (executables_cache_ready()) {
+        if (const auto it = executables_cache.find(executable);
+            it != executables_cache.end() && access(it->second.c_str(), X_OK) == 0) {
+            return it->second;
         }
     }
 
-    return results;
+    // not scanned yet, installed after the scan or removed since then
+    return find_executable(executable);
 }
 
-std::unordered_set<std::string> autocomplete_executable(const std::string &input) {
-    std::unordered_set<std::string> results;
+std::string lookup_executable(const std::string &executable, const bool count_hit) {
+    if (const auto it = command_hash.find(executable); it != command_hash.end()) {
+        // a hit only needs a single access() to make sure the executable is still there
+        if (access(it->second.path.c_str(), X_OK) == 0) {
+            it->second.hits += count_hit;
+            return it->second.path;
+        }
+        command_hash.erase(it);
+    }
+
+    std::string full_path = resolve_executable(executable);
+    if (!full_path.empty()) {
+        command_hash[executable] = {full_path, count_hit ? 1u : 0u};
+    }
+    return full_path;
+}
+
+void build_completion_index() {
+    completion_index.clear();
+    completion_index.reserve(builtins.size() + executables_cache.size());
+
+    for (const auto &key: builtins | std::views::keys) {
+        completion_index.push_back(key);
+    }
 
     for (const auto &key: executables_cache | std::views::keys) {
-        if (key.starts_with(input)) {
-            results.insert(key);
+        completion_index.push_back(key);
+    }
+
+    std::ranges::sort(completion_index);
+    const auto duplicates = std::ranges::unique(completion_index);
+    completion_index.erase(duplicates.begin(), duplicates.end());
+}
+
+std::span<const std::string> autocomplete(const std::string &input) {
+    wait_for_executables_cache();
+
+    // all names starting with input form one contiguous block of the sorted index
+    const auto first = std::ranges::lower_bound(completion_index, input);
+    const auto last = std::partition_point(first, completion_index.end(), [&input](const std::string &name) {
+        return name.starts_with(input);
+    });
+    return {first, last};
+}
+
+void handle_sigchld(int signal) {
+    children_exited = 1;
+}
+
+size_t add_job(const std::string &command, std::vector<pid_t> pids) {
+    const size_t id = jobs.empty() ? 1 : jobs.rbegin()->first + 1;
+
+    job &new_job = jobs[id];
+    new_job.command = command;
+    new_job.last_pid = pids.back();
+    new_job.pids = std::move(pids);
+    return id;
+}
+
+int wait_for_pid(const pid_t pid, rusage *usage) {
+    int status = 0;
+    while (wait4(pid, &status, 0, usage) == -1) {
+        if (errno != EINTR) {
+            return 0;
+        }
+    }
+    return status;
+}
+
+int exit_status(const int wait_status) {
+    if (WIFSIGNALED(wait_status)) {
+        return 128 + WTERMSIG(wait_status);
+    }
+    return WEXITSTATUS(wait_status);
+}
+
+inline double seconds(const timeval &time) {
+    return static_cast<double>(time.tv_sec) + static_cast<double>(time.tv_usec) / 1e6;
+}
+
+// seconds with precision decimals, in the long format with minutes like 1m2.500s
+inline std::string format_seconds(const double value, const int precision, const bool long_format) {
+    std::ostringstream stream;
+    stream << std::fixed << std::setprecision(precision);
+    if (long_format) {
+        const auto minutes = static_cast<long long>(value / 60);
+        stream << minutes << 'm' << value - static_cast<double>(minutes) * 60 << 's';
+    } else {
+        stream << value;
+    }
+    return stream.str();
+}
+
+std::string format_time_report(const std::string &format, const long long real_us, const timeval &user,
+                               const timeval &sys, const rusage &children) {
+    const double real = static_cast<double>(real_us) / 1e6;
+    std::string report;
+
+    for (size_t i = 0; i < format.size(); i++) {
+        if (format[i] != '%' || i + 1 == format.size()) {
+            report += format[i];
+            continue;
+        }
+
+        // %[p][l]R, U, S and P like bash
+        size_t end = i + 1;
+        int precision = 3;
+        if (std::isdigit(static_cast<unsigned char>(format[end]))) {
+            precision = std::min(format[end] - '0', 3);
+            end++;
+        }
+        const bool long_format = end < format.size() && format[end] == 'l';
+        if (long_format) {
+            end++;
+        }
+        if (end == format.size()) {
+            report += format.substr(i);
+            break;
+        }
+
+        switch (format[end]) {
+            case '%':
+                report += '%';
+                break;
+            case 'R':
+                report += format_seconds(real, precision, long_format);
+                break;
+            case 'U':
+                report += format_seconds(seconds(user), precision, long_format);
+                break;
+            case 'S':
+                report += format_seconds(seconds(sys), precision, long_format);
+                break;
+            case 'P':
+                report += format_seconds(real > 0 ? (seconds(user) + seconds(sys)) / real * 100 : 0, precision, false);
+                break;
+            // extensions from GNU time
+            case 'M':
+                report += std::to_string(children.ru_maxrss);
+                break;
+            case 'w':
+                report += std::to_string(children.ru_nvcsw);
+                break;
+            case 'c':
+                report += std::to_string(children.ru_nivcsw);
+                break;
+            default:
+                // unknown specifiers are printed as they are
+                report += format.substr(i, end - i + 1);
+                break;
+        }
+        i = end;
+    }
+
+    return report + '\n';
+}
+
+void wait_for_job(job &job) {
+    for (const pid_t pid: job.pids) {
+        const int status = wait_for_pid(pid);
+        if (pid == job.last_pid) {
+            job.status = status;
         }
     }
+    job.pids.clear();
+    job.running = false;
+}
+
+void reap_jobs() {
+    if (!children_exited) {
+        return;
+    }
+    children_exited = 0;
+
+    for (auto &[id, job]: jobs) {
+        std::erase_if(job.pids, [&job](const pid_t pid) {
+            int status;
+            if (waitpid(pid, &status, WNOHANG) != pid) {
+                return false;
+            }
+
+            if (pid == job.last_pid) {
+                job.status = status;
+            }
+            return true;
+        });
+        job.running = !job.pids.empty();
+    }
+}
+
+std::string job_state(const job &job) {
+    if (job.running) {
+        return "Running";
+    }
 
-    return results;
+    if (WIFSIGNALED(job.status)) {
+        return strsignal(WTERMSIG(job.status));
+    }
+
+    if (WEXITSTATUS(job.status) != 0) {
+        return "Exit " + std::to_string(WEXITSTATUS(job.status));
+    }
+    return "Done";
+}
+
+// formatted like bash, + marks the current job and - the previous one
+void print_job(const size_t id, const job &job) {
+    char marker = ' ';
+    if (id == jobs.rbegin()->first) {
+        marker = '+';
+    } else if (jobs.size() > 1 && id == std::next(jobs.rbegin())->first) {
+        marker = '-';
+    }
+
+    std::cout << '[' << id << ']' << marker << "  " << std::left << std::setw(24) << job_state(job) << std::right
+            << job.command << (job.running ? " &" : "") << '\n';
+}
+
+void report_finished_jobs(const bool notify) {
+    reap_jobs();
+
+    // without notices finished jobs wait for jobs or wait, the oldest are forgotten so the table stays bounded
+    size_t finished = std::ranges::count_if(jobs, [](const auto &entry) { return !entry.second.running; });
+    for (auto it = jobs.begin(); it != jobs.end();) {
+        if (it->second.running || (!notify && finished <= max_finished_jobs)) {
+            ++it;
+            continue;
+        }
+
+        if (notify) {
+            print_job(it->first, it->second);
+        }
+        it = jobs.erase(it);
+        finished--;
+    }
+}
+
+// %N or N
+bool parse_job_spec(const std::string &spec, size_t &id) {
+    const std::string number = spec.starts_with('%') ? spec.substr(1) : spec;
+    const auto [end, error] = std::from_chars(number.data(), number.data() + number.size(), id);
+    if (!is_number(number) || error != std::errc() || end != number.data() + number.size()) {
+        return false;
+    }
+    return jobs.contains(id);
 }
 
 void redirect_io(const int output_fd = -1, const int input_fd = -1, const int error_fd = -1) {
-    stdout_fd = dup(STDOUT_FILENO);
-    stdin_fd = dup(STDIN_FILENO);
-    stderr_fd = dup(STDERR_FILENO);
+    // buffered output still belongs to the current stdout
+    stdout_redirected = output_fd != -1;
+    if (stdout_redirected) {
+        std::cout.flush();
+    }
+
+    // the saved fds must not leak into executed commands
+    stdout_fd = fcntl(STDOUT_FILENO, F_DUPFD_CLOEXEC, 0);
+    stdin_fd = fcntl(STDIN_FILENO, F_DUPFD_CLOEXEC, 0);
+    stderr_fd = fcntl(STDERR_FILENO, F_DUPFD_CLOEXEC, 0);
 
     if (output_fd != -1) {
         dup2(output_fd, STDOUT_FILENO);
@@ -110,6 +612,11 @@ void redirect_io(const int output_fd = -1, const int input_fd = -1, const int er
 }
 
 void restore_io() {
+    if (stdout_redirected) {
+        std::cout.flush();
+        stdout_redirected = false;
+    }
+
     if (stdout_fd != 0) {
         dup2(stdout_fd, STDOUT_FILENO);
         close(stdout_fd);
@@ -129,63 +636,84 @@ void restore_io() {
     }
 }
 
-void exit_builtin(const std::string &input, const std::vector<std::string> &args) {
-    const char *history_file = getenv("HISTFILE");
-    if (history_file == nullptr) {
-        const std::string history_file_path = std::string(getenv("HOME")) + "/.shell_history";
-        write_history(history_file_path);
-    } else {
-        write_history(history_file);
-    }
-
-    int exit_code = EXIT_SUCCESS;
+int exit_builtin(const std::string &input, const std::vector<std::string> &args) {
+    // like bash, exit without an argument uses the status of the last pipeline
+    int exit_code = last_status;
 
     if (args.size() == 2 && is_number(args[1])) {
         exit_code = std::stoi(args[1]);
     } else if (args.size() > 2) {
-        std::cout << "exit: too many arguments" << std::endl;
-        return;
+        std::cout << "exit: too many arguments" << '\n';
+        return EXIT_FAILURE;
+    }
+
+    // a subshell has no scan thread and leaves history to the shell
+    if (in_subshell) {
+        std::cout.flush();
+        _exit(exit_code);
+    }
+
+    // the scan must not run while exit() destroys the cache
+    wait_for_executables_cache();
+    if (history_enabled) {
+        write_history(history_file_path());
     }
 
     exit(exit_code);
 }
 
-void echo(const std::string &input, const std::vector<std::string> &args) {
+int echo(const std::string &input, const std::vector<std::string> &args) {
     for (int i = 1; i < args.size(); i++) {
         std::cout << args[i];
         if (i < args.size() - 1) {
             std::cout << " ";
         }
     }
-    std::cout << std::endl;
+    std::cout << '\n';
+    return EXIT_SUCCESS;
 }
 
-void type(const std::string &input, const std::vector<std::string> &args) {
+int type(const std::string &input, const std::vector<std::string> &args) {
+    int status = EXIT_SUCCESS;
     for (int i = 1; i < args.size(); i++) {
         const std::string &arg = args[i];
 
+        if (reserved_words.contains(arg)) {
+            std::cout << arg << " is a shell keyword" << '\n';
+            continue;
+        }
+
         if (builtins.contains(arg)) {
-            std::cout << arg << " is a shell builtin" << std::endl;
+            std::cout << arg << " is a shell builtin" << '\n';
             continue;
         }
 
-        if (auto full_path = find_executable(arg); !full_path.empty()) {
-            std::cout << arg << " is " << full_path << std::endl;
+        if (auto full_path = lookup_executable(arg, false); !full_path.empty()) {
+            std::cout << arg << " is " << full_path << '\n';
             continue;
         }
 
-        std::cout << args[i] << " not found" << std::endl;
+        std::cout << args[i] << " not found" << '\n';
+        status = EXIT_FAILURE;
     }
+    return status;
 }
 
-void pwd(const std::string &input, const std::vector<std::string> &args) {
-    std::cout << getcwd(nullptr, 0) << std::endl;
+int pwd(const std::string &input, const std::vector<std::string> &args) {
+    const std::string dir = current_directory();
+    if (dir.empty()) {
+        perror("pwd");
+        return EXIT_FAILURE;
+    }
+
+    std::cout << dir << '\n';
+    return EXIT_SUCCESS;
 }
 
-void cd(const std::string &input, const std::vector<std::string> &args) {
+int cd(const std::string &input, const std::vector<std::string> &args) {
     if (args.size() > 2) {
-        std::cout << "cd: too many arguments" << std::endl;
-        return;
+        std::cout << "cd: too many arguments" << '\n';
+        return EXIT_FAILURE;
     }
 
     std::string dir = getenv("HOME");
@@ -201,45 +729,48 @@ void cd(const std::string &input, const std::vector<std::string> &args) {
     }
 
     if (chdir(dir.c_str()) != 0) {
-        std::cout << "cd: " << args[1] << ": No such file or directory" << std::endl;
+        std::cout << "cd: " << args[1] << ": No such file or directory" << '\n';
+        return EXIT_FAILURE;
     }
+    return EXIT_SUCCESS;
 }
 
-void history(const std::string &input, const std::vector<std::string> &args) {
+int history(const std::string &input, const std::vector<std::string> &args) {
     // clear
     if (args.size() > 1 && args[1] == "-c") {
         history_cache.clear();
         history_index = 0;
-        return;
+        history_appended = 0;
+        return EXIT_SUCCESS;
     }
 
     // load from file
     if (args.size() > 2) {
         if (args[1] == "-r") {
             read_history(args[2]);
-            return;
+            return EXIT_SUCCESS;
         }
 
         if (args[1] == "-w") {
             write_history(args[2]);
-            return;
+            return EXIT_SUCCESS;
         }
 
         if (args[1] == "-a") {
             append_history(args[2]);
-            return;
+            return EXIT_SUCCESS;
         }
 
-        std::cout << "history: too many arguments" << std::endl;
-        return;
+        std::cout << "history: too many arguments" << '\n';
+        return EXIT_FAILURE;
     }
 
     // print history
     size_t n = 999;
     if (args.size() > 1) {
         if (!is_number(args[1])) {
-            std::cout << "history: " << args[1] << ": numeric argument required" << std::endl;
-            return;
+            std::cout << "history: " << args[1] << ": numeric argument required" << '\n';
+            return EXIT_FAILURE;
         }
 
         n = std::stoul(args[1]);
@@ -249,39 +780,243 @@ void history(const std::string &input, const std::vector<std::string> &args) {
     }
 
     for (size_t i = history_cache.size() - n; i < history_cache.size(); i++) {
-        std::cout << "  " << i + 1 << "  " << history_cache[i] << std::endl;
+        std::cout << "  " << history_cache.base() + i + 1 << "  " << history_cache[i] << '\n';
     }
+    return EXIT_SUCCESS;
 }
 
-int exec(const std::string &executable, const std::vector<std::string> &args, const int output_fd = -1,
-         const int input_fd = -1) {
-    switch (const int pid = fork()) {
-        case -1:
-            perror("fork");
-            break;
-        case 0: {
-            const auto argv = new char *[args.size() + 1];
-            for (int i = 0; i < args.size(); i++) {
-                argv[i] = const_cast<char *>(args[i].c_str());
+int hash(const std::string &input, const std::vector<std::string> &args) {
+    // forget all
+    if (args.size() > 1 && args[1] == "-r") {
+        command_hash.clear();
+        return EXIT_SUCCESS;
+    }
+
+    // add with a given path
+    if (args.size() > 1 && args[1] == "-p") {
+        if (args.size() != 4) {
+            std::cout << "hash: usage: hash -p path name" << '\n';
+            return EXIT_FAILURE;
+        }
+        command_hash[args[3]] = {args[2], 0};
+        return EXIT_SUCCESS;
+    }
+
+    // forget some
+    if (args.size() > 1 && args[1] == "-d") {
+        int status = EXIT_SUCCESS;
+        for (size_t i = 2; i < args.size(); i++) {
+            if (command_hash.erase(args[i]) == 0) {
+                std::cout << "hash: " << args[i] << ": not found" << '\n';
+                status = EXIT_FAILURE;
             }
-            argv[args.size()] = nullptr;
+        }
+        return status;
+    }
 
-            // redirect input & output
-            if (output_fd != -1) {
-                dup2(output_fd, STDOUT_FILENO);
+    // add by looking them up
+    if (args.size() > 1) {
+        int status = EXIT_SUCCESS;
+        for (size_t i = 1; i < args.size(); i++) {
+            if (builtins.contains(args[i])) {
+                continue;
             }
 
-            if (input_fd != -1) {
-                dup2(input_fd, STDIN_FILENO);
+            command_hash.erase(args[i]);
+            if (lookup_executable(args[i], false).empty()) {
+                std::cout << "hash: " << args[i] << ": not found" << '\n';
+                status = EXIT_FAILURE;
             }
+        }
+        return status;
+    }
+
+    // print table
+    if (command_hash.empty()) {
+        std::cout << "hash: hash table empty" << '\n';
+        return EXIT_SUCCESS;
+    }
+
+    std::vector<std::pair<std::string, size_t>> entries;
+    for (const auto &command: command_hash | std::views::values) {
+        entries.emplace_back(command.path, command.hits);
+    }
+    std::ranges::sort(entries);
+
+    std::cout << "hits\tcommand" << '\n';
+    for (const auto &[command_path, hits]: entries) {
+        std::cout << std::setw(4) << hits << '\t' << command_path << '\n';
+    }
+    return EXIT_SUCCESS;
+}
+
+int jobs_builtin(const std::string &input, const std::vector<std::string> &args) {
+    reap_jobs();
+
+    // print the pid of the last stage of each job
+    if (args.size() > 1 && args[1] == "-p") {
+        for (const auto &[id, job]: jobs) {
+            std::cout << job.last_pid << '\n';
+        }
+        return EXIT_SUCCESS;
+    }
+
+    for (const auto &[id, job]: jobs) {
+        print_job(id, job);
+    }
+
+    // finished jobs are only reported once
+    std::erase_if(jobs, [](const auto &entry) { return !entry.second.running; });
+    return EXIT_SUCCESS;
+}
+
+// the status is the one of the last job or pid that was waited for
+int wait_builtin(const std::string &input, const std::vector<std::string> &args) {
+    // wait for all jobs
+    if (args.size() == 1) {
+        for (auto &[id, job]: jobs) {
+            wait_for_job(job);
+        }
+        jobs.clear();
+        return EXIT_SUCCESS;
+    }
+
+    int status = EXIT_SUCCESS;
+    for (size_t i = 1; i < args.size(); i++) {
+        const std::string &arg = args[i];
+
+        if (arg.starts_with('%')) {
+            size_t id;
+            if (!parse_job_spec(arg, id)) {
+                std::cout << "wait: " << arg << ": no such job" << '\n';
+                status = 127;
+                continue;
+            }
+
+            wait_for_job(jobs[id]);
+            status = exit_status(jobs[id].status);
+            jobs.erase(id);
+            continue;
+        }
+
+        // numbers beyond the range of a pid cannot be a pid either
+        pid_t pid;
+        const auto [end, error] = std::from_chars(arg.data(), arg.data() + arg.size(), pid);
+        if (!is_number(arg) || error != std::errc() || end != arg.data() + arg.size()) {
+            std::cout << "wait: `" << arg << "': not a pid or valid job spec" << '\n';
+            status = 2;
+            continue;
+        }
+        // the last stage may already be reaped, its job still holds the status
+        const auto it = std::ranges::find_if(jobs, [pid](const auto &entry) {
+            return entry.second.last_pid == pid ||
+                   std::ranges::find(entry.second.pids, pid) != entry.second.pids.end();
+        });
+        if (it == jobs.end()) {
+            std::cout << "wait: pid " << pid << " is not a child of this shell" << '\n';
+            status = 127;
+            continue;
+        }
+
+        job &job = it->second;
+        if (std::ranges::find(job.pids, pid) == job.pids.end()) {
+            status = exit_status(job.status);
+        } else {
+            const int wait_status = wait_for_pid(pid);
+            if (pid == job.last_pid) {
+                job.status = wait_status;
+            }
+            status = exit_status(wait_status);
+            std::erase(job.pids, pid);
+        }
+
+        if (job.pids.empty()) {
+            jobs.erase(it);
+        }
+    }
+    return status;
+}
+
+int fg(const std::string &input, const std::vector<std::string> &args) {
+    if (jobs.empty()) {
+        std::cout << "fg: current: no such job" << '\n';
+        return EXIT_FAILURE;
+    }
+
+    size_t id = jobs.rbegin()->first;
+    if (args.size() > 1 && !parse_job_spec(args[1], id)) {
+        std::cout << "fg: " << args[1] << ": no such job" << '\n';
+        return EXIT_FAILURE;
+    }
 
-            execv(executable.c_str(), argv);
-            perror("exec");
-            delete[] argv;
+    job &job = jobs[id];
+    std::cout << job.command << '\n';
+    std::cout.flush();
+
+    wait_for_job(job);
+    const int status = exit_status(job.status);
+    jobs.erase(id);
+    return status;
+}
+
+int fork_builtin(const std::string &command, const std::string &input, const std::vector<std::string> &args,
+                 const std::span<const int> pipe_fds) {
+    // the PATH scan may still run, glibc resets the locks of malloc and stdio in the child and the child only uses the
+    // cache if it was ready before the fork, otherwise lookups search PATH like before the scan finished
+    std::cout.flush();
+
+    switch (const int pid = fork()) {
+        case -1:
+            perror("fork");
             break;
+        case 0: {
+            // stdin and stdout are already redirected, other pipe ends would keep readers and writers waiting
+            for (const int fd: pipe_fds) {
+                close(fd);
+            }
+
+            in_subshell = true;
+            const int status = builtins.at(command)(input, args);
+            std::cout.flush();
+            _exit(status);
         }
         default:
             return pid;
     }
     return -1;
 }
+
+int exec(const std::string &executable, const std::vector<std::string> &args, const int output_fd = -1,
+         const int input_fd = -1) {
+    std::vector<char *> argv;
+    argv.reserve(args.size() + 1);
+    for (const std::string &arg: args) {
+        argv.push_back(const_cast<char *>(arg.c_str()));
+    }
+    argv.push_back(nullptr);
+
+    // redirect input & output, the child gets its own copies even if the fds are close-on-exec
+    posix_spawn_file_actions_t file_actions;
+    posix_spawn_file_actions_init(&file_actions);
+    if (output_fd != -1) {
+        posix_spawn_file_actions_adddup2(&file_actions, output_fd, STDOUT_FILENO);
+    }
+
+    if (input_fd != -1) {
+        posix_spawn_file_actions_adddup2(&file_actions, input_fd, STDIN_FILENO);
+    }
+
+    // keep the order of our output and the output of the child
+    std::cout.flush();
+
+    // unlike fork, posix_spawn does not copy the page tables of the shell, so it does not get slower with its RSS
+    pid_t pid;
+    const int error = posix_spawn(&pid, executable.c_str(), &file_actions, nullptr, argv.data(), environ);
+    posix_spawn_file_actions_destroy(&file_actions);
+
+    if (error != 0) {
+        std::cerr << "exec: " << strerror(error) << '\n';
+        return -1;
+    }
+    return pid;
+}
@@ -1,44 +1,123 @@
 #ifndef SHELL_COMMANDS_H
 #define SHELL_COMMANDS_H
 
+#include <csignal>
+#include <map>
+#include <span>
 #include <string>
+#include <sys/resource.h>
 #include <unistd.h>
 #include <unordered_map>
 #include <unordered_set>
 #include <vector>
 
-inline std::vector<std::string> history_cache;
+#include "utils.h"
+
+inline ring_buffer<std::string> history_cache;
 inline size_t history_index = 0;
+// absolute position (history_cache.base() + index) up to which entries were appended to a file
+inline size_t history_appended = 0;
+// maximum number of lines written to a history file, set from HISTFILESIZE
+inline size_t history_file_size = std::numeric_limits<size_t>::max();
 inline std::string typed_command;
+// scripts do not load, record or save history
+inline bool history_enabled = true;
+void add_history(const std::string &entry);
+std::string history_file_path();
+void configure_history();
 void read_history(const std::string &file_path);
 void write_history(const std::string &file_path);
 void append_history(const std::string &file_path);
 
+// only complete once executables_cache_ready() returns true, use lookup_executable() before that
 inline std::unordered_map<std::string, std::string> executables_cache;
 void build_executables_cache();
+void start_executables_cache();
+bool executables_cache_ready();
+void wait_for_executables_cache();
+
+// executables that were looked up, like the hash table of bash
+struct hashed_command {
+    std::string path;
+    size_t hits = 0;
+};
 
-std::unordered_set<std::string> autocomplete_builtin(const std::string &input);
-std::unordered_set<std::string> autocomplete_executable(const std::string &input);
+inline std::unordered_map<std::string, hashed_command> command_hash;
+std::string lookup_executable(const std::string &executable, bool count_hit);
+
+// sorted and deduplicated names of all builtins and executables
+inline std::vector<std::string> completion_index;
+void build_completion_index();
+std::span<const std::string> autocomplete(const std::string &input);
+
+// pipelines started with &, keyed by job number
+struct job {
+    std::string command;
+    std::vector<pid_t> pids;
+    // the status of a pipeline is the status of its last stage
+    pid_t last_pid = -1;
+    int status = 0;
+    bool running = true;
+};
+
+inline std::map<size_t, job> jobs;
+// set by the SIGCHLD handler, jobs are only reaped at safe points like before every line
+inline volatile sig_atomic_t children_exited = 0;
+void handle_sigchld(int signal);
+size_t add_job(const std::string &command, std::vector<pid_t> pids);
+void reap_jobs();
+// reaps finished jobs and prints and forgets them if notify is set, otherwise they are kept for jobs and wait
+void report_finished_jobs(bool notify);
+// usage receives the resource usage of the child if it is set
+int wait_for_pid(pid_t pid, rusage *usage = nullptr);
+// converts a status of waitpid to an exit status like $?, 128 + the signal for killed processes
+int exit_status(int wait_status);
+
+// TIMEFORMAT of the time reserved word, user and sys include the main thread of the shell, children only the waited
+// for commands
+inline const char *default_time_format = "\nreal\t%3lR\nuser\t%3lU\nsys\t%3lS\nmaxrss\t%MkB\nvcsw\t%w\nivcsw\t%c";
+inline const char *posix_time_format = "real %2R\nuser %2U\nsys %2S";
+std::string format_time_report(const std::string &format, long long real_us, const timeval &user, const timeval &sys,
+                               const rusage &children);
 
 void redirect_io(int output_fd, int input_fd, int error_fd);
 void restore_io();
 
-void exit_builtin(const std::string &input, const std::vector<std::string> &args);
-void type(const std::string &input, const std::vector<std::string> &args);
-void echo(const std::string &input, const std::vector<std::string> &args);
-void pwd(const std::string &input, const std::vector<std::string> &args);
-void cd(const std::string &input, const std::vector<std::string> &args);
-void history(const std::string &input, const std::vector<std::string> &args);
+int exit_builtin(const std::string &input, const std::vector<std::string> &args);
+int type(const std::string &input, const std::vector<std::string> &args);
+int echo(const std::string &input, const std::vector<std::string> &args);
+int pwd(const std::string &input, const std::vector<std::string> &args);
+int cd(const std::string &input, const std::vector<std::string> &args);
+int history(const std::string &input, const std::vector<std::string> &args);
+int hash(const std::string &input, const std::vector<std::string> &args);
+int jobs_builtin(const std::string &input, const std::vector<std::string> &args);
+int wait_builtin(const std::string &input, const std::vector<std::string> &args);
+int fg(const std::string &input, const std::vector<std::string> &args);
 
-inline std::unordered_map<std::string, void (*)(const std::string &, const std::vector<std::string> &)> builtins = {
+inline std::unordered_map<std::string, int (*)(const std::string &, const std::vector<std::string> &)> builtins = {
     {std::string("exit"), &exit_builtin},
     {std::string("echo"), &echo},
     {std::string("type"), &type},
     {std::string("pwd"), &pwd},
     {std::string("cd"), &cd},
     {std::string("history"), &history},
+    {std::string("hash"), &hash},
+    {std::string("jobs"), &jobs_builtin},
+    {std::string("wait"), &wait_builtin},
+    {std::string("fg"), &fg},
 };
 
+// words the parser handles itself, only known for type
+inline const std::unordered_set<std::string> reserved_words = {"time"};
+
+// exit status of the last pipeline, $?
+inline int last_status = 0;
+
+// set in forked pipeline stages, exit then only leaves the subshell
+inline bool in_subshell = false;
+int fork_builtin(const std::string &command, const std::string &input, const std::vector<std::string> &args,
+                 std::span<const int> pipe_fds);
+
 int exec(const std::string &executable, const std::vector<std::string> &args, int output_fd, int input_fd);
 
 #endif //SHELL_COMMANDS_H
@@ -1,13 +1,16 @@
+#include <algorithm>
+#include <cerrno>
 #include <iostream>
 #include <pwd.h>
-#include <regex>
 #include <termios.h>
 #include <fcntl.h>
+#include <sys/time.h>
 #include <sys/wait.h>
 
 #include "commands.h"
 #include "utils.h"
 #include "graphics.h"
+#include "trace.h"
 
 // session and user information
 uid_t uid;
@@ -15,142 +18,187 @@ passwd *pw;
 char hostname[256];
 bool piped = false;
 
+// end-of-output marker printed instead of the prompt in piped mode
+const char *sentinel = nullptr;
+
+// input is read in blocks from source_fd, which is either stdin or a script file
+int source_fd = STDIN_FILENO;
+// line editing on a raw terminal is only used when stdin is a terminal
+bool stdin_tty = false;
+// running a script file or -c, there is no prompt, no line editing and no history
+bool reading_script = false;
+termios orig_termios{};
+
+char input_block[1 << 16];
+size_t input_start = 0;
+size_t input_end = 0;
+
 void print_prompt() {
+    if (reading_script) {
+        return;
+    }
+
     if (piped) {
+        if (sentinel != nullptr) {
+            std::cout << sentinel << std::endl;
+        }
         return;
     }
 
-    const std::string dir = std::regex_replace(getcwd(nullptr, 0), std::regex(getenv("HOME")), "~");
+    // the home directory and everything below it is shown relative to ~
+    std::string dir = current_directory();
+    if (const char *home = getenv("HOME"); home != nullptr && *home != '\0') {
+        const std::string_view home_dir = home;
+        if (dir.starts_with(home_dir) && (dir.size() == home_dir.size() || dir[home_dir.size()] == '/')) {
+            dir.replace(0, home_dir.size(), "~");
+        }
+    }
 
     std::cout << ORANGE << BOLD << pw->pw_name << "@" << hostname << RESET << ":" << BLUE << BOLD
             << dir << RESET << "$ ";
 }
 
-inline bool check_redirect_destination(const std::vector<std::string> &arg, const int i) {
-    if (i + 1 >= arg.size()) {
-        std::cout << "syntax error near unexpected token `newline'" << std::endl;
-        return false;
-    }
-    return true;
-}
-
 int output_fd = -1;
 int input_fd = -1;
 int error_fd = -1;
 
-std::vector<std::string> redirect_output(const std::vector<std::string> &args) {
-    std::vector<std::string> filtered_args;
-    for (int j = 0; j < args.size(); j++) {
-        const std::string &arg = args[j];
-
-        if (arg == ">" || arg == "1>") {
-            if (check_redirect_destination(args, j)) {
-                const std::string &output = args[j + 1];
-                output_fd = open(output.c_str(), O_WRONLY | O_CREAT | O_TRUNC, 0644);
-                if (output_fd == -1) {
-                    perror("error opening file for output");
-                }
-            }
-            break;
-        }
+// opens the files of the redirections, the last one of each fd wins
+void open_redirections(const std::vector<redirection> &redirections) {
+    for (const redirection &redirection: redirections) {
+        const int flags = O_WRONLY | O_CREAT | O_CLOEXEC | (redirection.append ? O_APPEND : O_TRUNC);
+        const int fd = open(redirection.target.c_str(), flags, 0644);
 
-        if (arg == "2>") {
-            if (check_redirect_destination(args, j)) {
-                const std::string &output = args[j + 1];
-                error_fd = open(output.c_str(), O_WRONLY | O_CREAT | O_TRUNC, 0644);
-                if (error_fd == -1) {
-                    perror("error opening file for error");
-                }
-            }
-            break;
-        }
-
-        if (arg == ">>" || arg == "1>>") {
-            if (check_redirect_destination(args, j)) {
-                const std::string &output = args[j + 1];
-                output_fd = open(output.c_str(), O_WRONLY | O_CREAT | O_APPEND, 0644);
-                if (output_fd == -1) {
-                    perror("error opening file for output");
-                }
-            }
-            break;
+        int &target_fd = redirection.fd == STDERR_FILENO ? error_fd : output_fd;
+        if (fd == -1) {
+            perror(redirection.fd == STDERR_FILENO ? "error opening file for error" : "error opening file for output");
+            continue;
         }
 
-        if (arg == "2>>") {
-            if (check_redirect_destination(args, j)) {
-                const std::string &output = args[j + 1];
-                error_fd = open(output.c_str(), O_WRONLY | O_CREAT | O_APPEND, 0644);
-                if (error_fd == -1) {
-                    perror("error opening file for error");
-                }
-            }
-            break;
+        if (target_fd != -1) {
+            close(target_fd);
         }
-
-        filtered_args.push_back(arg);
+        target_fd = fd;
     }
-    return filtered_args;
 }
 
-void eval(const std::string &input) {
-    const std::vector<std::string> inputs = split(input, '|');
-
+// returns the exit status of the last stage, background jobs always succeed, trace is only set with SHELL_TRACE,
+// children receives the resource usage of the waited for stages
+int run_pipeline(const std::vector<simple_command> &stages, const bool background, eval_trace *trace,
+                 rusage &children) {
     // create pipes if necessary
-    const size_t pipe_count = inputs.size() - 1;
+    const size_t pipe_count = stages.size() - 1;
     std::vector<int[2]> pipes(pipe_count);
     for (int i = 0; i < pipe_count; i++) {
         if (pipe(pipes[i]) == -1) {
             perror("error creating pipe");
-            return;
+            return EXIT_FAILURE;
         }
+
+        // executed stages only keep the ends dup2'd onto their stdin and stdout, otherwise a writer holding
+        // the read end of its own pipe never sees its reader exit
+        fcntl(pipes[i][0], F_SETFD, FD_CLOEXEC);
+        fcntl(pipes[i][1], F_SETFD, FD_CLOEXEC);
     }
 
     // handle commands
     std::vector<int> pids;
-    for (int i = 0; i < inputs.size(); i++) {
-        const auto &command = parse_command(inputs[i]);
-        const auto &args = parse_args(inputs[i]);
-
-        // check for output and error redirecting
+    int status = EXIT_SUCCESS;
+    pid_t status_pid = -1;
+    for (int i = 0; i < stages.size(); i++) {
+        const simple_command &stage = stages[i];
+        const std::vector<std::string> &args = stage.args;
+        const bool last_stage = i == stages.size() - 1;
+        stage_trace timing{args.empty() ? "" : args[0]};
+
+        // redirections take precedence over pipes
         output_fd = -1;
         input_fd = -1;
         error_fd = -1;
-        const std::vector<std::string> filtered_args = redirect_output(args);
+        auto phase_start = trace_now();
+        open_redirections(stage.redirections);
+        timing.open_ns = elapsed_ns(phase_start);
+        const bool output_redirected = output_fd != -1;
 
         // connect pipes
-        if (i <= static_cast<int>(pipe_count - 1)) {
+        if (i < pipe_count && !output_redirected) {
             output_fd = pipes[i][1];
         }
 
-        if (i > 0 && i - 1 <= pipe_count) {
+        if (i > 0) {
             input_fd = pipes[i - 1][0];
         }
 
-        // execute command
+        // without job control a background job must not read the input of the shell
+        if (background && i == 0) {
+            input_fd = open("/dev/null", O_RDONLY | O_CLOEXEC);
+        }
+
+        // execute command, a stage of only redirections just creates the files
+        const std::string &command = timing.command;
+        phase_start = trace_now();
         redirect_io(output_fd, input_fd, error_fd);
-        if (builtins.contains(command)) {
-            history_cache.push_back(inputs[i]);
-            history_index = history_cache.size();
+        timing.redirect_ns = elapsed_ns(phase_start);
+        phase_start = trace_now();
+        if (command.empty()) {
+            status = EXIT_SUCCESS;
+        } else if (builtins.contains(command)) {
+            add_history(stage.text);
+
+            if (pipe_count == 0 && !background) {
+                status = builtins[command](stage.text, args);
+                timing.builtin_ns = elapsed_ns(phase_start);
+            } else {
+                // run in a subshell so the stage can write more than the pipe buffer while the next stage reads
+                std::vector<int> pipe_fds;
+                for (int j = std::max(i - 1, 0); j < pipe_count; j++) {
+                    if (j >= i) {
+                        pipe_fds.push_back(pipes[j][1]);
+                    }
+                    pipe_fds.push_back(pipes[j][0]);
+                }
 
-            builtins[command](input, filtered_args);
-        } else if (executables_cache.contains(command)) {
-            history_cache.push_back(inputs[i]);
-            history_index = history_cache.size();
+                const int pid = fork_builtin(command, stage.text, args, pipe_fds);
+                timing.spawn_ns = elapsed_ns(phase_start);
+                if (pid != -1) {
+                    pids.push_back(pid);
+                }
+                if (last_stage) {
+                    status_pid = pid;
+                }
+            }
+        } else if (const std::string executable = lookup_executable(command, true); !executable.empty()) {
+            timing.lookup_ns = elapsed_ns(phase_start);
+            add_history(stage.text);
 
-            const int pid = exec(executables_cache[command], filtered_args, output_fd, input_fd);
+            phase_start = trace_now();
+            const int pid = exec(executable, args, output_fd, input_fd);
+            timing.spawn_ns = elapsed_ns(phase_start);
             if (pid != -1) {
                 pids.push_back(pid);
             }
+            if (last_stage) {
+                status_pid = pid;
+                status = pid == -1 ? 126 : status;
+            }
         } else {
-            std::cout << command << ": command not found" << std::endl;
+            std::cout << command << ": command not found" << '\n';
+            if (last_stage) {
+                status = 127;
+            }
         }
+        phase_start = trace_now();
         restore_io();
+        timing.redirect_ns += elapsed_ns(phase_start);
 
-        // close pipes
+        // close pipes, the write end of a pipe is unused if the output was redirected to a file
         if (output_fd != -1) {
             close(output_fd);
         }
 
+        if (output_redirected && i < pipe_count) {
+            close(pipes[i][1]);
+        }
+
         if (input_fd != -1) {
             close(input_fd);
         }
@@ -158,10 +206,124 @@ void eval(const std::string &input) {
         if (error_fd != -1) {
             close(error_fd);
         }
+
+        if (trace != nullptr) {
+            trace->stages.push_back(std::move(timing));
+        }
+    }
+
+    if (background) {
+        if (!pids.empty()) {
+            std::vector<std::string> texts;
+            for (const simple_command &stage: stages) {
+                texts.push_back(stage.text);
+            }
+
+            const size_t id = add_job(join(texts, " | "), pids);
+            if (stdin_tty) {
+                std::cout << '[' << id << "] " << pids.back() << '\n';
+            }
+        }
+        return EXIT_SUCCESS;
     }
 
+    const auto wait_start = trace_now();
     for (const int pid: pids) {
-        waitpid(pid, nullptr, 0);
+        rusage usage{};
+        const int wait_status = wait_for_pid(pid, &usage);
+        if (pid == status_pid) {
+            status = exit_status(wait_status);
+        }
+        add_rusage(children, usage);
+    }
+
+    if (trace != nullptr) {
+        trace->wait_ns += elapsed_ns(wait_start);
+    }
+    return status;
+}
+
+// prints the report of the time reserved word to stderr, formatted by TIMEFORMAT
+void print_time_report(const pipeline &pipeline, const long long real_us, const rusage &self_start,
+                       const rusage &children) {
+    const char *time_format = getenv("TIMEFORMAT");
+    std::string format = time_format != nullptr ? time_format : default_time_format;
+    if (pipeline.posix_time_format) {
+        format = posix_time_format;
+    }
+
+    // an empty TIMEFORMAT disables the report
+    if (format.empty()) {
+        return;
+    }
+
+    // user and sys of the shell itself count for builtins that ran in the shell, they run on the main thread, the
+    // whole process would include the PATH scan
+    rusage self{};
+    getrusage(RUSAGE_THREAD, &self);
+    timeval user{};
+    timeval sys{};
+    timersub(&self.ru_utime, &self_start.ru_utime, &user);
+    timersub(&self.ru_stime, &self_start.ru_stime, &sys);
+    timeradd(&user, &children.ru_utime, &user);
+    timeradd(&sys, &children.ru_stime, &sys);
+
+    rusage switches = children;
+    switches.ru_nvcsw += self.ru_nvcsw - self_start.ru_nvcsw;
+    switches.ru_nivcsw += self.ru_nivcsw - self_start.ru_nivcsw;
+
+    std::cout.flush();
+    std::cerr << format_time_report(format, real_us, user, sys, switches);
+    std::cerr.flush();
+}
+
+void eval(const std::string &input) {
+    const auto start = trace_now();
+    eval_trace trace;
+    eval_trace *tracing = trace_fd != -1 ? &trace : nullptr;
+
+    std::string unexpected_token;
+    std::vector<pipeline> list = parse_input(input, unexpected_token);
+    trace.parse_ns = elapsed_ns(start);
+    if (!unexpected_token.empty()) {
+        std::cout << "syntax error near unexpected token `" << unexpected_token << "'" << '\n';
+        last_status = 2;
+    }
+
+    list_operator previous = list_operator::sequence;
+    for (pipeline &pipeline: list) {
+        // && and || skip a pipeline depending on the status of the last one that ran
+        const bool skip = (previous == list_operator::and_if && last_status != EXIT_SUCCESS) ||
+                          (previous == list_operator::or_if && last_status == EXIT_SUCCESS);
+        previous = pipeline.op;
+        if (skip) {
+            continue;
+        }
+
+        for (simple_command &stage: pipeline.stages) {
+            expand_exit_status(stage, last_status);
+        }
+
+        const bool background = pipeline.op == list_operator::background;
+        const auto pipeline_start = trace_now();
+        rusage self_start{};
+        getrusage(RUSAGE_THREAD, &self_start);
+        rusage children{};
+
+        // time alone has no pipeline and succeeds
+        last_status = pipeline.stages.empty() ? EXIT_SUCCESS
+                                              : run_pipeline(pipeline.stages, background, tracing, children);
+        add_rusage(trace.children, children);
+
+        // background pipelines are not waited for, so there is nothing to time
+        if (pipeline.timed && !background) {
+            print_time_report(pipeline, elapsed_us(pipeline_start), self_start, children);
+        }
+    }
+
+    if (tracing != nullptr) {
+        trace.input = input;
+        write_trace(trace, last_status, elapsed_ns(start));
     }
 }
 
@@ -170,7 +332,7 @@ void set_raw_mode(const termios &orig_termios) {
     raw.c_lflag &= ~(ECHO | ICANON); // Disable echo and canonical mode
     raw.c_cc[VMIN] = 1; // Read returns after 1 character
     raw.c_cc[VTIME] = 0; // No timeout, return immediately
-    tcsetattr(STDIN_FILENO, TCSAFLUSH, &raw);
+    tcsetattr(STDIN_FILENO, TCSANOW, &raw); // keep typed-ahead input
 }
 
 inline int set_non_blocking() {
@@ -189,14 +351,39 @@ inline void clear_chars(const size_t count) {
     }
 }
 
+bool fill_input() {
+    // everything printed so far must be visible before waiting for input
+    std::cout.flush();
+
+    ssize_t count;
+    do {
+        count = read(source_fd, input_block, sizeof(input_block));
+    } while (count == -1 && errno == EINTR);
+
+    if (count <= 0) {
+        return false;
+    }
+
+    input_start = 0;
+    input_end = count;
+    return true;
+}
+
+int read_char() {
+    if (input_start == input_end && !fill_input()) {
+        return EOF;
+    }
+    return static_cast<unsigned char>(input_block[input_start++]);
+}
+
 void handle_arrow_keys(std::string &command) {
-    const int next1 = getchar();
+    const int next1 = read_char();
     if (next1 == -1) {
         return;
     }
 
     if (next1 == '[') {
-        const int next2 = getchar();
+        const int next2 = read_char();
         if (next2 == -1) {
             return;
         }
@@ -237,15 +424,7 @@ void handle_arrow_keys(std::string &command) {
 }
 
 void handle_completions(std::string &command, bool &last_char_tab) {
-    auto completions = autocomplete_builtin(command);
-    const auto executable_completions = autocomplete_executable(command);
-    completions.insert(executable_completions.begin(), executable_completions.end());
-
-    std::vector<std::string> completions_sorted;
-    for (const auto &completion: completions) {
-        completions_sorted.push_back(completion);
-    }
-    std::ranges::sort(completions_sorted);
+    const auto completions_sorted = autocomplete(command);
 
     if (completions_sorted.size() == 1) {
         const auto &completed = completions_sorted[0];
@@ -263,7 +442,7 @@ void handle_completions(std::string &command, bool &last_char_tab) {
 
     if (completions_sorted.size() > 1 && last_char_tab) {
         // print possible completions
-        std::cout << std::endl;
+        std::cout << '\n';
         for (int i = 0; i < completions_sorted.size(); i++) {
             std::cout << completions_sorted[i];
 
@@ -271,7 +450,7 @@ void handle_completions(std::string &command, bool &last_char_tab) {
                 std::cout << '\t';
             }
         }
-        std::cout << std::endl;
+        std::cout << '\n';
         if (!piped) {
             print_prompt();
             std::cout << command;
@@ -280,7 +459,7 @@ void handle_completions(std::string &command, bool &last_char_tab) {
     }
 
     if (completions_sorted.size() > 1) {
-        const std::string common_prefix = lcp(completions_sorted);
+        const std::string common_prefix = lcp(completions_sorted.front(), completions_sorted.back());
 
         if (command.size() != common_prefix.size()) {
             if (!piped) {
@@ -298,18 +477,31 @@ void handle_completions(std::string &command, bool &last_char_tab) {
     last_char_tab = true;
 }
 
-std::vector<std::string> read_input() {
-    termios orig_termios{};
-    tcgetattr(STDIN_FILENO, &orig_termios);
-    set_raw_mode(orig_termios);
+[[noreturn]] void end_of_input() {
+    if (stdin_tty) {
+        tcsetattr(STDIN_FILENO, TCSANOW, &orig_termios);
+    }
+    exit_builtin("exit", {"exit"});
+    // exit_builtin only returns for invalid arguments
+    exit(EXIT_SUCCESS);
+}
 
+std::vector<std::string> edit_line(std::string command) {
     std::vector<std::string> command_buffer;
-    std::string command;
 
     bool last_char_tab = false;
 
     while (true) {
-        const int next = getchar();
+        const int next = read_char();
+
+        // handle end of input like the exit builtin, a last line without newline still runs
+        if (next == EOF) {
+            if (command.empty()) {
+                end_of_input();
+            }
+            command_buffer.push_back(command);
+            break;
+        }
 
         // handle escape sequences for arrow keys
         if (next == 27) {
@@ -358,44 +550,165 @@ std::vector<std::string> read_input() {
         }
     }
 
+    return command_buffer;
+}
+
+inline bool is_editing_char(const char c) {
+    return c == '\t' || c == 27 || c == 127;
+}
+
+enum class line_status { complete, needs_editing, end_of_input };
+
+// Copies the next line from the input blocks. With allow_editing it stops in front of the first char that needs
+// line editing and leaves it in the input.
+line_status read_plain_line(std::string &line, const bool allow_editing) {
+    while (true) {
+        if (input_start == input_end && !fill_input()) {
+            return line.empty() ? line_status::end_of_input : line_status::complete;
+        }
+
+        const char *begin = input_block + input_start;
+        const char *end = input_block + input_end;
+        const char *newline = std::find(begin, end, '\n');
+
+        if (allow_editing) {
+            if (const char *special = std::find_if(begin, newline, is_editing_char); special != newline) {
+                line.append(begin, special);
+                input_start += special - begin;
+                return line_status::needs_editing;
+            }
+        }
+
+        line.append(begin, newline);
+        if (newline != end) {
+            input_start += newline - begin + 1;
+            return line_status::complete;
+        }
+        input_start = input_end;
+    }
+}
+
+std::vector<std::string> read_input() {
+    // without a terminal whole lines are taken from the input and only lines with control chars are edited
+    if (!stdin_tty) {
+        print_prompt();
+
+        std::string command;
+        switch (read_plain_line(command, !reading_script)) {
+            case line_status::end_of_input:
+                end_of_input();
+            case line_status::needs_editing:
+                return edit_line(command);
+            case line_status::complete:
+                break;
+        }
+
+        if (command.empty()) {
+            return {};
+        }
+        return {command};
+    }
+
+    tcgetattr(STDIN_FILENO, &orig_termios);
+    set_raw_mode(orig_termios);
+
+    // prompt only after switching modes so no keystroke is echoed by the terminal itself
+    print_prompt();
+
+    std::vector<std::string> command_buffer = edit_line("");
+
     // restore original terminal mode
     tcsetattr(STDIN_FILENO, TCSANOW, &orig_termios);
 
     return command_buffer;
 }
 
-[[noreturn]] int main() {
-    const char *history_file = getenv("HISTFILE");
-    if (history_file == nullptr) {
-        const std::string history_file_path = std::string(getenv("HOME")) + "/.shell_history";
-        read_history(history_file_path);
-    } else {
-        read_history(history_file);
+[[noreturn]] int main(const int argc, char *argv[]) {
+    // shell -c 'command' or shell script
+    const char *command_string = nullptr;
+    if (argc > 1 && std::string(argv[1]) == "-c") {
+        if (argc < 3) {
+            std::cerr << "-c: option requires an argument" << std::endl;
+            exit(2);
+        }
+        command_string = argv[2];
+    } else if (argc > 1) {
+        source_fd = open(argv[1], O_RDONLY | O_CLOEXEC);
+        if (source_fd == -1) {
+            perror(argv[1]);
+            exit(127);
+        }
     }
+    reading_script = argc > 1;
 
-    build_executables_cache();
+    if (reading_script) {
+        history_enabled = false;
+    } else {
+        configure_history();
+        read_history(history_file_path());
+        // entries loaded on startup are already in the file
+        history_appended = history_cache.base() + history_cache.size();
+    }
 
-    // setup io
-    std::cout << std::unitbuf;
+    // setup io, without a terminal stdout is only flushed at command boundaries, before forking and before reading
+    piped = !isatty(STDOUT_FILENO);
+    if (piped) {
+        setvbuf(stdout, nullptr, _IOFBF, 1 << 16);
+    } else {
+        std::cout << std::unitbuf;
+    }
     std::cerr << std::unitbuf;
 
-    piped = !isatty(STDOUT_FILENO);
+    // finished background jobs are reaped before the next line
+    struct sigaction sigchld_action{};
+    sigchld_action.sa_handler = handle_sigchld;
+    sigemptyset(&sigchld_action.sa_mask);
+    sigchld_action.sa_flags = SA_RESTART;
+    sigaction(SIGCHLD, &sigchld_action, nullptr);
 
-    // get session and host information
-    uid = getuid();
-    pw = getpwuid(uid);
-    if (pw == nullptr) {
-        perror("error fetching user info");
-        exit(EXIT_FAILURE);
+    if (const char *trace_target = getenv("SHELL_TRACE"); trace_target != nullptr && *trace_target != '\0') {
+        open_trace(trace_target);
     }
 
-    gethostname(hostname, sizeof(hostname));
+    sentinel = getenv("SHELL_SENTINEL");
+    stdin_tty = !reading_script && isatty(STDIN_FILENO);
+
+    if (reading_script) {
+        // scripts run few distinct commands, the hash table is enough to find them
+        path = parse_path();
+    } else {
+        // get session and host information
+        uid = getuid();
+        pw = getpwuid(uid);
+        if (pw == nullptr) {
+            perror("error fetching user info");
+            exit(EXIT_FAILURE);
+        }
+
+        gethostname(hostname, sizeof(hostname));
+
+        // scan PATH in the background so the first prompt does not wait for it
+        start_executables_cache();
+    }
+
+    if (command_string != nullptr) {
+        for (const std::string &command: split(command_string, '\n')) {
+            report_finished_jobs(false);
+            eval(command);
+        }
+        exit_builtin("exit", {"exit"});
+    }
 
     // REPL
     while (true) {
-        print_prompt();
+        if (stdin_tty) {
+            report_finished_jobs(true);
+        }
+
+        // without a prompt finished jobs are reaped before every line, so scripts do not pile up zombies
         const std::vector<std::string> commands = read_input();
         for (const std::string &command: commands) {
+            report_finished_jobs(false);
             eval(command);
         }
     }
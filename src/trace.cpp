@@ -0,0 +1,180 @@
+#include "trace.h"
+
+#include <algorithm>
+#include <cerrno>
+#include <charconv>
+#include <cstdio>
+#include <fcntl.h>
+#include <unistd.h>
+#include <sys/time.h>
+
+#include "utils.h"
+
+void open_trace(const std::string &target) {
+    if (is_number(target)) {
+        // a number beyond the range of an fd is not an open fd either
+        const auto [end, error] = std::from_chars(target.data(), target.data() + target.size(), trace_fd);
+        if (error != std::errc() || end != target.data() + target.size()) {
+            errno = EBADF;
+            perror("SHELL_TRACE");
+            trace_fd = -1;
+            return;
+        }
+
+        if (fcntl(trace_fd, F_GETFD) == -1) {
+            perror("SHELL_TRACE");
+            trace_fd = -1;
+            return;
+        }
+
+        // an inherited fd is not passed on to commands, unless it is one of stdin, stdout and stderr
+        if (trace_fd > STDERR_FILENO) {
+            fcntl(trace_fd, F_SETFD, FD_CLOEXEC);
+        }
+        return;
+    }
+
+    trace_fd = open(target.c_str(), O_WRONLY | O_CREAT | O_APPEND | O_CLOEXEC, 0644);
+    if (trace_fd == -1) {
+        perror("SHELL_TRACE");
+    }
+}
+
+// length of the valid UTF-8 sequence that starts at position, 0 if the byte there does not start one
+size_t utf8_sequence_length(const std::string &str, const size_t position) {
+    const auto byte = [&str](const size_t i) { return static_cast<unsigned char>(str[i]); };
+    const unsigned char lead = byte(position);
+
+    size_t length;
+    // the range of the second byte excludes overlong encodings, surrogates and code points above U+10FFFF
+    unsigned char low = 0x80;
+    unsigned char high = 0xBF;
+    if (lead >= 0xC2 && lead <= 0xDF) {
+        length = 2;
+    } else if (lead >= 0xE0 && lead <= 0xEF) {
+        length = 3;
+        low = lead == 0xE0 ? 0xA0 : 0x80;
+        high = lead == 0xED ? 0x9F : 0xBF;
+    } else if (lead >= 0xF0 && lead <= 0xF4) {
+        length = 4;
+        low = lead == 0xF0 ? 0x90 : 0x80;
+        high = lead == 0xF4 ? 0x8F : 0xBF;
+    } else {
+        return 0;
+    }
+
+    if (position + length > str.size() || byte(position + 1) < low || byte(position + 1) > high) {
+        return 0;
+    }
+    for (size_t i = position + 2; i < position + length; i++) {
+        if (byte(i) < 0x80 || byte(i) > 0xBF) {
+            return 0;
+        }
+    }
+    return length;
+}
+
+std::string json_string(const std::string &str) {
+    std::string escaped = "\"";
+    for (size_t i = 0; i < str.size(); i++) {
+        const char c = str[i];
+        switch (c) {
+            case '"':
+                escaped += "\\\"";
+                break;
+            case '\\':
+                escaped += "\\\\";
+                break;
+            case '\n':
+                escaped += "\\n";
+                break;
+            case '\t':
+                escaped += "\\t";
+                break;
+            default:
+                if (static_cast<unsigned char>(c) < 0x20) {
+                    char code[7];
+                    snprintf(code, sizeof(code), "\\u%04x", c);
+                    escaped += code;
+                } else if (static_cast<unsigned char>(c) < 0x80) {
+                    escaped += c;
+                } else if (const size_t length = utf8_sequence_length(str, i); length != 0) {
+                    escaped.append(str, i, length);
+                    i += length - 1;
+                } else {
+                    // JSON has no raw bytes, like Python's surrogateescape an invalid byte becomes a lone surrogate,
+                    // so encode("utf-8", "surrogateescape") gives back the input
+                    char code[7];
+                    snprintf(code, sizeof(code), "\\u%04x", 0xDC00 + static_cast<unsigned char>(c));
+                    escaped += code;
+                }
+        }
+    }
+    return escaped + "\"";
+}
+
+long long timeval_us(const timeval &time) {
+    return static_cast<long long>(time.tv_sec) * 1000000 + time.tv_usec;
+}
+
+void add_rusage(rusage &total, const rusage &usage) {
+    timeradd(&total.ru_utime, &usage.ru_utime, &total.ru_utime);
+    timeradd(&total.ru_stime, &usage.ru_stime, &total.ru_stime);
+    total.ru_maxrss = std::max(total.ru_maxrss, usage.ru_maxrss);
+    total.ru_minflt += usage.ru_minflt;
+    total.ru_majflt += usage.ru_majflt;
+    total.ru_nvcsw += usage.ru_nvcsw;
+    total.ru_nivcsw += usage.ru_nivcsw;
+}
+
+void write_trace(const eval_trace &trace, const int status, const long long total_ns) {
+    long long open_ns = 0;
+    long long redirect_ns = 0;
+    long long lookup_ns = 0;
+    long long spawn_ns = 0;
+    long long builtin_ns = 0;
+    std::string stages;
+    for (const stage_trace &stage: trace.stages) {
+        open_ns += stage.open_ns;
+        redirect_ns += stage.redirect_ns;
+        lookup_ns += stage.lookup_ns;
+        spawn_ns += stage.spawn_ns;
+        builtin_ns += stage.builtin_ns;
+
+        if (!stages.empty()) {
+            stages += ",";
+        }
+        stages += "{\"command\":" + json_string(stage.command) +
+                ",\"open_ns\":" + std::to_string(stage.open_ns) +
+                ",\"redirect_ns\":" + std::to_string(stage.redirect_ns) +
+                ",\"lookup_ns\":" + std::to_string(stage.lookup_ns) +
+                ",\"spawn_ns\":" + std::to_string(stage.spawn_ns) +
+                ",\"builtin_ns\":" + std::to_string(stage.builtin_ns) + "}";
+    }
+
+    const rusage &children = trace.children;
+    const std::string line = "{\"input\":" + json_string(trace.input) +
+                             ",\"status\":" + std::to_string(status) +
+                             ",\"total_ns\":" + std::to_string(total_ns) +
+                             ",\"parse_ns\":" + std::to_string(trace.parse_ns) +
+                             ",\"open_ns\":" + std::to_string(open_ns) +
+                             ",\"redirect_ns\":" + std::to_string(redirect_ns) +
+                             ",\"lookup_ns\":" + std::to_string(lookup_ns) +
+                             ",\"spawn_ns\":" + std::to_string(spawn_ns) +
+                             ",\"builtin_ns\":" + std::to_string(builtin_ns) +
+                             ",\"wait_ns\":" + std::to_string(trace.wait_ns) +
+                             ",\"child_utime_us\":" + std::to_string(timeval_us(children.ru_utime)) +
+                             ",\"child_stime_us\":" + std::to_string(timeval_us(children.ru_stime)) +
+                             ",\"child_maxrss_kb\":" + std::to_string(children.ru_maxrss) +
+                             ",\"child_minflt\":" + std::to_string(children.ru_minflt) +
+                             ",\"child_majflt\":" + std::to_string(children.ru_majflt) +
+                             ",\"child_nvcsw\":" + std::to_string(children.ru_nvcsw) +
+                             ",\"child_nivcsw\":" + std::to_string(children.ru_nivcsw) +
+                             ",\"stages\":[" + stages + "]}\n";
+
+    // one write per line, so lines of shells sharing a file do not interleave
+    ssize_t written;
+    do {
+        written = write(trace_fd, line.data(), line.size());
+    } while (written == -1 && errno == EINTR);
+}
@@ -0,0 +1,54 @@
+#ifndef SHELL_TRACE_H
+#define SHELL_TRACE_H
+
+#include <chrono>
+#include <string>
+#include <vector>
+#include <sys/resource.h>
+
+// SHELL_TRACE=<fd or path> writes one JSON line per evaluated input, -1 while tracing is off
+inline int trace_fd = -1;
+void open_trace(const std::string &target);
+
+struct stage_trace {
+    std::string command;
+    // opening the files of redirections
+    long long open_ns = 0;
+    // dup and dup2 of redirect_io() and restore_io()
+    long long redirect_ns = 0;
+    // finding an executable in the hash table, the cache or PATH
+    long long lookup_ns = 0;
+    // posix_spawn or fork of the stage
+    long long spawn_ns = 0;
+    // builtins that run in the shell process
+    long long builtin_ns = 0;
+};
+
+struct eval_trace {
+    std::string input;
+    long long parse_ns = 0;
+    long long wait_ns = 0;
+    std::vector<stage_trace> stages;
+    // summed over all waited for children
+    rusage children{};
+};
+
+void write_trace(const eval_trace &trace, int status, long long total_ns);
+
+inline std::chrono::steady_clock::time_point trace_now() {
+    return std::chrono::steady_clock::now();
+}
+
+inline long long elapsed_us(const std::chrono::steady_clock::time_point start) {
+    return std::chrono::duration_cast<std::chrono::microseconds>(trace_now() - start).count();
+}
+
+// phases of builtins and the parser take well below a microsecond, so they are traced in nanoseconds
+inline long long elapsed_ns(const std::chrono::steady_clock::time_point start) {
+    return std::chrono::duration_cast<std::chrono::nanoseconds>(trace_now() - start).count();
+}
+
+// adds the rusage of a child, maxrss is the maximum of all children
+void add_rusage(rusage &total, const rusage &usage);
+
+#endif //SHELL_TRACE_H
@@ -2,14 +2,16 @@
 #define SHELL_UTILS_H
 
 #include <algorithm>
+#include <cstdlib>
 #include <filesystem>
+#include <limits>
 #include <ranges>
 #include <unistd.h>
-#include <regex>
+#include <string>
+#include <string_view>
+#include <vector>
 
 inline std::vector<std::string> path;
-inline std::regex ws_regex("\\s+");
-inline std::regex trim_regex("^\\s+|\\s+$");
 
 inline std::string find_executable(const std::string &executable) {
     for (const std::string &dir: path) {
@@ -21,17 +23,41 @@ inline std::string find_executable(const std::string &executable) {
     return "";
 }
 
-inline std::vector<std::string> split(const std::string &str, const char delimiter) {
-    std::string buffer;
+// the working directory, empty if it can not be determined
+inline std::string current_directory() {
+    char *cwd = getcwd(nullptr, 0);
+    if (cwd == nullptr) {
+        return "";
+    }
+
+    std::string dir = cwd;
+    free(cwd);
+    return dir;
+}
+
+inline std::string trim(const std::string_view str) {
+    const size_t start = str.find_first_not_of(" \t\n\r\f\v");
+    if (start == std::string_view::npos) {
+        return "";
+    }
+    const size_t end = str.find_last_not_of(" \t\n\r\f\v");
+    return std::string(str.substr(start, end - start + 1));
+}
+
+inline std::vector<std::string> split(const std::string_view str, const char delimiter) {
     std::vector<std::string> parts;
-    std::istringstream ss(str + delimiter);
 
-    while (std::getline(ss, buffer, delimiter)) {
-        buffer = std::regex_replace(buffer, trim_regex, "");
-        if (buffer.empty()) {
-            continue;
+    size_t start = 0;
+    while (start <= str.size()) {
+        size_t end = str.find(delimiter, start);
+        if (end == std::string_view::npos) {
+            end = str.size();
         }
-        parts.push_back(buffer);
+
+        if (std::string part = trim(str.substr(start, end - start)); !part.empty()) {
+            parts.push_back(std::move(part));
+        }
+        start = end + 1;
     }
 
     return parts;
@@ -59,141 +85,328 @@ inline bool is_number(const std::string& str) {
 }
 
 inline std::vector<std::string> parse_path() {
-    const std::string path_env = std::getenv("PATH");
+    const char *path_env = std::getenv("PATH");
+    if (path_env == nullptr) {
+        return {};
+    }
     return split(path_env, ':');
 }
 
-inline std::string parse_command(const std::string &input) {
-    std::string command;
+// operator that ends a pipeline in a command list
+enum class list_operator {
+    sequence, // ; or the end of the input
+    background, // &
+    and_if, // &&
+    or_if, // ||
+};
+
+// > and 1> redirect stdout, 2> stderr, >> appends
+struct redirection {
+    int fd = STDOUT_FILENO;
+    bool append = false;
+    std::string target;
+};
+
+struct simple_command {
+    std::vector<std::string> args;
+    std::vector<redirection> redirections;
+    // positions (argument, offset) of $?, filled in with the status of the previous pipeline before running
+    std::vector<std::pair<size_t, size_t>> exit_status_positions;
+    // source text of the command for the history
+    std::string text;
+};
+
+struct pipeline {
+    std::vector<simple_command> stages;
+    list_operator op = list_operator::sequence;
+    // prefixed with the reserved word time, -p selects the POSIX format
+    bool timed = false;
+    bool posix_time_format = false;
+};
+
+// Parses input into a list of pipelines in one pass. Quotes and escapes are resolved, operators and redirections
+// only count outside of quotes. On a syntax error the list is empty and unexpected_token is set.
+inline std::vector<pipeline> parse_input(const std::string &input, std::string &unexpected_token) {
+    std::vector<pipeline> list;
+    pipeline current_pipeline;
+    simple_command command;
+    size_t command_start = 0;
+
+    std::string word;
+    // a word can be empty, like ''
+    bool in_word = false;
+    bool word_quoted = false;
+    std::vector<size_t> word_exit_status_offsets;
     bool in_single_quotes = false;
     bool in_double_quotes = false;
     bool escaped = false;
+    bool redirection_pending = false;
 
-    for (const char c : input) {
-        // escaping
-        if (escaped) {
-            command += c;
-            escaped = false;
-            continue;
+    const auto finish_word = [&] {
+        if (!in_word) {
+            return;
         }
 
-        if (c == '\\' && !in_single_quotes) {
-            escaped = true;
-            continue;
+        if (redirection_pending) {
+            command.redirections.back().target = std::move(word);
+            redirection_pending = false;
+        } else if (const bool pipeline_start = command.args.empty() && current_pipeline.stages.empty();
+            pipeline_start && !word_quoted && word == "time" && !current_pipeline.timed) {
+            // time is only a reserved word at the start of a pipeline and unquoted
+            current_pipeline.timed = true;
+        } else if (pipeline_start && !word_quoted && word == "-p" && current_pipeline.timed &&
+                   !current_pipeline.posix_time_format) {
+            current_pipeline.posix_time_format = true;
+        } else {
+            for (const size_t offset: word_exit_status_offsets) {
+                command.exit_status_positions.emplace_back(command.args.size(), offset);
+            }
+            command.args.push_back(std::move(word));
         }
 
-        // whitespaces
-        if (isspace(c) && !in_single_quotes && !in_double_quotes) {
-            break;
-        }
+        word.clear();
+        word_exit_status_offsets.clear();
+        in_word = false;
+        word_quoted = false;
+    };
 
-        // single quotes
-        if (c == '\'' && !in_double_quotes) {
-            in_single_quotes = !in_single_quotes;
-            continue;
+    const auto finish_command = [&](const size_t end, const std::string &token) {
+        finish_word();
+        const bool empty = command.args.empty() && command.redirections.empty();
+
+        // time without a pipeline only reports the time of the shell
+        if (!redirection_pending && empty && token != "|" && current_pipeline.timed &&
+            current_pipeline.stages.empty()) {
+            return true;
         }
 
-        // double quotes
-        if (c == '"' && !in_single_quotes) {
-            in_double_quotes = !in_double_quotes;
-            continue;
+        if (redirection_pending || empty) {
+            unexpected_token = token;
+            return false;
         }
 
-        // default
-        command += c;
-    }
+        command.text = trim(std::string_view(input).substr(command_start, end - command_start));
+        current_pipeline.stages.push_back(std::move(command));
+        command = {};
+        return true;
+    };
 
-    return command;
-}
+    for (size_t i = 0; i < input.size(); i++) {
+        const char c = input[i];
 
-inline std::vector<std::string> parse_args(const std::string &arg_string) {
-    std::vector<std::string> args;
-    std::string buffer;
-    bool in_single_quotes = false;
-    bool in_double_quotes = false;
-    bool escaped = false;
-
-    for (const char c : arg_string) {
         // escaping
         if (escaped) {
-            buffer += c;
+            word += c;
             escaped = false;
             continue;
         }
 
         if (c == '\\' && !in_single_quotes) {
             escaped = true;
+            in_word = true;
+            word_quoted = true;
             continue;
         }
 
-        // single quotes
+        // quotes
         if (c == '\'' && !in_double_quotes) {
             in_single_quotes = !in_single_quotes;
+            in_word = true;
+            word_quoted = true;
+            continue;
+        }
+
+        if (c == '"' && !in_single_quotes) {
+            in_double_quotes = !in_double_quotes;
+            in_word = true;
+            word_quoted = true;
             continue;
         }
 
         if (in_single_quotes) {
-            buffer += c;
+            word += c;
             continue;
         }
 
-        // double quotes
-        if (c == '"') {
-            in_double_quotes = !in_double_quotes;
+        // $? is expanded in double quotes as well
+        if (c == '$' && i + 1 < input.size() && input[i + 1] == '?' && !redirection_pending) {
+            word_exit_status_offsets.push_back(word.size());
+            in_word = true;
+            i++;
             continue;
         }
 
         if (in_double_quotes) {
-            buffer += c;
+            word += c;
             continue;
         }
 
         // whitespaces
         if (isspace(c)) {
-            if (buffer.empty()) {
-                continue;
+            finish_word();
+            continue;
+        }
+
+        // redirections, 1> and 2> only when the digit is a word of its own
+        if (c == '>') {
+            int fd = STDOUT_FILENO;
+            if (in_word && !word_quoted && (word == "1" || word == "2")) {
+                fd = word[0] - '0';
+                word.clear();
+                in_word = false;
+            } else {
+                finish_word();
+            }
+
+            const bool append = i + 1 < input.size() && input[i + 1] == '>';
+            if (redirection_pending) {
+                unexpected_token = append ? ">>" : ">";
+                return {};
+            }
+
+            command.redirections.push_back({fd, append, ""});
+            redirection_pending = true;
+            if (append) {
+                i++;
             }
-            args.push_back(buffer);
-            buffer.clear();
             continue;
         }
 
-        // default
-        buffer += c;
+        // operators
+        if (c != '|' && c != '&' && c != ';') {
+            word += c;
+            in_word = true;
+            continue;
+        }
+
+        const bool doubled = c != ';' && i + 1 < input.size() && input[i + 1] == c;
+        const std::string token = doubled ? std::string(2, c) : std::string(1, c);
+        if (!finish_command(i, token)) {
+            return {};
+        }
+        command_start = i + token.size();
+
+        if (c == '|' && !doubled) {
+            continue;
+        }
+
+        if (c == ';') {
+            current_pipeline.op = list_operator::sequence;
+        } else if (c == '&') {
+            current_pipeline.op = doubled ? list_operator::and_if : list_operator::background;
+        } else {
+            current_pipeline.op = list_operator::or_if;
+        }
+        list.push_back(std::move(current_pipeline));
+        current_pipeline = {};
+
+        if (doubled) {
+            i++;
+        }
     }
 
-    if (!buffer.empty()) {
-        args.push_back(buffer);
+    finish_word();
+
+    // the input may end after ; and &, but not within a pipeline or after && and ||
+    if (!redirection_pending && command.args.empty() && command.redirections.empty() &&
+        current_pipeline.stages.empty()) {
+        if (!list.empty() && (list.back().op == list_operator::and_if || list.back().op == list_operator::or_if)) {
+            unexpected_token = "newline";
+            return {};
+        }
+
+        if (current_pipeline.timed) {
+            list.push_back(std::move(current_pipeline));
+        }
+        return list;
     }
-    return args;
+
+    if (!finish_command(input.size(), "newline")) {
+        return {};
+    }
+    list.push_back(std::move(current_pipeline));
+    return list;
 }
 
-inline std::string lcp(const std::vector<std::string> &candidates) {
-    std::string result;
+// fills in $? with the exit status of the last pipeline
+inline void expand_exit_status(simple_command &command, const int exit_status) {
+    const std::string status = std::to_string(exit_status);
+
+    // back to front, so inserting does not move the remaining positions of an argument
+    for (const auto &[arg, offset]: std::ranges::reverse_view(command.exit_status_positions)) {
+        command.args[arg].insert(offset, status);
+    }
+    command.exit_status_positions.clear();
+}
 
-    int index = 0;
-    while (true) {
-        if (index >= candidates[0].length()) {
-            return result;
+// Keeps the last max_size elements that were pushed. Elements keep their absolute position (base() + index), so
+// dropping the oldest ones does not renumber the rest.
+template<typename T>
+class ring_buffer {
+public:
+    void push_back(T value) {
+        if (max_size == 0) {
+            dropped++;
+            return;
         }
 
-        const char current = candidates[0][index];
+        if (elements.size() < max_size) {
+            elements.push_back(std::move(value));
+            return;
+        }
 
-        for (int i = 1; i < candidates.size(); i++) {
-            const auto &candidate = candidates[i];
+        elements[head] = std::move(value);
+        head = (head + 1) % elements.size();
+        dropped++;
+    }
 
-            if (index >= candidate.length()) {
-                return result;
-            }
+    const T &operator[](const size_t index) const {
+        return elements[(head + index) % elements.size()];
+    }
 
-            if (candidate[index] != current) {
-                return result;
-            }
-        }
+    [[nodiscard]] size_t size() const {
+        return elements.size();
+    }
+
+    [[nodiscard]] bool empty() const {
+        return elements.empty();
+    }
+
+    // number of elements that were dropped because the buffer was full
+    [[nodiscard]] size_t base() const {
+        return dropped;
+    }
 
-        index++;
-        result += current;
+    void clear() {
+        elements.clear();
+        head = 0;
+        dropped = 0;
     }
+
+    void set_max_size(const size_t size) {
+        // move the oldest element to the front before resizing
+        std::ranges::rotate(elements, elements.begin() + static_cast<std::ptrdiff_t>(head));
+        head = 0;
+
+        if (elements.size() > size) {
+            const auto excess = static_cast<std::ptrdiff_t>(elements.size() - size);
+            elements.erase(elements.begin(), elements.begin() + excess);
+            dropped += excess;
+        }
+        max_size = size;
+    }
+
+private:
+    std::vector<T> elements;
+    size_t head = 0;
+    size_t dropped = 0;
+    size_t max_size = std::numeric_limits<size_t>::max();
+};
+
+inline std::string lcp(const std::string &first, const std::string &last) {
+    // for sorted candidates the common prefix of the first and last one is shared by all of them
+    const auto [first_end, last_end] = std::ranges::mismatch(first, last);
+    return {first.begin(), first_end};
 }
 
 #endif //SHELL_UTILS_H
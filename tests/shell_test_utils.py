@@ -5,6 +5,16 @@ import tempfile
 import shutil
 import threading
 import queue
+import uuid
+import asyncio
+import atexit
+import contextlib
+import codecs
+import json
+import math
+import re
+import signal
+import time
 
 
 def _read_stream(stream, queue_obj):
@@ -17,22 +27,237 @@ def _read_stream(stream, queue_obj):
         queue_obj.put(None)  # Signal end of stream
 
 
+# matches the prompt printed in interactive mode, see print_prompt() in main.cpp
+_PROMPT_REGEX = re.compile(r"\x1b\[38;5;208m\x1b\[1m[^\x1b]*\x1b\[0m:\x1b\[34m\x1b\[1m[^\x1b]*\x1b\[0m\$ ")
+_ANSI_REGEX = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]")
+
+
+# [1]+  Running                 sleep 10 &
+_JOB_REGEX = re.compile(r"^\[(\d+)\]([+\- ])  (.{24}|\S+(?: \S+)* )(.*)$")
+
+
+# clock ticks per second of the utime and stime fields of /proc/<pid>/stat
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+# resource samples of the shells used by the current test, keyed by pid, see collect_resource_usage()
+_resource_usage = {}
+# sampling costs about 80us per command, so shells are only sampled automatically once the test runner enables it
+_resource_accounting = False
+
+
+def set_resource_accounting(enabled):
+    """Sample every ShellTester at start, after each execute, at lease and at stop
+
+    Off by default, so benchmarks that time execute() do not measure the sampling.
+    """
+    global _resource_accounting
+    _resource_accounting = enabled
+
+
+def read_proc_resources(pid):
+    """Sample the resource usage of a process from /proc/<pid>/status, stat, fd and io
+
+    Returns a dict with rss_kb, peak_rss_kb, cpu_ms, fds, threads, voluntary_switches,
+    involuntary_switches, syscr and syscw, or None if the process is gone or exiting.
+    """
+    sample = {}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key == "VmRSS":
+                    sample["rss_kb"] = int(value.split()[0])
+                elif key == "VmHWM":
+                    sample["peak_rss_kb"] = int(value.split()[0])
+                elif key == "Threads":
+                    sample["threads"] = int(value)
+                elif key == "voluntary_ctxt_switches":
+                    sample["voluntary_switches"] = int(value)
+                elif key == "nonvoluntary_ctxt_switches":
+                    sample["involuntary_switches"] = int(value)
+
+        # the command may contain spaces and parentheses, the fields start after the last ")"
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rpartition(")")[2].split()
+        sample["cpu_ms"] = (int(fields[11]) + int(fields[12])) * 1000 // _CLOCK_TICKS
+
+        sample["fds"] = len(os.listdir(f"/proc/{pid}/fd"))
+
+        with open(f"/proc/{pid}/io") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("syscr", "syscw"):
+                    sample[key] = int(value)
+    except (OSError, ValueError, IndexError):
+        return None
+
+    # an exiting process already released its memory and fds, its sample would look like a shrinking shell
+    if "rss_kb" not in sample:
+        return None
+
+    # /proc/<pid>/io may not be readable
+    sample.setdefault("syscr", 0)
+    sample.setdefault("syscw", 0)
+    return sample
+
+
+def _record_resources(pid, sample):
+    """Add a sample to the resource usage of the current test"""
+    usage = _resource_usage.setdefault(pid, {"first": sample, "max_fds": 0, "peak_rss_kb": 0})
+    usage["last"] = sample
+    usage["max_fds"] = max(usage["max_fds"], sample["fds"])
+    usage["peak_rss_kb"] = max(usage["peak_rss_kb"], sample["peak_rss_kb"])
+
+    # while the PATH scan runs its thread holds a directory open, so fd growth only compares samples without it
+    if sample["threads"] == 1:
+        usage.setdefault("settled_first", sample)
+        usage["settled_last"] = sample
+
+
+def reset_resource_usage():
+    """Forget the samples of the previous test, the test runner calls this before every test"""
+    _resource_usage.clear()
+
+
+def collect_resource_usage():
+    """Summarize the samples of all shells used since reset_resource_usage()
+
+    CPU time, context switches and write syscalls are the increase between the first and
+    the last sample of each shell, summed over the shells. fd_growth is the number of fds
+    a shell holds at its last sample beyond its first one, which catches leaked pipes and
+    dup'd stdio. It only counts samples taken after the PATH scan finished, shells that
+    never got there do not count. Returns None if no shell was sampled.
+    """
+    if not _resource_usage:
+        return None
+
+    def increase(key):
+        return sum(usage["last"][key] - usage["first"][key] for usage in _resource_usage.values())
+
+    return {
+        "shells": len(_resource_usage),
+        "peak_rss_kb": max(usage["peak_rss_kb"] for usage in _resource_usage.values()),
+        "cpu_ms": increase("cpu_ms"),
+        "fds": max(usage["max_fds"] for usage in _resource_usage.values()),
+        "fd_growth": max((usage["settled_last"]["fds"] - usage["settled_first"]["fds"]
+                          for usage in _resource_usage.values() if "settled_first" in usage), default=0),
+        "voluntary_switches": increase("voluntary_switches"),
+        "involuntary_switches": increase("involuntary_switches"),
+        "syscw": increase("syscw"),
+    }
+
+
+def strip_ansi(text):
+    """Remove ANSI escape sequences and carriage returns from terminal output"""
+    return _ANSI_REGEX.sub("", text).replace("\r", "")
+
+
+def _read_pty(fd, shell_tester):
+    """Read raw output from a pty master and append it to the tester's buffer"""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    try:
+        while True:
+            try:
+                data = os.read(fd, 4096)
+            except OSError:
+                # EIO once the shell closed its side
+                break
+            if not data:
+                break
+            with shell_tester.pty_condition:
+                shell_tester.pty_buffer += decoder.decode(data)
+                shell_tester.pty_condition.notify_all()
+    finally:
+        with shell_tester.pty_condition:
+            shell_tester.stream_closed = True
+            shell_tester.pty_condition.notify_all()
+
+
+# the PATH scan of every shell would otherwise fill the developer's ~/.cache/shell with the temporary directories of the
+# tests, worker processes of the test runner share the directory of the process that imported the harness
+_cache_home = tempfile.mkdtemp(prefix="shell-test-cache-")
+_cache_home_owner = os.getpid()
+
+
+@atexit.register
+def _remove_cache_home():
+    if os.getpid() == _cache_home_owner:
+        shutil.rmtree(_cache_home, ignore_errors=True)
+
+
+def _shell_env(env, sentinel):
+    """Build the environment for a shell process, XDG_CACHE_HOME is a temporary directory unless env sets it"""
+    full_env = os.environ.copy()
+    full_env["XDG_CACHE_HOME"] = _cache_home
+    if env:
+        full_env.update(env)
+    if sentinel:
+        full_env["SHELL_SENTINEL"] = sentinel
+    return full_env
+
+
+def _new_sentinel():
+    """Create a marker that cannot be confused with regular output"""
+    return f"__shell_sentinel_{uuid.uuid4().hex}__"
+
+
+def _strip_sentinel(line, sentinel):
+    """Remove a trailing sentinel from a line
+
+    Returns the remaining line and whether the sentinel was found.
+    """
+    if line.endswith(sentinel + "\n"):
+        return line[:-len(sentinel) - 1], True
+    return line, False
+
+
 class ShellTester:
     """Helper class to run shell commands through the shell program"""
 
     def __init__(self, shell_program_path="./shell"):
         self.shell_program_path = shell_program_path
         self.process = None
+        self.sentinel = None
+        self.stream_closed = False
         self.stdout_queue = queue.Queue()
         self.stderr_queue = queue.Queue()
         self.stdout_thread = None
         self.stderr_thread = None
+        self.pty_fd = None
+        self.pty_buffer = ""
+        self.pty_condition = threading.Condition()
+        self.trace_records = []
+        self.trace_condition = threading.Condition()
+        self.trace_thread = None
+        # count, first, last and the peak of every value of the samples of read_proc_resources(), None before
+        # the first sample
+        self.resources = None
+
+    def start_shell(self, env=None, framed=True, timeout=5, pty=False, trace=False):
+        """Start the shell process
+
+        With framed=True the shell prints a unique marker whenever it is ready for
+        the next line, so execute() can return exactly the output of one command.
+        This waits for the first marker, i.e. until the shell finished its startup.
+
+        With pty=True the shell runs on a pseudo terminal and takes its interactive
+        path (prompt, echo, redraws). Output is then framed by the prompt instead.
+
+        With trace=True the shell writes its SHELL_TRACE lines to a pipe, read them
+        with read_trace().
+        """
+        if pty:
+            self._start_pty_shell(env, timeout)
+            return
+
+        self.sentinel = _new_sentinel() if framed else None
+        full_env = _shell_env(env, self.sentinel)
 
-    def start_shell(self, env=None):
-        """Start the shell process"""
-        full_env = os.environ.copy()
-        if env:
-            full_env.update(env)
+        pass_fds = ()
+        if trace:
+            trace_read_fd, trace_write_fd = os.pipe()
+            full_env["SHELL_TRACE"] = str(trace_write_fd)
+            pass_fds = (trace_write_fd,)
 
         try:
             self.process = subprocess.Popen(
@@ -42,10 +267,18 @@ class ShellTester:
                 stderr=subprocess.STDOUT,
                 text=True,
                 env=full_env,
-                cwd=os.path.dirname(self.shell_program_path) or "."
+                cwd=os.path.dirname(self.shell_program_path) or ".",
+                pass_fds=pass_fds
             )
         except FileNotFoundError:
             raise RuntimeError(f"Shell program not found at {self.shell_program_path}")
+        finally:
+            for fd in pass_fds:
+                os.close(fd)
+
+        if trace:
+            self.trace_thread = threading.Thread(target=self._read_trace_stream, args=(trace_read_fd,), daemon=True)
+            self.trace_thread.start()
 
         # Start reader threads for stdout and stderr
         self.stdout_thread = threading.Thread(target=_read_stream, args=(self.process.stdout, self.stdout_queue), daemon=True)
@@ -53,19 +286,148 @@ class ShellTester:
         self.stdout_thread.start()
         # self.stderr_thread.start()
 
-    def execute(self, command, no_output=False):
+        if self.sentinel:
+            self._read_frames(1, timeout)
+        self._account_resources()
+
+    def _start_pty_shell(self, env, timeout):
+        """Start the shell on a pseudo terminal and wait for the first prompt"""
+        self.sentinel = None
+        master_fd, slave_fd = os.openpty()
+        try:
+            self.process = subprocess.Popen(
+                [self.shell_program_path],
+                stdin=slave_fd,
+                stdout=slave_fd,
+                stderr=slave_fd,
+                env=_shell_env(env, None),
+                cwd=os.path.dirname(self.shell_program_path) or ".",
+                start_new_session=True
+            )
+        except FileNotFoundError:
+            os.close(master_fd)
+            raise RuntimeError(f"Shell program not found at {self.shell_program_path}")
+        finally:
+            os.close(slave_fd)
+
+        self.pty_fd = master_fd
+        self.stdout_thread = threading.Thread(target=_read_pty, args=(master_fd, self), daemon=True)
+        self.stdout_thread.start()
+
+        self._read_prompts(1, timeout)
+        self._account_resources()
+
+    def _read_prompts(self, count, timeout):
+        """Collect raw terminal output until `count` prompts were printed or the stream ended
+
+        Returns the text before each prompt.
+        """
+        deadline = time.monotonic() + timeout
+        with self.pty_condition:
+            while True:
+                prompts = list(_PROMPT_REGEX.finditer(self.pty_buffer))
+                if len(prompts) >= count or self.stream_closed:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"Shell did not print a prompt within {timeout}s, got {self.pty_buffer!r}")
+                self.pty_condition.wait(remaining)
+
+            frames = []
+            start = 0
+            for prompt in prompts[:count]:
+                frames.append(self.pty_buffer[start:prompt.start()])
+                start = prompt.end()
+            if len(prompts) < count:
+                frames.append(self.pty_buffer[start:])
+                start = len(self.pty_buffer)
+            self.pty_buffer = self.pty_buffer[start:]
+        return frames
+
+    def send_keys(self, keys, delay=0):
+        """Send keystrokes to a pty shell without waiting for output
+
+        keys is a string of single characters or a list of keys, e.g. ["\x1b[A", "\n"].
+        With a delay the keys are sent one by one with that many seconds between them.
+        """
+        if self.pty_fd is None:
+            raise RuntimeError("send_keys needs a shell started with pty=True")
+
+        if not delay:
+            os.write(self.pty_fd, "".join(keys).encode())
+            return
+
+        for i, key in enumerate(keys):
+            if i > 0:
+                time.sleep(delay)
+            os.write(self.pty_fd, key.encode())
+
+    def wait_for(self, text, timeout=5):
+        """Wait until text appears in the raw pty output
+
+        Consumes and returns the output up to and including text.
+        """
+        deadline = time.monotonic() + timeout
+        with self.pty_condition:
+            while text not in self.pty_buffer:
+                remaining = deadline - time.monotonic()
+                if self.stream_closed or remaining <= 0:
+                    raise TimeoutError(f"{text!r} did not appear within {timeout}s, got {self.pty_buffer!r}")
+                self.pty_condition.wait(remaining)
+
+            end = self.pty_buffer.index(text) + len(text)
+            output = self.pty_buffer[:end]
+            self.pty_buffer = self.pty_buffer[end:]
+        return output
+
+    def _read_frames(self, count, timeout):
+        """Collect output lines until `count` sentinels were read or the stream ended"""
+        output = []
+        while count > 0:
+            try:
+                line = self.stdout_queue.get(timeout=timeout)
+            except queue.Empty:
+                raise TimeoutError(f"Shell did not finish within {timeout}s, got {output}")
+
+            if line is None:
+                # keep the end of stream visible for following calls
+                self.stdout_queue.put(None)
+                self.stream_closed = True
+                break
+
+            line, found = _strip_sentinel(line, self.sentinel)
+            if found:
+                count -= 1
+
+            if line:
+                output.append(line)
+        return output
+
+    def execute(self, command, no_output=False, timeout=5):
         """Execute a command and return the output.
 
-        This will wait for output to be available on the stdout queue.
-        Reads lines until it finds the prompt, then extracts and returns the output.
+        In framed mode this reads until the shell signals that it is ready for the next
+        line, once for every line sent. The output is discarded if no_output is set.
+        Otherwise it waits for the first line on the stdout queue and drains the rest.
         """
         if not self.process:
             raise RuntimeError("Shell process not started. Call start() first.")
 
+        if self.pty_fd is not None:
+            output = self._execute_pty(command, no_output, timeout)
+            self._account_resources()
+            return output
+
         self.process.stdin.write(command + "\n")
         self.process.stdin.flush()
 
+        if self.sentinel:
+            output = self._read_frames(command.count("\n") + 1, timeout)
+            self._account_resources()
+            return [] if no_output else output
+
         if no_output:
+            self._account_resources()
             return []
 
         output = [self.stdout_queue.get()]
@@ -74,8 +436,100 @@ class ShellTester:
                 break
             output.append(self.stdout_queue.get_nowait())
 
+        self._account_resources()
         return output
 
+    def _execute_pty(self, command, no_output, timeout):
+        """Type a command into a pty shell and return its output without echo, prompt and escape sequences"""
+        self.send_keys(command + "\n")
+        frames = self._read_prompts(command.count("\n") + 1, timeout)
+        if no_output:
+            return []
+
+        output = []
+        for frame in frames:
+            # the first line is the echo of the typed input
+            output.extend(strip_ansi(frame).splitlines(keepends=True)[1:])
+        return output
+
+    def _read_trace_stream(self, fd):
+        with os.fdopen(fd, "r") as stream:
+            for line in stream:
+                with self.trace_condition:
+                    self.trace_records.append(json.loads(line))
+                    self.trace_condition.notify_all()
+
+    def read_trace(self, count=1, timeout=5):
+        """Wait for count trace records, one per evaluated line, and return all records read so far"""
+        deadline = time.monotonic() + timeout
+        with self.trace_condition:
+            while len(self.trace_records) < count:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"Expected {count} trace records within {timeout}s, got {len(self.trace_records)}")
+                self.trace_condition.wait(remaining)
+
+            records = self.trace_records
+            self.trace_records = []
+        return records
+
+    def jobs(self):
+        """Return the background jobs of the shell as dicts with id, current, state and command
+
+        Like in bash, finished jobs are only listed once.
+        """
+        jobs = []
+        for line in self.execute("jobs"):
+            match = _JOB_REGEX.match(line.rstrip("\n"))
+            if match:
+                jobs.append({"id": int(match[1]), "current": match[2], "state": match[3].strip(),
+                             "command": match[4]})
+        return jobs
+
+    def job_pids(self):
+        """Return the pid of the last stage of every background job"""
+        return [int(line) for line in self.execute("jobs -p")]
+
+    def wait_for_job(self, job_id, state="Done", timeout=5):
+        """Poll the jobs of the shell until the job reaches a state like Done or Exit 1 and return it"""
+        deadline = time.monotonic() + timeout
+        while True:
+            for job in self.jobs():
+                if job["id"] == job_id and job["state"] == state:
+                    return job
+
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Job {job_id} did not reach state {state!r} within {timeout}s")
+            time.sleep(0.01)
+
+    def sample_resources(self):
+        """Sample the resource usage of the shell, also counted for the current test with accounting enabled
+
+        Returns the sample, or None if the shell already exited.
+        """
+        if not self.is_alive():
+            return None
+
+        sample = read_proc_resources(self.process.pid)
+        if sample is None:
+            return None
+
+        if self.resources is None:
+            self.resources = {"count": 0, "first": sample, "peak": dict(sample)}
+        self.resources["count"] += 1
+        self.resources["last"] = sample
+        for key, value in sample.items():
+            self.resources["peak"][key] = max(self.resources["peak"][key], value)
+
+        if _resource_accounting:
+            _record_resources(self.process.pid, sample)
+        return sample
+
+    def _account_resources(self):
+        """Sample the shell if the test runner enabled resource accounting"""
+        if _resource_accounting:
+            self.sample_resources()
+
     def is_alive(self):
         """Check if the shell process is still running"""
         if not self.process:
@@ -98,6 +552,7 @@ class ShellTester:
     def stop(self):
         """Stop the shell process"""
         if self.process:
+            self._account_resources()
             try:
                 self.process.terminate()
                 self.process.wait(timeout=2)
@@ -105,6 +560,10 @@ class ShellTester:
                 self.process.kill()
             self.process = None
 
+        if self.pty_fd is not None:
+            os.close(self.pty_fd)
+            self.pty_fd = None
+
     def __enter__(self):
         return self
 
@@ -112,6 +571,289 @@ class ShellTester:
         self.stop()
 
 
+class AsyncShellTester:
+    """asyncio based variant of ShellTester
+
+    It needs no reader thread, so a single event loop can drive many shells at once.
+    Output is always framed with a sentinel.
+    """
+
+    def __init__(self, shell_program_path="./shell"):
+        self.shell_program_path = shell_program_path
+        self.process = None
+        self.sentinel = None
+
+    async def start_shell(self, env=None, timeout=5):
+        """Start the shell process and wait until it is ready for input"""
+        self.sentinel = _new_sentinel()
+
+        try:
+            self.process = await asyncio.create_subprocess_exec(
+                self.shell_program_path,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                env=_shell_env(env, self.sentinel),
+                cwd=os.path.dirname(self.shell_program_path) or ".",
+                limit=2 ** 20
+            )
+        except FileNotFoundError:
+            raise RuntimeError(f"Shell program not found at {self.shell_program_path}")
+
+        await self._read_frames(1, timeout)
+
+    async def _read_frames(self, count, timeout):
+        """Collect output lines until `count` sentinels were read or the stream ended"""
+        output = []
+        while count > 0:
+            try:
+                line = await asyncio.wait_for(self.process.stdout.readline(), timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"Shell did not finish within {timeout}s, got {output}")
+
+            if not line:
+                break
+
+            line, found = _strip_sentinel(line.decode(), self.sentinel)
+            if found:
+                count -= 1
+
+            if line:
+                output.append(line)
+        return output
+
+    async def execute(self, command, no_output=False, timeout=5):
+        """Execute a command and return the output.
+
+        Reads until the shell signals that it is ready for the next line, once for every line sent.
+        """
+        if not self.process:
+            raise RuntimeError("Shell process not started. Call start_shell() first.")
+
+        self.process.stdin.write((command + "\n").encode())
+        await self.process.stdin.drain()
+
+        output = await self._read_frames(command.count("\n") + 1, timeout)
+        return [] if no_output else output
+
+    def is_alive(self):
+        """Check if the shell process is still running"""
+        if not self.process:
+            return False
+        return self.process.returncode is None
+
+    async def wait_for_exit(self, timeout=2):
+        """Wait for the shell process to exit naturally.
+
+        Returns True if the process exited, False if timeout occurred.
+        """
+        if not self.process:
+            return True
+        try:
+            await asyncio.wait_for(self.process.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def stop(self):
+        """Stop the shell process"""
+        if self.process:
+            if self.process.returncode is None:
+                self.process.terminate()
+                if not await self.wait_for_exit(timeout=2):
+                    self.process.kill()
+                    await self.process.wait()
+            self.process = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+
+TRACE_PHASES = ["total_ns", "parse_ns", "open_ns", "redirect_ns", "lookup_ns", "spawn_ns", "builtin_ns", "wait_ns"]
+
+
+def aggregate_trace(records, phases=TRACE_PHASES):
+    """Aggregate SHELL_TRACE records into a histogram per phase
+
+    Durations fall into power of two buckets, each keyed by its upper bound in nanoseconds.
+    """
+    aggregate = {}
+    for phase in phases:
+        durations = [record[phase] for record in records]
+        histogram = {}
+        for duration in durations:
+            bucket = 1 << max(math.ceil(math.log2(duration)), 0) if duration > 0 else 0
+            histogram[bucket] = histogram.get(bucket, 0) + 1
+
+        aggregate[phase] = {
+            "count": len(durations),
+            "total_ns": sum(durations),
+            "max_ns": max(durations, default=0),
+            "histogram": dict(sorted(histogram.items())),
+        }
+    return aggregate
+
+
+def run_script(shell_program_path, script, env=None, mode="file", timeout=10):
+    """Run a script non-interactively and return the exit code and the output lines
+
+    mode "file" passes the script as a file argument, "c" passes it with -c and
+    "stdin" pipes it into the shell.
+    """
+    args = [shell_program_path]
+    stdin = None
+    script_dir = None
+    if mode == "file":
+        script_dir = tempfile.mkdtemp()
+        script_path = os.path.join(script_dir, "script.sh")
+        write_file(script_path, script)
+        args.append(script_path)
+    elif mode == "c":
+        args += ["-c", script]
+    elif mode == "stdin":
+        stdin = script
+    else:
+        raise ValueError(f"Unknown mode {mode}")
+
+    try:
+        result = subprocess.run(
+            args,
+            input=stdin,
+            stdin=None if stdin is not None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            env=_shell_env(env, None),
+            cwd=os.path.dirname(shell_program_path) or ".",
+            timeout=timeout
+        )
+    except FileNotFoundError:
+        raise RuntimeError(f"Shell program not found at {shell_program_path}")
+    finally:
+        if script_dir:
+            cleanup_test_environment(script_dir)
+
+    return result.returncode, result.stdout.splitlines(keepends=True)
+
+
+def _kill_children(pid):
+    """Kill every child process of pid, like the stages of its background jobs"""
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            children = [int(child) for child in f.read().split()]
+    except OSError:
+        return
+
+    for child in children:
+        try:
+            os.kill(child, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+class ShellPool:
+    """Keeps started shells around so tests can reuse them instead of paying for startup
+
+    Shells are keyed by the env they were started with. Between leases the working
+    directory is reset and the history is cleared, so a leased shell does not see
+    the history loaded from HISTFILE at startup. Tests that depend on that should
+    start their own ShellTester.
+    """
+
+    def __init__(self, shell_program_path="./shell"):
+        self.shell_program_path = shell_program_path
+        self.idle = {}
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def lease(self, env=None):
+        """Lease a running shell for the given env and return it to the pool afterwards"""
+        key = tuple(sorted((env or {}).items()))
+        shell_tester = self._acquire(key)
+        if shell_tester is None:
+            shell_tester = ShellTester(self.shell_program_path)
+            shell_tester.start_shell(env=env)
+        else:
+            # the usage of a reused shell only counts from here on for the leasing test
+            shell_tester._account_resources()
+
+        try:
+            yield shell_tester
+        except BaseException:
+            # the shell may be in the middle of a command
+            shell_tester.stop()
+            raise
+
+        if shell_tester.is_alive() and not shell_tester.stream_closed:
+            with self.lock:
+                self.idle.setdefault(key, []).append(shell_tester)
+        else:
+            shell_tester.stop()
+
+    def _acquire(self, key):
+        """Take an idle shell for key and reset it, returns None if there is no usable one"""
+        while True:
+            with self.lock:
+                shells = self.idle.get(key)
+                if not shells:
+                    return None
+                shell_tester = shells.pop()
+
+            if self._reset(shell_tester):
+                return shell_tester
+            shell_tester.stop()
+
+    def _reset(self, shell_tester):
+        """Bring a shell back to the state of a freshly started one
+
+        Background jobs are ended, the working directory, the hash table and the history are reset.
+        """
+        if not shell_tester.is_alive() or shell_tester.stream_closed:
+            return False
+
+        cwd = os.path.abspath(os.path.dirname(self.shell_program_path) or ".")
+        try:
+            # background jobs of the last lease are killed, wait then reaps them and empties the job table
+            _kill_children(shell_tester.process.pid)
+            shell_tester.execute("wait", no_output=True)
+            shell_tester.execute(f"cd '{cwd}'", no_output=True)
+            shell_tester.execute("hash -r", no_output=True)
+            shell_tester.execute("history -c", no_output=True)
+        except (BrokenPipeError, TimeoutError):
+            return False
+        return not shell_tester.stream_closed
+
+    def close(self):
+        """Stop all idle shells"""
+        with self.lock:
+            shells = [shell_tester for shells in self.idle.values() for shell_tester in shells]
+            self.idle.clear()
+        for shell_tester in shells:
+            shell_tester.stop()
+
+
+_pools = {}
+
+
+def lease_shell(shell_program_path, env=None):
+    """Lease a started shell from the pool for shell_program_path
+
+    Use as a context manager instead of creating and stopping a ShellTester.
+    """
+    if shell_program_path not in _pools:
+        _pools[shell_program_path] = ShellPool(shell_program_path)
+    return _pools[shell_program_path].lease(env)
+
+
+@atexit.register
+def _close_pools():
+    for pool in _pools.values():
+        pool.close()
+
+
 def create_test_environment(temp_dir=None):
     """Create a temporary test environment"""
     if temp_dir is None:
@@ -137,6 +879,16 @@ def write_file(path, content):
         f.write(content)
 
 
+def create_executables(directory, count):
+    """Create count empty executables in directory"""
+    os.makedirs(directory, exist_ok=True)
+    for i in range(count):
+        file_path = f"{directory}/cmd{i:06d}"
+        with open(file_path, "w"):
+            pass
+        os.chmod(file_path, 0o755)
+
+
 def read_file(path):
     """Read content from a file"""
     with open(path, 'r') as f:
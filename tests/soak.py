@@ -0,0 +1,156 @@
+"""Soak test that runs millions of commands in one shell session and watches its RSS and open fds
+
+The shell runs a repeating mix of cd, pwd, echo, redirections, builtin pipelines and every few rounds external
+pipelines and a background job. Commands are joined into command lists of --batch commands per line. Growth is
+measured from the sample after the warmup to the last one, so caches that fill once do not count as leaks.
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+
+from shell_test_utils import ShellTester, read_proc_resources, create_test_environment, cleanup_test_environment
+
+
+def soak_commands(tmp_dir, external_every):
+    """Return an endless iterator over the mixed commands of the soak"""
+    builtins = [
+        f"cd {tmp_dir}/dir",
+        "pwd",
+        "cd ..",
+        "echo soak $? > /dev/null",
+        f"echo out > {tmp_dir}/out",
+        f"echo more >> {tmp_dir}/out 2> {tmp_dir}/err",
+        "pwd | echo piped",
+        "type echo > /dev/null",
+        "false || cd",
+        f"cd {tmp_dir}/missing 2> /dev/null",
+        "echo 'quoted \"words\"' \\$? done",
+        f"cd {tmp_dir}",
+    ]
+    externals = [
+        "echo external | cat > /dev/null",
+        f"ls {tmp_dir} | wc -l > {tmp_dir}/count",
+        "true & wait",
+    ]
+
+    for round_number in itertools.count():
+        yield from builtins
+        if external_every and round_number % external_every == 0:
+            yield from externals
+
+
+def plot(samples, key, title, width=64, height=10):
+    """Return an ASCII chart of samples[key] over the number of commands"""
+    values = [sample[key] for sample in samples]
+    low, high = min(values), max(values)
+    span = high - low or 1
+
+    # one column per sample, or evenly spread samples if there are more than fit
+    if len(values) > width:
+        columns = [values[i * (len(values) - 1) // (width - 1)] for i in range(width)]
+    else:
+        columns = values
+    rows = []
+    for row in range(height - 1, -1, -1):
+        threshold = low + span * row / (height - 1)
+        label = f"{threshold:>10.0f} |" if row in (0, height - 1) else " " * 10 + " |"
+        rows.append(label + "".join("*" if value >= threshold else " " for value in columns))
+
+    rows.append(" " * 11 + "+" + "-" * len(columns))
+    rows.append(" " * 12 + f"0{samples[-1]['commands']:>{len(columns) - 1}} commands")
+    return f"{title}\n" + "\n".join(rows)
+
+
+def soak(shell_executable, commands, batch, samples, warmup, external_every, pty=False):
+    """Run the soak and return the samples of RSS and open fds"""
+    tmp_dir = create_test_environment()
+    os.makedirs(f"{tmp_dir}/dir")
+    shell_tester = ShellTester(shell_executable)
+    # a bounded history, unbounded growth of the history would look like a leak
+    shell_tester.start_shell(env={"HISTFILE": "/dev/null", "HISTSIZE": "100"}, pty=pty)
+
+    results = []
+    interval = max(commands // samples, batch)
+    source = soak_commands(tmp_dir, external_every)
+    start = time.monotonic()
+    try:
+        executed = 0
+        next_sample = 0
+        while executed < commands:
+            if executed >= next_sample:
+                sample = read_proc_resources(shell_tester.process.pid)
+                if sample is None:
+                    raise RuntimeError(f"The shell exited after {executed} commands")
+
+                results.append({"commands": executed, "seconds": round(time.monotonic() - start, 3),
+                                "rss_kb": sample["rss_kb"], "fds": sample["fds"]})
+                next_sample += interval
+
+            line = "; ".join(itertools.islice(source, batch))
+            shell_tester.execute(line, no_output=True, timeout=60)
+            executed += batch
+
+        sample = read_proc_resources(shell_tester.process.pid)
+        results.append({"commands": executed, "seconds": round(time.monotonic() - start, 3),
+                        "rss_kb": sample["rss_kb"], "fds": sample["fds"]})
+    finally:
+        shell_tester.stop()
+        cleanup_test_environment(tmp_dir)
+
+    # the growth is measured from the first sample after the warmup
+    baseline = next(result for result in results if result["commands"] >= commands * warmup)
+    return results, baseline
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("shell_executable", help="path to the compiled shell executable")
+    parser.add_argument("-n", "--commands", type=int, default=1_000_000, help="number of commands to run")
+    parser.add_argument("--batch", type=int, default=200, help="commands per input line")
+    parser.add_argument("--samples", type=int, default=100, help="number of RSS and fd samples")
+    parser.add_argument("--warmup", type=float, default=0.1,
+                        help="fraction of the commands after which growth is counted")
+    parser.add_argument("--external-every", type=int, default=20,
+                        help="rounds of builtins between external commands, 0 for builtins only")
+    parser.add_argument("--max-rss-growth", type=int, default=1024, help="maximum RSS growth in kB")
+    parser.add_argument("--max-fd-growth", type=int, default=0, help="maximum growth of open fds")
+    parser.add_argument("--pty", action="store_true", help="run the interactive path with prompts on a pty")
+    parser.add_argument("--json", help="write the samples to this file")
+    args = parser.parse_args()
+
+    results, baseline = soak(args.shell_executable, args.commands, args.batch, args.samples, args.warmup,
+                             args.external_every, args.pty)
+    last = results[-1]
+
+    print(plot(results, "rss_kb", "RSS in kB"))
+    print()
+    print(plot(results, "fds", "Open fds"))
+    print()
+
+    rss_growth = last["rss_kb"] - baseline["rss_kb"]
+    fd_growth = last["fds"] - baseline["fds"]
+    rate = last["commands"] / last["seconds"] if last["seconds"] else 0
+    print(f"{last['commands']} commands in {last['seconds']:.1f}s ({rate:.0f}/s)")
+    print(f"RSS {baseline['rss_kb']} kB -> {last['rss_kb']} kB ({rss_growth:+} kB) after {baseline['commands']} commands")
+    print(f"fds {baseline['fds']} -> {last['fds']} ({fd_growth:+})")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"baseline": baseline, "samples": results}, f, indent=2)
+
+    failures = []
+    if rss_growth > args.max_rss_growth:
+        failures.append(f"RSS grew by {rss_growth} kB, more than {args.max_rss_growth} kB")
+    if fd_growth > args.max_fd_growth:
+        failures.append(f"open fds grew by {fd_growth}, more than {args.max_fd_growth}")
+
+    for failure in failures:
+        print(f"✗ {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
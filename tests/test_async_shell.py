@@ -0,0 +1,39 @@
+from shell_test_utils import AsyncShellTester
+import asyncio
+
+
+def test_concurrent_shells(shell_executable):
+    """Test that many shells can be driven from one event loop.
+
+    This test verifies:
+    1. Every shell answers its own commands
+    2. Output of concurrently running shells does not get mixed up
+    """
+
+    async def session(i):
+        async with AsyncShellTester(shell_executable) as shell_tester:
+            await shell_tester.start_shell()
+            for j in range(5):
+                output = await shell_tester.execute(f"echo shell {i} command {j}")
+                assert output == [f"shell {i} command {j}\n"], f'Expected "shell {i} command {j}" but got {output}'
+
+    async def main():
+        await asyncio.gather(*(session(i) for i in range(50)))
+
+    asyncio.run(main())
+
+
+def test_async_exit(shell_executable):
+    """Test that an asynchronously driven shell exits on the exit builtin."""
+
+    async def main():
+        shell_tester = AsyncShellTester(shell_executable)
+        await shell_tester.start_shell()
+        try:
+            await shell_tester.execute("exit", no_output=True)
+            assert await shell_tester.wait_for_exit(), "Process did not exit after executing the exit command"
+            assert not shell_tester.is_alive(), "Process is still alive after exit command"
+        finally:
+            await shell_tester.stop()
+
+    asyncio.run(main())
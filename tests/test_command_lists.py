@@ -0,0 +1,94 @@
+from shell_test_utils import ShellTester, run_script, lease_shell
+
+
+def test_sequences(shell_executable):
+    with lease_shell(shell_executable) as shell_tester:
+        output = shell_tester.execute("echo first; echo second;echo third")
+        assert output == ["first\n", "second\n", "third\n"], f"Expected ['first', 'second', 'third'], got {output}"
+
+        output = shell_tester.execute("echo 'a;b' \"c && d\" e\\;f")
+        assert output == ["a;b c && d e;f\n"], f"Expected ['a;b c && d e;f'], got {output}"
+
+        output = shell_tester.execute("echo one | wc -w; echo two")
+        assert output == ["1\n", "two\n"], f"Expected ['1', 'two'], got {output}"
+
+
+def test_conditional_lists(shell_executable):
+    with lease_shell(shell_executable) as shell_tester:
+        output = shell_tester.execute("true && echo and")
+        assert output == ["and\n"], f"Expected ['and'], got {output}"
+
+        output = shell_tester.execute("false && echo and")
+        assert output == [], f"Expected no output, got {output}"
+
+        output = shell_tester.execute("false || echo or")
+        assert output == ["or\n"], f"Expected ['or'], got {output}"
+
+        output = shell_tester.execute("true || echo or")
+        assert output == [], f"Expected no output, got {output}"
+
+        # a skipped pipeline keeps the status of the last one that ran
+        output = shell_tester.execute("false && echo skipped || echo recovered")
+        assert output == ["recovered\n"], f"Expected ['recovered'], got {output}"
+
+        output = shell_tester.execute("cd /nonexistent && echo moved || echo failed")
+        assert output == ["cd: /nonexistent: No such file or directory\n", "failed\n"], \
+            f"Expected the error and ['failed'], got {output}"
+
+
+def test_exit_status(shell_executable):
+    with lease_shell(shell_executable) as shell_tester:
+        output = shell_tester.execute("true; echo $?")
+        assert output == ["0\n"], f"Expected ['0'], got {output}"
+
+        output = shell_tester.execute("false; echo $? '$?' \"$?\"")
+        assert output == ["1 $? 1\n"], f"Expected ['1 $? 1'], got {output}"
+
+        output = shell_tester.execute("sh -c 'exit 42'")
+        output = shell_tester.execute("echo $?")
+        assert output == ["42\n"], f"Expected ['42'], got {output}"
+
+        output = shell_tester.execute("nonexistent_command; echo $?")
+        assert output == ["nonexistent_command: command not found\n", "127\n"], \
+            f"Expected the error and ['127'], got {output}"
+
+        # the status of a pipeline is the status of its last stage
+        output = shell_tester.execute("false | true; echo $?")
+        assert output == ["0\n"], f"Expected ['0'], got {output}"
+
+        output = shell_tester.execute("true | false; echo $?")
+        assert output == ["1\n"], f"Expected ['1'], got {output}"
+
+        output = shell_tester.execute("type nonexistent_command; echo $?")
+        assert output == ["nonexistent_command not found\n", "1\n"], f"Expected the error and ['1'], got {output}"
+
+
+def test_background_in_lists(shell_executable):
+    shell_tester = ShellTester(shell_executable)
+    shell_tester.start_shell()
+
+    try:
+        output = shell_tester.execute("sleep 0.1 & sleep 0.1 & wait; echo done")
+        assert output == ["done\n"], f"Expected ['done'], got {output}"
+    finally:
+        shell_tester.stop()
+
+
+def test_syntax_errors(shell_executable):
+    with lease_shell(shell_executable) as shell_tester:
+        for command, token in [("; echo a", ";"), ("echo a && && echo b", "&&"), ("echo a ||", "newline"),
+                               ("echo a | | wc", "|"), ("echo a |", "newline"), ("&", "&")]:
+            output = shell_tester.execute(command)
+            assert output == [f"syntax error near unexpected token `{token}'\n"], \
+                f"Expected a syntax error near {token} for {command!r}, got {output}"
+
+            output = shell_tester.execute("echo $?")
+            assert output == ["2\n"], f"Expected ['2'], got {output}"
+
+
+def test_script_exits_with_last_status(shell_executable):
+    code, output = run_script(shell_executable, "echo a\nfalse")
+    assert code == 1, f"Expected exit code 1 but got {code}"
+
+    code, output = run_script(shell_executable, "false || true", mode="c")
+    assert code == 0, f"Expected exit code 0 but got {code}"
@@ -0,0 +1,101 @@
+import math
+import os
+import random
+import sys
+
+BENCHMARK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks")
+sys.path.insert(0, BENCHMARK_DIR)
+
+from compare import compare, mann_whitney_u, minimum_p_value, minimum_rounds
+
+
+def test_same_distribution_is_not_significant(shell_executable):
+    """Test that runs with correlated iterations from the same distribution are not flagged.
+
+    Every run gets its own offset, like a run that happened to land on a busy machine. Comparing
+    the run medians must not turn that into significant differences.
+    """
+    rng = random.Random(1)
+
+    def runs(count):
+        medians = []
+        for _ in range(count):
+            offset = rng.gauss(0, 20)
+            samples = sorted(100 + offset + rng.gauss(0, 5) for _ in range(200))
+            medians.append(samples[100])
+        return medians
+
+    flagged = 0
+    for _ in range(200):
+        baseline = {"bench": {"case": {"unit": "us", "higher_is_better": False, "runs": runs(6)}}}
+        candidate = {"bench": {"case": {"unit": "us", "higher_is_better": False, "runs": runs(6)}}}
+        flagged += compare(baseline, candidate, threshold=5, alpha=0.01)[0]["verdict"] != ""
+    assert flagged <= 4, f"Expected about 1% false positives but {flagged} of 200 comparisons were flagged"
+
+    p_value = mann_whitney_u([100, 101, 102, 103, 104, 105], [120, 121, 122, 123, 124, 125])
+    assert p_value < 0.01, f"Expected a clear shift to be significant but got p={p_value}"
+    assert minimum_rounds(0.01) == 5, f"Expected 5 rounds for alpha 0.01 but got {minimum_rounds(0.01)}"
+
+
+def test_mann_whitney_u(shell_executable):
+    """Test the exact p-values without ties and the normal approximation with ties."""
+    cases = [
+        # U = 0, 1 of the 20 orderings of 3 and 3 values is as extreme on each side
+        (([1, 2, 3], [4, 5, 6]), 0.1),
+        (([4, 5, 6], [1, 2, 3]), 0.1),
+        # 2 of the 252 orderings of 5 and 5 values
+        (([1, 2, 3, 4, 5], [6, 7, 8, 9, 10]), 2 / 252),
+        # U = 6, 24 of the 70 orderings of 4 and 4 values have a U of at most 6
+        (([1, 3, 5, 7], [2, 4, 6, 8]), 48 / 70),
+        # only ties, nothing to tell apart
+        (([5, 5, 5], [5, 5, 5]), 1.0),
+        # ties use the normal approximation, U = 1 with a tie corrected variance of 75 / 7
+        (([1, 1, 2, 2], [2, 3, 3, 3]), math.erfc((8 - 1 - 0.5) / math.sqrt(75 / 7) / math.sqrt(2))),
+    ]
+    for (first, second), expected in cases:
+        p_value = mann_whitney_u(first, second)
+        assert math.isclose(p_value, expected, rel_tol=1e-9), \
+            f"Expected p={expected} for {first} and {second} but got {p_value}"
+
+    assert math.isnan(mann_whitney_u([], [1, 2])), "Expected no p-value without runs"
+    assert minimum_p_value(3, 3) == 0.1, f"Expected 0.1 for 3 and 3 runs but got {minimum_p_value(3, 3)}"
+
+
+def test_compare_verdicts(shell_executable):
+    """Test that only significant changes beyond the threshold get a verdict.
+
+    This test verifies:
+    1. A slower case is a regression and a faster one an improvement
+    2. For higher_is_better cases the direction is reversed
+    3. Significant changes within the threshold and large changes without significance are noise
+    4. Cases only one side has are skipped
+    """
+    def case(runs, higher_is_better=False):
+        return {"unit": "us", "higher_is_better": higher_is_better, "runs": runs}
+
+    base = [100, 101, 102, 103, 104, 105]
+    baseline = {"bench": {
+        "slower": case(base),
+        "faster": case(base),
+        "throughput": case(base, higher_is_better=True),
+        "within_threshold": case(base),
+        "noisy": case([100, 150, 90, 160, 95, 140]),
+        "baseline_only": case(base),
+    }}
+    candidate = {"bench": {
+        "slower": case([120, 121, 122, 123, 124, 125]),
+        "faster": case([80, 81, 82, 83, 84, 85]),
+        "throughput": case([80, 81, 82, 83, 84, 85], higher_is_better=True),
+        "within_threshold": case([106, 106.5, 107, 107.5, 108, 108.5]),
+        "noisy": case([150, 100, 170, 98, 165, 155]),
+        "candidate_only": case(base),
+    }}
+
+    rows = {row["case"]: row for row in compare(baseline, candidate, threshold=5, alpha=0.01)}
+    verdicts = {name: row["verdict"] for name, row in rows.items()}
+    assert verdicts == {"slower": "regression", "faster": "improvement", "throughput": "regression",
+                        "within_threshold": "", "noisy": ""}, f"Expected the verdicts by case but got {verdicts}"
+    assert rows["within_threshold"]["p_value"] < 0.01, \
+        f"Expected the change within the threshold to be significant but got {rows['within_threshold']}"
+    assert rows["noisy"]["change_percent"] > 5, f"Expected a large change of the noisy case but got {rows['noisy']}"
+    assert rows["slower"]["runs"] == [6, 6], f"Expected the number of runs but got {rows['slower']['runs']}"
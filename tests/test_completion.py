@@ -81,3 +81,21 @@ def test_longest_common_prefix(shell_executable):
     finally:
         shell_tester.stop()
         cleanup_test_environment(tmp_dir)
+
+
+def test_builtin_and_executable_completion(shell_executable):
+    tmp_dir = create_test_environment()
+    write_file(f"{tmp_dir}/exit_tool", "")
+    os.chmod(f"{tmp_dir}/exit_tool", 0o755)
+    write_file(f"{tmp_dir}/echo", "")
+    os.chmod(f"{tmp_dir}/echo", 0o755)
+
+    shell_tester = ShellTester(shell_executable)
+    shell_tester.start_shell(env={"PATH": tmp_dir})
+
+    try:
+        output = shell_tester.execute("e\t\t")
+        assert output[:2] == ["\x07\n", "echo\texit\texit_tool\n"], f"Expected \"echo\texit\texit_tool\", got \"{output}\""
+    finally:
+        shell_tester.stop()
+        cleanup_test_environment(tmp_dir)
@@ -1,14 +1,10 @@
-from shell_test_utils import ShellTester
+from shell_test_utils import lease_shell
 
 
 def test_echo(shell_executable):
-    shell_tester = ShellTester(shell_executable)
-    shell_tester.start_shell()
+    with lease_shell(shell_executable) as shell_tester:
+        test_strings = ["pineapple pear", "mango blueberry strawberry"]
 
-    test_strings = ["pineapple pear", "mango blueberry strawberry"]
-
-    for test_string in test_strings:
-        output = shell_tester.execute(f"echo {test_string}")[0]
-        assert output == f"{test_string}\n", f"Expected \"{test_string}\" but got \"{output}\""
-
-    shell_tester.stop()
+        for test_string in test_strings:
+            output = shell_tester.execute(f"echo {test_string}")[0]
+            assert output == f"{test_string}\n", f"Expected \"{test_string}\" but got \"{output}\""
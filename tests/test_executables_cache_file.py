@@ -0,0 +1,109 @@
+from shell_test_utils import ShellTester, create_test_environment, cleanup_test_environment, write_file, file_exists, read_file
+import os
+import subprocess
+import time
+
+
+def create_executable(path, content="#!/bin/sh\n"):
+    write_file(path, content)
+    os.chmod(path, 0o755)
+
+
+def age_directory(path):
+    """Move the mtime of a directory into the past, so the shell trusts it in the cache"""
+    past = time.time() - 60
+    os.utime(path, (past, past))
+
+
+def test_cache_file_written(shell_executable):
+    """Test that the executables of PATH are stored in the cache file.
+
+    This test verifies:
+    1. The cache file is created under XDG_CACHE_HOME
+    2. It lists the executables of the PATH directory
+    """
+    tmp_dir = create_test_environment()
+    create_executable(f"{tmp_dir}/bin/cached_tool")
+    age_directory(f"{tmp_dir}/bin")
+    env = {"PATH": f"{tmp_dir}/bin", "XDG_CACHE_HOME": f"{tmp_dir}/cache", "HISTFILE": f"{tmp_dir}/history"}
+
+    shell_tester = ShellTester(shell_executable)
+    shell_tester.start_shell(env=env)
+
+    try:
+        shell_tester.execute("exit")
+
+        cache_file = f"{tmp_dir}/cache/shell/executables"
+        assert file_exists(cache_file), f"Expected the cache file {cache_file} to exist"
+        content = read_file(cache_file)
+        assert f" {tmp_dir}/bin\ncached_tool\n" in content, f"Expected cached_tool in the cache file but got {content}"
+    finally:
+        shell_tester.stop()
+        cleanup_test_environment(tmp_dir)
+
+
+def test_cache_file_used_and_refreshed(shell_executable):
+    """Test that unchanged directories are taken from the cache file and changed ones are rescanned.
+
+    This test verifies:
+    1. Names from the cache file are completed for an unchanged directory
+    2. A directory whose mtime changed is scanned again
+    """
+    tmp_dir = create_test_environment()
+    create_executable(f"{tmp_dir}/bin/cached_tool", "#!/bin/sh\necho cached\n")
+    age_directory(f"{tmp_dir}/bin")
+    env = {"PATH": f"{tmp_dir}/bin", "XDG_CACHE_HOME": f"{tmp_dir}/cache", "HISTFILE": f"{tmp_dir}/history"}
+    cache_file = f"{tmp_dir}/cache/shell/executables"
+
+    try:
+        shell_tester = ShellTester(shell_executable)
+        shell_tester.start_shell(env=env)
+        shell_tester.execute("exit")
+        shell_tester.stop()
+
+        # an entry only the cache knows about proves that the directory was not scanned
+        write_file(cache_file, read_file(cache_file).replace("cached_tool\n", "cached_tool\ncached_only_tool\n"))
+
+        shell_tester = ShellTester(shell_executable)
+        shell_tester.start_shell(env=env)
+        output = shell_tester.execute("cached_\t\t")
+        assert output[:2] == ["\x07\n", "cached_only_tool\tcached_tool\n"], f"Expected the cached names, got {output}"
+        shell_tester.execute("exit")
+        shell_tester.stop()
+
+        create_executable(f"{tmp_dir}/bin/new_tool", "#!/bin/sh\necho new\n")
+
+        shell_tester = ShellTester(shell_executable)
+        shell_tester.start_shell(env=env)
+        output = shell_tester.execute("cached_\t")
+        assert output == ["cached\n"], f"Expected the directory to be rescanned, got {output}"
+        output = shell_tester.execute("new_t\t")
+        assert output == ["new\n"], f'Expected "new" but got {output}'
+        shell_tester.stop()
+    finally:
+        cleanup_test_environment(tmp_dir)
+
+
+def test_stale_temporary_files_removed(shell_executable):
+    """Test that temporary cache files of killed shells are removed and those of running shells are kept."""
+    tmp_dir = create_test_environment()
+    create_executable(f"{tmp_dir}/bin/cached_tool")
+    env = {"PATH": f"{tmp_dir}/bin", "XDG_CACHE_HOME": f"{tmp_dir}/cache", "HISTFILE": f"{tmp_dir}/history"}
+
+    # the pid of a process that already exited
+    exited = subprocess.Popen(["true"])
+    exited.wait()
+    stale_file = f"{tmp_dir}/cache/shell/executables.{exited.pid}"
+    running_file = f"{tmp_dir}/cache/shell/executables.{os.getpid()}"
+    write_file(stale_file, "partial")
+    write_file(running_file, "partial")
+
+    shell_tester = ShellTester(shell_executable)
+    shell_tester.start_shell(env=env)
+    try:
+        shell_tester.execute("exit")
+        assert not file_exists(stale_file), f"Expected {stale_file} to be removed"
+        assert file_exists(running_file), f"Expected {running_file} of a running process to be kept"
+    finally:
+        shell_tester.stop()
+        cleanup_test_environment(tmp_dir)
@@ -0,0 +1,104 @@
+from shell_test_utils import ShellTester, create_test_environment, cleanup_test_environment, write_file
+import os
+import shutil
+
+
+def create_executable(path, content):
+    write_file(path, content)
+    os.chmod(path, 0o755)
+
+
+def test_executable_added_after_start(shell_executable):
+    """Test that executables added to PATH after startup are found.
+
+    This test verifies:
+    1. A new executable runs without restarting the shell
+    2. type reports the new executable
+    """
+    tmp_dir = create_test_environment()
+    os.makedirs(f"{tmp_dir}/bin")
+
+    shell_tester = ShellTester(shell_executable)
+    shell_tester.start_shell(env={"PATH": f"{tmp_dir}/bin"})
+
+    try:
+        output = shell_tester.execute("new_tool")[0]
+        assert output == "new_tool: command not found\n", f'Expected "new_tool: command not found" but got "{output}"'
+
+        create_executable(f"{tmp_dir}/bin/new_tool", "#!/bin/sh\necho installed\n")
+
+        output = shell_tester.execute("type new_tool")[0]
+        assert output == f"new_tool is {tmp_dir}/bin/new_tool\n", f'Expected the new path but got "{output}"'
+
+        output = shell_tester.execute("new_tool")[0]
+        assert output == "installed\n", f'Expected "installed" but got "{output}"'
+    finally:
+        shell_tester.stop()
+        cleanup_test_environment(tmp_dir)
+
+
+def test_stale_hash_entry(shell_executable):
+    """Test that a hashed executable that moved to another PATH directory is found again."""
+    tmp_dir = create_test_environment()
+    os.makedirs(f"{tmp_dir}/first")
+    os.makedirs(f"{tmp_dir}/second")
+    create_executable(f"{tmp_dir}/first/tool", "#!/bin/sh\necho tool\n")
+
+    shell_tester = ShellTester(shell_executable)
+    shell_tester.start_shell(env={"PATH": f"{tmp_dir}/first:{tmp_dir}/second"})
+
+    try:
+        output = shell_tester.execute("tool")[0]
+        assert output == "tool\n", f'Expected "tool" but got "{output}"'
+
+        shutil.move(f"{tmp_dir}/first/tool", f"{tmp_dir}/second/tool")
+
+        output = shell_tester.execute("tool")[0]
+        assert output == "tool\n", f'Expected "tool" but got "{output}"'
+
+        output = shell_tester.execute("type tool")[0]
+        assert output == f"tool is {tmp_dir}/second/tool\n", f'Expected the new path but got "{output}"'
+    finally:
+        shell_tester.stop()
+        cleanup_test_environment(tmp_dir)
+
+
+def test_hash_builtin(shell_executable):
+    """Test that the hash builtin lists, seeds and resets the table.
+
+    This test verifies:
+    1. hash is a shell builtin and the table starts empty
+    2. Running a command counts a hit
+    3. hash NAME adds an entry without a hit
+    4. hash -r forgets all entries
+    """
+    tmp_dir = create_test_environment()
+    create_executable(f"{tmp_dir}/bin/tool", "#!/bin/sh\n")
+    create_executable(f"{tmp_dir}/bin/other", "#!/bin/sh\n")
+
+    shell_tester = ShellTester(shell_executable)
+    shell_tester.start_shell(env={"PATH": f"{tmp_dir}/bin"})
+
+    try:
+        output = shell_tester.execute("type hash")
+        assert output == ["hash is a shell builtin\n"], f'Expected "hash is a shell builtin" but got {output}'
+
+        output = shell_tester.execute("hash")
+        assert output == ["hash: hash table empty\n"], f'Expected an empty table but got {output}'
+
+        shell_tester.execute("tool")
+        shell_tester.execute("tool")
+        shell_tester.execute("hash other")
+        output = shell_tester.execute("hash")
+        assert output == ["hits\tcommand\n", f"   0\t{tmp_dir}/bin/other\n",
+                          f"   2\t{tmp_dir}/bin/tool\n"], f"Expected hits of both executables but got {output}"
+
+        output = shell_tester.execute("hash missing")
+        assert output == ["hash: missing: not found\n"], f'Expected "hash: missing: not found" but got {output}'
+
+        shell_tester.execute("hash -r")
+        output = shell_tester.execute("hash")
+        assert output == ["hash: hash table empty\n"], f'Expected an empty table but got {output}'
+    finally:
+        shell_tester.stop()
+        cleanup_test_environment(tmp_dir)
@@ -1,5 +1,4 @@
 from shell_test_utils import ShellTester, create_test_environment, cleanup_test_environment, write_file
-from time import sleep
 
 
 def test_read_history_from_file(shell_executable):
@@ -15,14 +14,9 @@ def test_read_history_from_file(shell_executable):
 
         shell_tester.execute(f"history -r {history_file}", no_output=True)
 
-        # wait for the file to be read
-        sleep(0.2)
-
-        # I am not sure why the first commands are appended twice. Once before the read and once after the read
-        # command. But when testing that manually I cannot reproduce that behaviour.
         output = shell_tester.execute("history 3")
-        assert output == ["  4  echo Hello\n", "  5  ls -la\n",
-                          "  6  history 3\n"], f"Expected \"['  4  echo Hello', '  5  ls -la', '  6  history'],\" got {output}"
+        assert output == ["  2  echo Hello\n", "  3  ls -la\n",
+                          "  4  history 3\n"], f"Expected \"['  2  echo Hello', '  3  ls -la', '  4  history 3'],\" got {output}"
     finally:
         shell_tester.stop()
         cleanup_test_environment(tmp_dir)
@@ -41,9 +35,6 @@ def test_write_history_to_file(shell_executable):
         shell_tester.execute("ls -la")
         shell_tester.execute(f"history -w {history_file}", no_output=True)
 
-        # wait for the file to be written
-        sleep(0.2)
-
         with open(history_file, "r") as f:
             lines = f.readlines()
             assert lines == ["echo Hello\n", "ls -la\n",
@@ -67,15 +58,11 @@ def test_append_history_to_file(shell_executable):
         shell_tester.execute("pwd")
         shell_tester.execute(f"history -a {history_file}", no_output=True)
 
-        # wait for the file to be written
-        sleep(0.2)
-
         with open(history_file, "r") as f:
             lines = f.readlines()
-            # I am not sure why the first commands are written twice. But when testing that manually I cannot reproduce that behaviour.
-            assert lines[2:] == ["echo Hello\n", "ls -la\n",
-                                 "pwd\n",
-                                 f"history -a {history_file}\n"], f"Expected \"['echo Hello', 'ls -la', 'pwd','history -a {history_file}'],\" got {lines}"
+            assert lines == ["echo Hello\n", "ls -la\n",
+                             "pwd\n",
+                             f"history -a {history_file}\n"], f"Expected \"['echo Hello', 'ls -la', 'pwd', 'history -a {history_file}'],\" got {lines}"
     finally:
         shell_tester.stop()
         cleanup_test_environment(tmp_dir)
@@ -113,12 +100,74 @@ def test_write_on_exit(shell_executable):
     finally:
         shell_tester.stop()
 
-    # wait for the file to be written
-    sleep(0.2)
-
     with open(history_file, "r") as f:
         lines = f.readlines()
         assert lines == ["echo Hello World\n", "ls\n",
                          "exit\n"], f"Expected \"['echo Hello World', 'ls'],\" got {lines}"
 
     cleanup_test_environment(tmp_dir)
+
+
+def test_append_only_new_entries(shell_executable):
+    tmp_dir = create_test_environment()
+    history_file = f"{tmp_dir}/history"
+    write_file(history_file, "echo Old\n")
+
+    shell_tester = ShellTester(shell_executable)
+    shell_tester.start_shell(env={"HISTFILE": history_file})
+
+    try:
+        shell_tester.execute("echo First")
+        shell_tester.execute(f"history -a {history_file}", no_output=True)
+        shell_tester.execute("echo Second")
+        shell_tester.execute(f"history -a {history_file}", no_output=True)
+
+        with open(history_file, "r") as f:
+            lines = f.readlines()
+            assert lines == ["echo Old\n", "echo First\n", f"history -a {history_file}\n", "echo Second\n",
+                             f"history -a {history_file}\n"], f"Expected every entry to be appended once, got {lines}"
+    finally:
+        shell_tester.stop()
+        cleanup_test_environment(tmp_dir)
+
+
+def test_history_size_limits(shell_executable):
+    tmp_dir = create_test_environment()
+    history_file = f"{tmp_dir}/history"
+    write_file(history_file, "".join(f"echo {i}\n" for i in range(10)))
+
+    shell_tester = ShellTester(shell_executable)
+    shell_tester.start_shell(env={"HISTFILE": history_file, "HISTSIZE": "3", "HISTFILESIZE": "2"})
+
+    try:
+        output = shell_tester.execute("history")
+        assert output == ["  9  echo 8\n", "  10  echo 9\n",
+                          "  11  history\n"], f"Expected the last 3 entries, got {output}"
+
+        shell_tester.execute("exit")
+    finally:
+        shell_tester.stop()
+
+    with open(history_file, "r") as f:
+        lines = f.readlines()
+        assert lines == ["history\n", "exit\n"], f"Expected the last 2 entries, got {lines}"
+
+    cleanup_test_environment(tmp_dir)
+
+
+def test_history_size_overflow(shell_executable):
+    """Test that HISTSIZE and HISTFILESIZE beyond the range of a number mean no limit like in bash."""
+    tmp_dir = create_test_environment()
+    history_file = f"{tmp_dir}/history"
+    write_file(history_file, "".join(f"echo {i}\n" for i in range(3)))
+
+    shell_tester = ShellTester(shell_executable)
+    shell_tester.start_shell(env={"HISTFILE": history_file, "HISTSIZE": "9" * 30, "HISTFILESIZE": "9" * 30})
+
+    try:
+        output = shell_tester.execute("history")
+        assert output == ["  1  echo 0\n", "  2  echo 1\n", "  3  echo 2\n",
+                          "  4  history\n"], f"Expected every entry, got {output}"
+    finally:
+        shell_tester.stop()
+        cleanup_test_environment(tmp_dir)
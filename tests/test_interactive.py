@@ -0,0 +1,67 @@
+from shell_test_utils import ShellTester, create_test_environment, cleanup_test_environment, write_file, strip_ansi
+
+
+def test_interactive_execute(shell_executable):
+    """Test that the shell runs commands when attached to a terminal.
+
+    This test verifies:
+    1. Builtins and external commands work on the interactive path
+    2. The prompt shows the working directory relative to HOME
+    """
+    tmp_dir = create_test_environment()
+    history_file = f"{tmp_dir}/history"
+    write_file(history_file, "")
+
+    shell_tester = ShellTester(shell_executable)
+    shell_tester.start_shell(env={"HOME": tmp_dir, "HISTFILE": history_file}, pty=True)
+
+    try:
+        output = shell_tester.execute("echo Hello World")
+        assert output == ["Hello World\n"], f'Expected "Hello World" but got {output}'
+
+        output = shell_tester.execute("ls -d /tmp")
+        assert output == ["/tmp\n"], f'Expected "/tmp" but got {output}'
+
+        shell_tester.send_keys(f"cd {tmp_dir}\n")
+        prompt = strip_ansi(shell_tester.wait_for("$ "))
+        assert prompt.endswith(":~$ "), f'Expected the prompt to show "~" but got "{prompt}"'
+    finally:
+        shell_tester.stop()
+        cleanup_test_environment(tmp_dir)
+
+
+def test_interactive_echo(shell_executable):
+    """Test that typed keys are echoed and edited on the terminal.
+
+    This test verifies:
+    1. Every typed character is echoed
+    2. Backspace erases the last character
+    3. The up arrow redraws the previous command
+    """
+    tmp_dir = create_test_environment()
+    history_file = f"{tmp_dir}/history"
+    write_file(history_file, "")
+
+    shell_tester = ShellTester(shell_executable)
+    shell_tester.start_shell(env={"HISTFILE": history_file}, pty=True)
+
+    try:
+        for key in "echo":
+            shell_tester.send_keys(key)
+            shell_tester.wait_for(key)
+
+        shell_tester.send_keys("x\x7f")
+        shell_tester.wait_for("\b \b")
+
+        output = shell_tester.execute(" First")
+        assert output == ["First\n"], f'Expected "First" but got {output}'
+
+        shell_tester.send_keys(["\x1b[A"])
+        output = shell_tester.wait_for("echo First")
+        assert output == "echo First", f'Expected the previous command to be redrawn but got "{output}"'
+
+        output = shell_tester.execute("")
+        assert output == ["First\n"], f'Expected "First" but got {output}'
+    finally:
+        shell_tester.stop()
+        cleanup_test_environment(tmp_dir)
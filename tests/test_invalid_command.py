@@ -1,12 +1,7 @@
-from shell_test_utils import ShellTester
+from shell_test_utils import lease_shell
 
 
 def test_invalid_command(shell_executable):
-    shell_tester = ShellTester(shell_executable)
-    shell_tester.start_shell()
-
-    try:
+    with lease_shell(shell_executable) as shell_tester:
         output = shell_tester.execute("invalid_command")[0]
         assert output == "invalid_command: command not found\n", f"Expected \"invalid_command: command not found\" but got \"{output}\""
-    finally:
-        shell_tester.stop()
@@ -0,0 +1,154 @@
+import subprocess
+import time
+
+from shell_test_utils import ShellTester, create_test_environment, cleanup_test_environment, read_file, write_file
+
+
+def test_background_job_runs_while_shell_continues(shell_executable):
+    shell_tester = ShellTester(shell_executable)
+    shell_tester.start_shell()
+
+    try:
+        output = shell_tester.execute("sleep 2 &")
+        assert output == [], f"Expected no output, got {output}"
+
+        output = shell_tester.execute("echo not blocked")[0]
+        assert output == "not blocked\n", f"Expected \"not blocked\", got '{output}'"
+
+        jobs = shell_tester.jobs()
+        assert jobs == [{"id": 1, "current": "+", "state": "Running", "command": "sleep 2 &"}], \
+            f"Expected one running job, got {jobs}"
+    finally:
+        shell_tester.stop()
+
+
+def test_job_states(shell_executable):
+    shell_tester = ShellTester(shell_executable)
+    shell_tester.start_shell()
+
+    try:
+        shell_tester.execute("sh -c 'exit 3' &", no_output=True)
+        job = shell_tester.wait_for_job(1, "Exit 3")
+        assert job["command"] == "sh -c 'exit 3'", f"Expected \"sh -c 'exit 3'\", got '{job['command']}'"
+
+        # finished jobs are only reported once and their numbers are reused
+        jobs = shell_tester.jobs()
+        assert jobs == [], f"Expected no jobs, got {jobs}"
+
+        shell_tester.execute("sleep 0.1 &", no_output=True)
+        shell_tester.wait_for_job(1, "Done")
+
+        shell_tester.execute("sleep 5 &", no_output=True)
+        shell_tester.execute("sleep 5 &", no_output=True)
+        jobs = shell_tester.jobs()
+        assert [(job["id"], job["current"]) for job in jobs] == [(1, "-"), (2, "+")], \
+            f"Expected job 1 to be the previous and job 2 the current job, got {jobs}"
+    finally:
+        shell_tester.stop()
+
+
+def test_wait_for_jobs(shell_executable):
+    shell_tester = ShellTester(shell_executable)
+    shell_tester.start_shell()
+
+    try:
+        # the jobs run concurrently, so waiting for all of them takes about as long as the longest
+        start = time.monotonic()
+        for _ in range(4):
+            shell_tester.execute("sleep 0.5 &", no_output=True)
+        shell_tester.execute("wait", no_output=True)
+        duration = time.monotonic() - start
+        assert 0.5 <= duration < 1.5, f"Expected the jobs to run concurrently, took {duration:.2f}s"
+
+        jobs = shell_tester.jobs()
+        assert jobs == [], f"Expected no jobs, got {jobs}"
+
+        shell_tester.execute("sleep 0.2 | cat &", no_output=True)
+        shell_tester.execute("sleep 5 &", no_output=True)
+        shell_tester.execute("wait %1", no_output=True)
+        jobs = shell_tester.jobs()
+        assert [job["id"] for job in jobs] == [2], f"Expected only job 2 to be left, got {jobs}"
+
+        pid = shell_tester.job_pids()[0]
+        output = shell_tester.execute(f"kill {pid}")
+        assert output == [], f"Expected no output, got {output}"
+        shell_tester.execute(f"wait {pid}", no_output=True)
+        jobs = shell_tester.jobs()
+        assert jobs == [], f"Expected no jobs, got {jobs}"
+
+        output = shell_tester.execute("wait %7")[0]
+        assert output == "wait: %7: no such job\n", f"Expected \"wait: %7: no such job\", got '{output}'"
+
+        output = shell_tester.execute("wait 99999999999")[0]
+        assert output == "wait: `99999999999': not a pid or valid job spec\n", \
+            f"Expected \"wait: `99999999999': not a pid or valid job spec\", got '{output}'"
+    finally:
+        shell_tester.stop()
+
+
+def test_fg(shell_executable):
+    shell_tester = ShellTester(shell_executable)
+    shell_tester.start_shell()
+
+    try:
+        output = shell_tester.execute("fg")[0]
+        assert output == "fg: current: no such job\n", f"Expected \"fg: current: no such job\", got '{output}'"
+
+        shell_tester.execute("sleep 0.2 &", no_output=True)
+        output = shell_tester.execute("fg %1")
+        assert output == ["sleep 0.2\n"], f"Expected ['sleep 0.2'], got {output}"
+
+        jobs = shell_tester.jobs()
+        assert jobs == [], f"Expected no jobs, got {jobs}"
+    finally:
+        shell_tester.stop()
+
+
+def test_background_builtins_and_syntax_errors(shell_executable):
+    shell_tester = ShellTester(shell_executable)
+    shell_tester.start_shell()
+
+    tmp_dir = create_test_environment()
+
+    try:
+        shell_tester.execute(f"echo from the background > {tmp_dir}/output &", no_output=True)
+        shell_tester.wait_for_job(1, "Done")
+        output = read_file(f"{tmp_dir}/output")
+        assert output == "from the background\n", f"Expected \"from the background\", got '{output}'"
+
+        output = shell_tester.execute("&")[0]
+        assert output == "syntax error near unexpected token `&'\n", \
+            f"Expected \"syntax error near unexpected token `&'\", got '{output}'"
+    finally:
+        shell_tester.stop()
+        cleanup_test_environment(tmp_dir)
+
+
+def test_script_reaps_jobs(shell_executable):
+    """Test that a script without a prompt reaps finished background jobs and keeps them for jobs."""
+    tmp_dir = create_test_environment()
+    script_path = f"{tmp_dir}/script.sh"
+    write_file(script_path, "true &\n" * 200 + "sleep 0.3\necho reaped\nsleep 5\n")
+
+    process = subprocess.Popen([shell_executable, script_path], stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                               text=True)
+    try:
+        output = process.stdout.readline()
+        assert output == "reaped\n", f"Expected \"reaped\", got '{output}'"
+
+        # only sleep 5 is left, every true was reaped before the next line
+        deadline = time.monotonic() + 5
+        children = []
+        while not children and time.monotonic() < deadline:
+            with open(f"/proc/{process.pid}/task/{process.pid}/children") as f:
+                children = f.read().split()
+        zombies = []
+        for child in children:
+            with open(f"/proc/{child}/stat") as f:
+                if f.read().rpartition(")")[2].split()[0] == "Z":
+                    zombies.append(child)
+        assert len(children) == 1 and not zombies, f"Expected only sleep 5, got {children} with zombies {zombies}"
+    finally:
+        process.kill()
+        process.wait()
+        cleanup_test_environment(tmp_dir)
@@ -0,0 +1,65 @@
+from shell_test_utils import (ShellTester, create_test_environment, cleanup_test_environment, write_file,
+                              create_executables)
+import os
+import time
+
+
+def first_command_latency(shell_executable, env, command="echo ready", runs=3):
+    """Return the fastest time from starting the shell until the first command, which prints "ready", finished"""
+    latencies = []
+    for _ in range(runs):
+        shell_tester = ShellTester(shell_executable)
+        start = time.perf_counter()
+        shell_tester.start_shell(env=env, timeout=30)
+        output = shell_tester.execute(command)
+        latencies.append(time.perf_counter() - start)
+        shell_tester.stop()
+        assert output == ["ready\n"], f'Expected "ready" but got {output}'
+    return min(latencies)
+
+
+def test_first_command_independent_of_path_size(shell_executable):
+    """Test that the first command does not wait for the PATH scan.
+
+    This test verifies:
+    1. Startup plus the first command takes about as long with 30000 executables in PATH as with none
+    2. Executables are found before the scan finished
+    """
+    tmp_dir = create_test_environment()
+    try:
+        create_executables(f"{tmp_dir}/large", 30000)
+        os.makedirs(f"{tmp_dir}/small")
+        write_file(f"{tmp_dir}/large/zz_hello", "#!/bin/sh\necho Hello from PATH\n")
+        os.chmod(f"{tmp_dir}/large/zz_hello", 0o755)
+        system_path = os.environ.get("PATH", "")
+
+        small = first_command_latency(shell_executable, {"PATH": f"{tmp_dir}/small:{system_path}"})
+        large = first_command_latency(shell_executable, {"PATH": f"{tmp_dir}/large:{system_path}"})
+        assert large - small < 0.05, f"Expected similar latencies but got {small * 1000:.1f}ms and {large * 1000:.1f}ms"
+
+        shell_tester = ShellTester(shell_executable)
+        shell_tester.start_shell(env={"PATH": f"{tmp_dir}/large:{system_path}"})
+        try:
+            output = shell_tester.execute("zz_hello")
+            assert output == ["Hello from PATH\n"], f'Expected "Hello from PATH" but got {output}'
+        finally:
+            shell_tester.stop()
+    finally:
+        cleanup_test_environment(tmp_dir)
+
+
+def test_builtin_pipeline_independent_of_path_size(shell_executable):
+    """Test that a first pipeline with builtin stages does not wait for the PATH scan either."""
+    tmp_dir = create_test_environment()
+    try:
+        create_executables(f"{tmp_dir}/large", 30000)
+        os.makedirs(f"{tmp_dir}/small")
+        system_path = os.environ.get("PATH", "")
+
+        small = first_command_latency(shell_executable, {"PATH": f"{tmp_dir}/small:{system_path}"},
+                                      "echo ready | cat")
+        large = first_command_latency(shell_executable, {"PATH": f"{tmp_dir}/large:{system_path}"},
+                                      "echo ready | cat")
+        assert large - small < 0.05, f"Expected similar latencies but got {small * 1000:.1f}ms and {large * 1000:.1f}ms"
+    finally:
+        cleanup_test_environment(tmp_dir)
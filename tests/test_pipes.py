@@ -48,3 +48,62 @@ def test_multi_command_pipelines(shell_executable):
     finally:
         shell_tester.stop()
         cleanup_test_environment(tmp_dir)
+
+
+def test_builtin_output_larger_than_pipe_buffer(shell_executable):
+    tmp_dir = create_test_environment()
+    history_file = f"{tmp_dir}/history"
+    write_file(history_file, "".join(f"echo entry {i}\n" for i in range(100000)))
+
+    shell_tester = ShellTester(shell_executable)
+    shell_tester.start_shell(env={"HISTFILE": history_file, "HISTSIZE": "200000"}, timeout=10)
+
+    try:
+        # roughly 2 MB of output, far more than the pipe buffer
+        output = shell_tester.execute("history 100000 | head -n 2", timeout=10)
+        assert output == ["  2  echo entry 1\n", "  3  echo entry 2\n"], \
+            f"Expected ['  2  echo entry 1', '  3  echo entry 2'], got {output}"
+
+        output = shell_tester.execute("history 100000 | wc -l", timeout=10)[0]
+        assert output.strip() == "100000", f"Expected \"100000\", got '{output}'"
+
+        output = shell_tester.execute("history 100000 | cat | wc -c", timeout=10)[0]
+        assert int(output) > 1000000, f"Expected more than 1000000 bytes, got '{output}'"
+    finally:
+        shell_tester.stop()
+        cleanup_test_environment(tmp_dir)
+
+
+def test_writer_stops_when_reader_exits(shell_executable):
+    shell_tester = ShellTester(shell_executable)
+    shell_tester.start_shell()
+
+    try:
+        output = shell_tester.execute("yes | head -n 1")
+        assert output == ["y\n"], f"Expected ['y'], got {output}"
+    finally:
+        shell_tester.stop()
+
+
+def test_builtins_in_pipelines_run_in_subshells(shell_executable):
+    shell_tester = ShellTester(shell_executable)
+    shell_tester.start_shell()
+
+    tmp_dir = create_test_environment()
+
+    try:
+        output = shell_tester.execute(f"cd {tmp_dir} | cat")
+        assert output == [], f"Expected no output, got {output}"
+
+        output = shell_tester.execute("pwd")[0]
+        assert output != f"{tmp_dir}\n", f"Expected the directory to be unchanged, got '{output}'"
+
+        output = shell_tester.execute("exit 3 | cat")
+        assert output == [], f"Expected no output, got {output}"
+        assert shell_tester.is_alive(), "Expected the shell to keep running after exit in a pipeline"
+
+        output = shell_tester.execute("echo still running")[0]
+        assert output == "still running\n", f"Expected \"still running\", got '{output}'"
+    finally:
+        shell_tester.stop()
+        cleanup_test_environment(tmp_dir)
@@ -1,6 +1,6 @@
 import os
 
-from shell_test_utils import ShellTester
+from shell_test_utils import lease_shell
 
 
 def test_pwd(shell_executable):
@@ -10,10 +10,7 @@ def test_pwd(shell_executable):
     1. The pwd command is recognized as a shell builtin
     2. The pwd command outputs the current working directory
     """
-    shell_tester = ShellTester(shell_executable)
-    shell_tester.start_shell()
-
-    try:
+    with lease_shell(shell_executable) as shell_tester:
         # Test 1: Verify pwd is a shell builtin using type command
         output = shell_tester.execute("type pwd")[0]
         assert output == "pwd is a shell builtin\n", f'Expected "pwd is a shell builtin" but got "{output}"'
@@ -24,5 +21,3 @@ def test_pwd(shell_executable):
         cwd = os.path.abspath(shell_executable)
         cwd = cwd[:cwd.rfind(os.sep)]
         assert output == cwd + "\n", f'Expected "{cwd}" but got "{output}"'
-    finally:
-        shell_tester.stop()
@@ -95,3 +95,30 @@ def test_single_quotes(shell_executable):
         shell_tester.stop()
     finally:
         cleanup_test_environment(tmp_dir)
+
+
+def test_quoted_operators(shell_executable):
+    """Test that operators and redirections inside quotes are plain text.
+
+    This test verifies:
+    1. Quoted and escaped pipes, semicolons and ampersands do not split the command
+    2. A quoted > is an argument and not a redirection
+    3. Empty quotes are empty arguments
+    """
+    shell_tester = ShellTester(shell_executable)
+    shell_tester.start_shell()
+
+    try:
+        # Test 1: Operators in quotes
+        output = shell_tester.execute("echo 'a|b' \"c;d\" 'e && f' g\\|h")[0]
+        assert output == "a|b c;d e && f g|h\n", f'Expected "a|b c;d e && f g|h" but got "{output}"'
+
+        # Test 2: Quoted redirection
+        output = shell_tester.execute("echo '>' \">>\" 2'>'x")[0]
+        assert output == "> >> 2>x\n", f'Expected "> >> 2>x" but got "{output}"'
+
+        # Test 3: Empty arguments
+        output = shell_tester.execute("echo '' \"\" x")[0]
+        assert output == "  x\n", f'Expected "  x" but got "{output}"'
+    finally:
+        shell_tester.stop()
@@ -177,3 +177,56 @@ def test_append_stderr(shell_executable):
         shell_tester.stop()
     finally:
         cleanup_test_environment(tmp_dir)
+
+
+def test_redirection_placement(shell_executable):
+    """Test that redirections are parsed wherever they appear in a command.
+
+    This test verifies:
+    1. Arguments after a redirection still belong to the command
+    2. Redirections work without spaces around the operator
+    3. The last redirection of a stream wins
+    4. A redirection takes precedence over a pipe
+    5. A redirection without a command creates the file
+    6. A redirection without a target is a syntax error
+    """
+    tmp_dir = create_test_environment()
+    try:
+        shell_tester = ShellTester(shell_executable)
+        shell_tester.start_shell()
+
+        # Test 1: Arguments after the redirection
+        shell_tester.execute(f"echo Hello > {tmp_dir}/first.md World", no_output=True)
+        output = shell_tester.execute(f"cat {tmp_dir}/first.md")[0]
+        assert output == "Hello World\n", f'Expected "Hello World" but got "{output}"'
+
+        # Test 2: No spaces
+        shell_tester.execute(f"echo compact>{tmp_dir}/compact.md", no_output=True)
+        shell_tester.execute(f"ls nonexistent 2>{tmp_dir}/error.md", no_output=True)
+        output = shell_tester.execute(f"cat {tmp_dir}/compact.md {tmp_dir}/error.md")
+        assert output[0] == "compact\n" and "No such file or directory" in output[1], \
+            f'Expected "compact" and an error message but got "{output}"'
+
+        # Test 3: The last redirection wins
+        shell_tester.execute(f"echo last > {tmp_dir}/unused.md > {tmp_dir}/last.md", no_output=True)
+        output = shell_tester.execute(f"cat {tmp_dir}/last.md")[0]
+        assert output == "last\n", f'Expected "last" but got "{output}"'
+        assert os.path.getsize(f"{tmp_dir}/unused.md") == 0, "Expected the first file to be created empty"
+
+        # Test 4: Redirection and pipe
+        output = shell_tester.execute(f"echo redirected > {tmp_dir}/piped.md | wc -l")[0]
+        assert output.strip() == "0", f'Expected nothing to reach the pipe but got "{output}"'
+        output = shell_tester.execute(f"cat {tmp_dir}/piped.md")[0]
+        assert output == "redirected\n", f'Expected "redirected" but got "{output}"'
+
+        # Test 5: Only a redirection
+        shell_tester.execute(f"> {tmp_dir}/created.md", no_output=True)
+        assert file_exists(f"{tmp_dir}/created.md"), "Expected the file to be created"
+
+        # Test 6: Missing target
+        output = shell_tester.execute("echo Hello >")[0]
+        assert output == "syntax error near unexpected token `newline'\n", f'Expected a syntax error but got "{output}"'
+
+        shell_tester.stop()
+    finally:
+        cleanup_test_environment(tmp_dir)
@@ -0,0 +1,103 @@
+from shell_test_utils import (ShellTester, read_proc_resources, set_resource_accounting, collect_resource_usage,
+                              create_test_environment, cleanup_test_environment)
+import os
+import subprocess
+
+
+def test_no_fd_leaks(shell_executable):
+    """Test that the shell holds the same fds after many redirections, pipelines and jobs.
+
+    This test verifies:
+    1. Redirections of builtins and external commands close their files and the dup'd stdio
+    2. Pipelines close both ends of every pipe
+    3. Failed redirections, unknown commands and background jobs leave no fds behind
+    """
+    tmp_dir = create_test_environment()
+    shell_tester = ShellTester(shell_executable)
+    try:
+        shell_tester.start_shell()
+        commands = [
+            f"echo builtin > {tmp_dir}/out",
+            f"ls {tmp_dir} >> {tmp_dir}/out 2> {tmp_dir}/err",
+            f"echo missing > {tmp_dir}/missing/out",
+            "echo a | cat | wc -l",
+            f"echo redirected > {tmp_dir}/out | cat",
+            "unknown_command_xyz | cat",
+            "true &",
+            "wait",
+        ]
+
+        start = shell_tester.sample_resources()
+        for _ in range(20):
+            for command in commands:
+                shell_tester.execute(command, no_output=True)
+        end = shell_tester.sample_resources()
+
+        open_fds = os.listdir(f"/proc/{shell_tester.process.pid}/fd")
+        assert end["fds"] == start["fds"], \
+            f"Expected {start['fds']} open fds but got {end['fds']}: {open_fds}"
+    finally:
+        shell_tester.stop()
+        cleanup_test_environment(tmp_dir)
+
+
+def test_resource_samples(shell_executable):
+    """Test that ShellTester keeps the first, last and peak of its samples with accounting enabled."""
+    set_resource_accounting(True)
+    shell_tester = ShellTester(shell_executable)
+    try:
+        shell_tester.start_shell()
+        pid = shell_tester.process.pid
+        shell_tester.execute("echo Hello")
+        shell_tester.stop()
+    finally:
+        set_resource_accounting(False)
+
+    resources = shell_tester.resources
+    assert resources["count"] == 3, f"Expected samples at start, echo and stop but got {resources['count']}"
+
+    sample = resources["first"]
+    assert sample["rss_kb"] > 0 and sample["peak_rss_kb"] >= sample["rss_kb"], f"Expected the RSS but got {sample}"
+    assert sample["fds"] >= 3, f"Expected at least stdin, stdout and stderr but got {sample['fds']}"
+    assert resources["peak"]["cpu_ms"] >= resources["last"]["cpu_ms"], f"Expected the peak CPU time but got {resources}"
+    assert read_proc_resources(pid) is None, "Expected no sample of an exited shell"
+    usage = collect_resource_usage()
+    assert usage["peak_rss_kb"] == resources["peak"]["peak_rss_kb"], \
+        f"Expected the peak RSS over all samples but got {usage['peak_rss_kb']}"
+
+    # a shell that exited on its own is a zombie until it is waited for, it has no RSS or fds to sample
+    process = subprocess.Popen([shell_executable, "-c", "exit"], stdin=subprocess.DEVNULL)
+    os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOWAIT)
+    sample = read_proc_resources(process.pid)
+    process.wait()
+    assert sample is None, f"Expected no sample of an exiting shell but got {sample}"
+
+    shell_tester = ShellTester(shell_executable)
+    shell_tester.start_shell()
+    shell_tester.execute("echo Hello")
+    shell_tester.stop()
+    assert shell_tester.resources is None, f"Expected no samples without accounting but got {shell_tester.resources}"
+
+
+def test_no_memory_leaks(shell_executable):
+    """Test that the RSS of the shell stays flat over thousands of pwd, cd, echo and redirections."""
+    tmp_dir = create_test_environment()
+    shell_tester = ShellTester(shell_executable)
+    try:
+        shell_tester.start_shell(env={"HISTFILE": "/dev/null", "HISTSIZE": "10"})
+        line = "; ".join(["pwd > /dev/null", f"cd {tmp_dir}", "cd ..", f"echo x > {tmp_dir}/out"] * 100)
+
+        # the first lines fill the allocator and the history
+        for _ in range(10):
+            shell_tester.execute(line, no_output=True)
+        start = shell_tester.sample_resources()
+
+        for _ in range(50):
+            shell_tester.execute(line, no_output=True)
+        end = shell_tester.sample_resources()
+
+        growth = end["rss_kb"] - start["rss_kb"]
+        assert growth < 64, f"Expected a flat RSS over 20000 commands but it grew by {growth} kB"
+    finally:
+        shell_tester.stop()
+        cleanup_test_environment(tmp_dir)
@@ -3,6 +3,21 @@ import sys
 import inspect
 import importlib
 import os
+import io
+import argparse
+import contextlib
+import concurrent.futures
+
+from shell_test_utils import set_resource_accounting, reset_resource_usage, collect_resource_usage
+
+# threshold options and the key of collect_resource_usage() they limit
+RESOURCE_LIMITS = {
+    "max_rss": ("peak_rss_kb", "peak RSS", "kB"),
+    "max_cpu": ("cpu_ms", "CPU time", "ms"),
+    "max_fds": ("fds", "open fds", ""),
+    "max_fd_growth": ("fd_growth", "fd growth", ""),
+    "max_switches": ("switches", "context switches", ""),
+}
 
 
 def discover_test_modules(test_dir="."):
@@ -24,48 +39,97 @@ def discover_test_functions(module):
     return test_functions
 
 
-def run_tests(shell_executable):
-    """Discover and run all test functions"""
+def run_test(module_name, test_name, shell_executable, limits=None):
+    """Run a single test function and collect everything it prints
+
+    The resource usage of the shells the test used is checked against limits, a dict of
+    option names of RESOURCE_LIMITS to thresholds. Returns a tuple of (passed, error, output, usage).
+    """
+    buffer = io.StringIO()
+    set_resource_accounting(True)
+    reset_resource_usage()
+    with contextlib.redirect_stdout(buffer), contextlib.redirect_stderr(buffer):
+        try:
+            module = importlib.import_module(module_name)
+            getattr(module, test_name)(shell_executable)
+            passed, error = True, None
+        except Exception as e:
+            passed, error = False, str(e)
+
+    usage = collect_resource_usage()
+    if usage is not None:
+        usage["switches"] = usage["voluntary_switches"] + usage["involuntary_switches"]
+        if passed:
+            error = check_limits(usage, limits or {})
+            passed = error is None
+    return passed, error, buffer.getvalue(), usage
+
+
+def check_limits(usage, limits):
+    """Return an error for the first resource above its limit, None if all are within their limits"""
+    for option, limit in limits.items():
+        if limit is None:
+            continue
+
+        key, name, unit = RESOURCE_LIMITS[option]
+        if usage[key] > limit:
+            return f"{name} of {usage[key]}{' ' + unit if unit else ''} exceeds the limit of {limit}"
+    return None
+
+
+def format_usage(usage):
+    """Format the resource usage of a test for the result line"""
+    if usage is None:
+        return ""
+    return (f"rss {usage['peak_rss_kb']:>6} kB  cpu {usage['cpu_ms']:>5} ms  "
+            f"fds {usage['fds']:>3} ({usage['fd_growth']:+})  "
+            f"csw {usage['voluntary_switches']}/{usage['involuntary_switches']}")
+
+
+def run_tests(shell_executable, jobs=1, limits=None):
+    """Discover and run all test functions
+
+    With jobs > 1 the tests run in a process pool. Results are still reported in discovery order.
+    """
     test_dir = os.path.dirname(os.path.abspath(__file__))
     os.chdir(test_dir)
 
     # Discover test modules
-    test_modules = discover_test_modules(".")
+    test_modules = sorted(discover_test_modules("."))
 
     if not test_modules:
         print("No test modules found")
         return 0
 
-    total_tests = 0
-    passed_tests = 0
     failed_tests = 0
     errors = []
 
-    # Run tests from each module
+    # Collect tests from each module
+    tests = []
     for module_name in test_modules:
         try:
             module = importlib.import_module(module_name)
-            test_functions = discover_test_functions(module)
-
-            if not test_functions:
-                continue
-
-            for test_name, test_func in test_functions:
-                total_tests += 1
-
-                try:
-                    test_func(shell_executable)
-
-                    print(f"✓ {module_name}.{test_name}")
-                    passed_tests += 1
-                except Exception as e:
-                    print(f"✗ {module_name}.{test_name}")
-                    failed_tests += 1
-                    errors.append((module_name, test_name, str(e)))
-
         except ImportError as e:
             print(f"Error importing {module_name}: {e}")
             failed_tests += 1
+            continue
+
+        for test_name, _ in discover_test_functions(module):
+            tests.append((module_name, test_name))
+
+    # Run tests
+    if jobs > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(run_test, module_name, test_name, shell_executable, limits)
+                       for module_name, test_name in tests]
+            results = (future.result() for future in futures)
+            failed_tests += report_results(tests, results, errors)
+    else:
+        results = (run_test(module_name, test_name, shell_executable, limits) for module_name, test_name in tests)
+        failed_tests += report_results(tests, results, errors)
+
+    total_tests = len(tests)
+    passed_tests = total_tests - len(errors)
 
     # Print summary
     print("\n" + "=" * 50)
@@ -81,10 +145,40 @@ def run_tests(shell_executable):
     return 0 if failed_tests == 0 else 1
 
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python test_runner.py <shell_executable>")
-        sys.exit(1)
+def report_results(tests, results, errors):
+    """Print the result of each test as soon as it is available, in the order of tests
 
-    exit_code = run_tests(sys.argv[1])
+    Failures are appended to errors. Returns the number of failed tests.
+    """
+    failed = 0
+    width = max((len(module_name) + len(test_name) + 1 for module_name, test_name in tests), default=0)
+    for (module_name, test_name), (passed, error, output, usage) in zip(tests, results):
+        name = f"{module_name}.{test_name}"
+        print(f"{'✓' if passed else '✗'} {name:<{width}}  {format_usage(usage)}".rstrip())
+        if not passed:
+            failed += 1
+            errors.append((module_name, test_name, error))
+
+        if output:
+            print(output, end="" if output.endswith("\n") else "\n")
+        sys.stdout.flush()
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the shell tests")
+    parser.add_argument("shell_executable", help="path to the compiled shell executable")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="number of tests to run in parallel")
+    parser.add_argument("--max-rss", type=int, help="fail tests whose shells peak above this RSS in kB")
+    parser.add_argument("--max-cpu", type=int, help="fail tests whose shells use more CPU time in ms")
+    parser.add_argument("--max-fds", type=int, help="fail tests whose shells hold more fds at once")
+    parser.add_argument("--max-fd-growth", type=int, help="fail tests after which a shell holds more fds than before")
+    parser.add_argument("--max-switches", type=int, help="fail tests whose shells switch context more often")
+    args = parser.parse_args()
+
+    if args.jobs < 1:
+        parser.error("-j must be at least 1")
+
+    limits = {option: getattr(args, option) for option in RESOURCE_LIMITS}
+    exit_code = run_tests(args.shell_executable, args.jobs, limits)
     sys.exit(exit_code)
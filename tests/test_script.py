@@ -0,0 +1,61 @@
+from shell_test_utils import run_script, create_test_environment, cleanup_test_environment, write_file
+import subprocess
+
+
+def test_command_string(shell_executable):
+    """Test that shell -c runs every line of the command string and exits."""
+    code, output = run_script(shell_executable, "echo first\necho second | wc -w", mode="c")
+    assert code == 0, f"Expected exit code 0 but got {code}"
+    assert output == ["first\n", "1\n"], f'Expected "first" and "1" but got {output}'
+
+
+def test_script_file(shell_executable):
+    """Test that the shell runs a script file.
+
+    This test verifies:
+    1. Builtins, external commands and pipelines run in order
+    2. A last line without a newline runs as well
+    3. The exit builtin sets the exit code
+    """
+    script = "echo Hello\ntype echo\n\nls -d /tmp | cat\necho last\nexit 3"
+    code, output = run_script(shell_executable, script)
+    assert code == 3, f"Expected exit code 3 but got {code}"
+    assert output == ["Hello\n", "echo is a shell builtin\n", "/tmp\n",
+                      "last\n"], f"Expected the output of every line but got {output}"
+
+
+def test_script_ignores_history(shell_executable):
+    """Test that scripts neither read nor write the history file."""
+    tmp_dir = create_test_environment()
+    history_file = f"{tmp_dir}/history"
+    write_file(history_file, "echo old\n")
+
+    try:
+        code, output = run_script(shell_executable, "echo Hello\nhistory\n", env={"HISTFILE": history_file})
+        assert output == ["Hello\n"], f"Expected no history but got {output}"
+
+        with open(history_file) as f:
+            lines = f.readlines()
+            assert lines == ["echo old\n"], f"Expected the history file to be unchanged but got {lines}"
+    finally:
+        cleanup_test_environment(tmp_dir)
+
+
+def test_piped_stdin(shell_executable):
+    """Test that commands piped into stdin run until the end of input."""
+    lines = "".join(f"echo line {i}\n" for i in range(1000))
+    code, output = run_script(shell_executable, lines, env={"HISTFILE": "/dev/null"}, mode="stdin")
+    assert code == 0, f"Expected exit code 0 but got {code}"
+    assert output == [f"line {i}\n" for i in range(1000)], f"Expected 1000 lines but got {len(output)}"
+
+
+def test_missing_script(shell_executable):
+    """Test that a missing script file is reported with exit code 127."""
+    tmp_dir = create_test_environment()
+    try:
+        result = subprocess.run([shell_executable, f"{tmp_dir}/missing.sh"], stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT, text=True, timeout=10)
+        assert result.returncode == 127, f"Expected exit code 127 but got {result.returncode}"
+        assert "No such file or directory" in result.stdout, f"Expected an error message but got {result.stdout}"
+    finally:
+        cleanup_test_environment(tmp_dir)
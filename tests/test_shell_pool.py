@@ -0,0 +1,84 @@
+from shell_test_utils import ShellPool, create_test_environment, cleanup_test_environment, write_file
+import os
+
+
+def test_pool_resets_state(shell_executable):
+    """Test that a pooled shell is reset between leases.
+
+    This test verifies:
+    1. The same shell process is reused for the same env
+    2. The working directory is restored
+    3. The history is cleared
+    4. The hash table is cleared
+    """
+    tmp_dir = create_test_environment()
+    history_file = f"{tmp_dir}/history"
+    write_file(history_file, "")
+    pool = ShellPool(shell_executable)
+
+    try:
+        with pool.lease(env={"HISTFILE": history_file}) as shell_tester:
+            pid = shell_tester.process.pid
+            shell_tester.execute(f"cd {tmp_dir}", no_output=True)
+            shell_tester.execute("echo Hello", no_output=True)
+            shell_tester.execute("ls / > /dev/null", no_output=True)
+
+        with pool.lease(env={"HISTFILE": history_file}) as shell_tester:
+            assert shell_tester.process.pid == pid, "Expected the shell to be reused"
+
+            output = shell_tester.execute("pwd")[0]
+            cwd = os.path.dirname(os.path.abspath(shell_executable))
+            assert output == cwd + "\n", f'Expected "{cwd}" but got "{output}"'
+
+            output = shell_tester.execute("history")
+            assert output == ["  1  pwd\n", "  2  history\n"], f"Expected a cleared history but got {output}"
+
+            output = shell_tester.execute("hash")
+            assert output == ["hash: hash table empty\n"], f"Expected a cleared hash table but got {output}"
+    finally:
+        pool.close()
+        cleanup_test_environment(tmp_dir)
+
+
+def test_pool_respawns_dead_shell(shell_executable):
+    """Test that a shell which exited during a lease is replaced."""
+    pool = ShellPool(shell_executable)
+
+    try:
+        with pool.lease() as shell_tester:
+            pid = shell_tester.process.pid
+            shell_tester.execute("exit", no_output=True)
+
+        with pool.lease() as shell_tester:
+            assert shell_tester.process.pid != pid, "Expected a new shell after exit"
+            output = shell_tester.execute("echo alive")[0]
+            assert output == "alive\n", f'Expected "alive" but got "{output}"'
+    finally:
+        pool.close()
+
+
+def test_pool_ends_background_jobs(shell_executable):
+    """Test that background jobs of a lease do not show up in the next lease."""
+    pool = ShellPool(shell_executable)
+
+    try:
+        with pool.lease() as shell_tester:
+            pid = shell_tester.process.pid
+            shell_tester.execute("sleep 30 | cat &", no_output=True)
+            shell_tester.execute("sleep 30 &", no_output=True)
+            job_pids = shell_tester.job_pids()
+
+        with pool.lease() as shell_tester:
+            assert shell_tester.process.pid == pid, "Expected the shell to be reused"
+
+            jobs = shell_tester.jobs()
+            assert jobs == [], f"Expected no jobs of the last lease but got {jobs}"
+
+            for job_pid in job_pids:
+                assert not os.path.exists(f"/proc/{job_pid}"), f"Expected job {job_pid} to be killed and reaped"
+
+            shell_tester.execute("true &")
+            job_id = shell_tester.wait_for_job(1)["id"]
+            assert job_id == 1, f"Expected job numbers to start at 1 again but got {job_id}"
+    finally:
+        pool.close()
@@ -0,0 +1,75 @@
+import os
+
+from shell_test_utils import (run_script, lease_shell, ShellTester, create_test_environment,
+                              cleanup_test_environment, create_executables)
+
+
+def test_time_format(shell_executable):
+    """Test that time reports after the output of the pipeline in the format of TIMEFORMAT.
+
+    This test verifies:
+    1. The report follows the output of the pipeline and ends with a newline
+    2. %% and unknown specifiers are printed as they are
+    3. -p selects the POSIX format regardless of TIMEFORMAT
+    4. An empty TIMEFORMAT disables the report
+    """
+    code, output = run_script(shell_executable, "time echo one | cat\necho two", mode="c",
+                              env={"TIMEFORMAT": "timed %% %X"})
+    assert code == 0, f"Expected exit code 0 but got {code}"
+    assert output == ["one\n", "timed % %X\n", "two\n"], f"Expected the report after 'one' but got {output}"
+
+    code, output = run_script(shell_executable, "time -p echo posix", mode="c", env={"TIMEFORMAT": "ignored"})
+    assert output[0] == "posix\n", f"Expected the output first but got {output}"
+    assert [line.split()[0] for line in output[1:]] == ["real", "user", "sys"], \
+        f"Expected the POSIX format but got {output}"
+
+    code, output = run_script(shell_executable, "time echo quiet", mode="c", env={"TIMEFORMAT": ""})
+    assert output == ["quiet\n"], f"Expected no report but got {output}"
+
+
+def test_time_measures(shell_executable):
+    """Test that the report contains the real time and the resource usage of the children."""
+    code, output = run_script(shell_executable, "time sleep 0.3", mode="c",
+                              env={"TIMEFORMAT": "%3R %lR %2U %S %M %w %c"})
+    real, long_real, user, sys, maxrss, voluntary, involuntary = output[0].split()
+    assert 0.3 <= float(real) < 3, f"Expected about 0.3 seconds but got {real}"
+    assert long_real.startswith("0m") and long_real.endswith("s"), f"Expected the long format but got {long_real}"
+    assert len(user.split(".")[1]) == 2, f"Expected 2 decimals but got {user}"
+    assert float(sys) >= 0, f"Expected the system time but got {sys}"
+    assert int(maxrss) > 0, f"Expected the maximum RSS of sleep but got {maxrss}"
+    assert int(voluntary) >= 0 and int(involuntary) >= 0, \
+        f"Expected context switches but got {voluntary} and {involuntary}"
+
+
+def test_time_status(shell_executable):
+    """Test that time keeps the exit status of the pipeline and is only a reserved word at its start."""
+    code, output = run_script(shell_executable, "time false; echo $?\ntime; echo $?\necho time -p 'time'",
+                              mode="c", env={"TIMEFORMAT": "timed"})
+    assert output == ["timed\n", "1\n", "timed\n", "0\n", "time -p time\n"], \
+        f"Expected the status of false and the words as arguments but got {output}"
+
+    with lease_shell(shell_executable) as shell_tester:
+        output = shell_tester.execute("type time")
+        assert output == ["time is a shell keyword\n"], f"Expected a shell keyword but got {output}"
+
+        output = shell_tester.execute("time | cat")
+        assert output == ["syntax error near unexpected token `|'\n"], f"Expected a syntax error but got {output}"
+
+
+def test_time_excludes_path_scan(shell_executable):
+    """Test that the CPU time of the PATH scan in the background does not count for a timed command."""
+    tmp_dir = create_test_environment()
+    try:
+        create_executables(f"{tmp_dir}/large", 30000)
+        shell_tester = ShellTester(shell_executable)
+        shell_tester.start_shell(env={"PATH": f"{tmp_dir}/large:{os.environ.get('PATH', '')}",
+                                      "TIMEFORMAT": "%3U %3S"})
+        try:
+            output = shell_tester.execute("time sleep 0.3")
+        finally:
+            shell_tester.stop()
+
+        user, sys = (float(value) for value in output[0].split())
+        assert user + sys < 0.05, f"Expected almost no CPU time for sleep but got user {user} and sys {sys}"
+    finally:
+        cleanup_test_environment(tmp_dir)
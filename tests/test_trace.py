@@ -0,0 +1,110 @@
+import json
+import os
+import subprocess
+
+from shell_test_utils import ShellTester, aggregate_trace, create_test_environment, cleanup_test_environment, \
+    read_file, run_script
+
+
+def test_trace_records(shell_executable):
+    shell_tester = ShellTester(shell_executable)
+    shell_tester.start_shell(trace=True)
+
+    try:
+        shell_tester.execute("echo Hello")
+        record = shell_tester.read_trace()[0]
+        assert record["input"] == "echo Hello", f"Expected the input \"echo Hello\", got '{record['input']}'"
+        assert record["status"] == 0, f"Expected status 0, got {record['status']}"
+        assert [stage["command"] for stage in record["stages"]] == ["echo"], f"Expected one echo stage, got {record}"
+        assert record["builtin_ns"] > 0 and record["spawn_ns"] == 0, f"Expected echo to run as a builtin, got {record}"
+
+        shell_tester.execute("ls / | sh -c 'exit 3'")
+        record = shell_tester.read_trace()[0]
+        assert record["status"] == 3, f"Expected status 3, got {record['status']}"
+        assert [stage["command"] for stage in record["stages"]] == ["ls", "sh"], \
+            f"Expected the stages ls and sh, got {record['stages']}"
+        assert record["spawn_ns"] > 0 and record["wait_ns"] > 0, f"Expected spawn and wait times, got {record}"
+        assert record["child_maxrss_kb"] > 0, f"Expected the rusage of the children, got {record}"
+
+        shell_tester.execute("echo a |")
+        record = shell_tester.read_trace()[0]
+        assert record["status"] == 2 and record["stages"] == [], f"Expected a syntax error, got {record}"
+    finally:
+        shell_tester.stop()
+
+
+def test_trace_aggregation(shell_executable):
+    shell_tester = ShellTester(shell_executable)
+    shell_tester.start_shell(trace=True)
+
+    try:
+        for _ in range(20):
+            shell_tester.execute("true; echo x")
+        records = shell_tester.read_trace(20)
+        assert len(records) == 20, f"Expected 20 records, got {len(records)}"
+
+        aggregate = aggregate_trace(records)
+        for phase in ["total_ns", "parse_ns", "spawn_ns", "wait_ns"]:
+            assert aggregate[phase]["count"] == 20, f"Expected 20 samples of {phase}, got {aggregate[phase]}"
+            assert sum(aggregate[phase]["histogram"].values()) == 20, \
+                f"Expected the histogram of {phase} to hold all samples, got {aggregate[phase]}"
+        assert aggregate["total_ns"]["total_ns"] >= aggregate["spawn_ns"]["total_ns"], \
+            f"Expected the total to include spawning, got {aggregate}"
+
+        # warm builtins take well below a microsecond, they must still be measured
+        for _ in range(50):
+            shell_tester.execute("echo Hello > /dev/null")
+        records = shell_tester.read_trace(50)
+        for record in records:
+            assert record["parse_ns"] > 0 and record["builtin_ns"] > 0, f"Expected measured phases, got {record}"
+
+        aggregate = aggregate_trace(records, ["parse_ns", "builtin_ns"])
+        for phase in ["parse_ns", "builtin_ns"]:
+            assert 0 not in aggregate[phase]["histogram"], \
+                f"Expected no durations of 0 for {phase}, got {aggregate[phase]['histogram']}"
+    finally:
+        shell_tester.stop()
+
+
+def test_trace_to_file(shell_executable):
+    tmp_dir = create_test_environment()
+    trace_file = f"{tmp_dir}/trace.jsonl"
+
+    shell_tester = ShellTester(shell_executable)
+    shell_tester.start_shell(env={"SHELL_TRACE": trace_file})
+
+    try:
+        shell_tester.execute("echo one")
+        shell_tester.execute("echo two")
+
+        lines = read_file(trace_file).splitlines()
+        assert len(lines) == 2, f"Expected 2 trace lines, got {lines}"
+        assert '"input":"echo two"' in lines[1], f"Expected the second line to trace echo two, got {lines[1]}"
+    finally:
+        shell_tester.stop()
+        cleanup_test_environment(tmp_dir)
+
+
+def test_trace_invalid_input(shell_executable):
+    """Test that the trace stays valid JSON for input that is not UTF-8 and rejects an fd out of range.
+
+    This test verifies:
+    1. Invalid UTF-8 bytes are escaped like Python's surrogateescape, valid sequences are kept
+    2. SHELL_TRACE with a number beyond the range of an fd disables tracing instead of aborting
+    """
+    tmp_dir = create_test_environment()
+    trace_file = f"{tmp_dir}/trace.jsonl"
+
+    try:
+        line = b"echo \xff caf\xc3\xa9 \xed\xa0\x80"
+        subprocess.run([shell_executable], input=line + b"\n", stdout=subprocess.DEVNULL,
+                       env={**os.environ, "SHELL_TRACE": trace_file}, timeout=10, check=True)
+        record = json.loads(read_file(trace_file))
+        assert record["input"].encode("utf-8", "surrogateescape") == line, \
+            f"Expected the input to round-trip, got {record['input']!r}"
+
+        code, output = run_script(shell_executable, "echo traced", mode="c", env={"SHELL_TRACE": "99999999999"})
+        assert code == 0 and output == ["SHELL_TRACE: Bad file descriptor\n", "traced\n"], \
+            f"Expected an error and the output of echo, got {code} and {output}"
+    finally:
+        cleanup_test_environment(tmp_dir)
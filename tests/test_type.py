@@ -1,13 +1,10 @@
-from shell_test_utils import ShellTester
+from shell_test_utils import lease_shell
 
 
 def test_type(shell_executable):
     """Verify `type` reports builtins and reports not found for unknown commands."""
 
-    shell_tester = ShellTester(shell_executable)
-    shell_tester.start_shell()
-
-    try:
+    with lease_shell(shell_executable) as shell_tester:
         cases = [
             ("type echo", "echo is a shell builtin"),
             ("type exit", "exit is a shell builtin"),
@@ -19,5 +16,3 @@ def test_type(shell_executable):
         for cmd, expected in cases:
             output = shell_tester.execute(cmd)[0]
             assert output == expected + "\n", f'Expected "{expected}" but got "{output}"'
-    finally:
-        shell_tester.stop()